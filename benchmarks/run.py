@@ -0,0 +1,281 @@
+# Benchmarks for building, submitting and listing against moto running as a local
+# server, so they run offline and need no AWS account. They benchmark the installed
+# chorecoral, so install it first, e.g. with `pip install -e '.[dev]'`.
+#
+#     python benchmarks/run.py --output before.json
+#     python benchmarks/run.py --output after.json --jobs 5000
+#
+# Results are written as JSON, one entry per benchmark with the seconds each run
+# took, the peak memory allocated by Python during one more run, and the API calls
+# it made, so that two versions can be compared by diffing their results.
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+from moto.server import DomainDispatcherApplication, create_backend_app
+from werkzeug.serving import make_server
+
+from chorecoral import (
+    Builder,
+    ClientPool,
+    JobManager,
+    MemoryResourceCache,
+    Metrics,
+)
+
+# the image every build uses, so that later builds find what earlier ones made
+IMAGE_NAME = "alpine"
+IMAGE_TAG = "3.15.0"
+
+
+def start_server() -> str:
+    # moto as a real http server, in a background thread of this process
+    # without logging every request, which would drown out the results
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server(
+        "127.0.0.1", 0, DomainDispatcherApplication(create_backend_app), threaded=True
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+class Account:
+    # the network resources that builds need, created in the server
+
+    def __init__(self, endpoint_url: str):
+        iam = boto3.client("iam", endpoint_url=endpoint_url)
+        ec2 = boto3.client("ec2", endpoint_url=endpoint_url)
+        role = iam.create_role(RoleName="benchmark", AssumeRolePolicyDocument="{}")
+        self.service_role = role["Role"]["Arn"]
+        self.security_group = ec2.create_security_group(
+            GroupName="benchmark", Description="benchmark"
+        )["GroupId"]
+        vpc_id = [vpc for vpc in ec2.describe_vpcs()["Vpcs"] if vpc["IsDefault"]][0][
+            "VpcId"
+        ]
+        self.subnets = [
+            subnet["SubnetId"]
+            for subnet in ec2.describe_subnets(
+                Filters=[{"Name": "vpc-id", "Values": [vpc_id]}]
+            )["Subnets"]
+        ]
+
+
+def seed(
+    batch,
+    account: Account,
+    environments: int,
+    queues: int,
+    definitions: int,
+    revisions: int,
+) -> None:
+    # fill the account with other resources, so that builds have to find theirs
+    # among a realistic number
+    environment_arns = []
+    for i in range(environments):
+        response = batch.create_compute_environment(
+            computeEnvironmentName=f"seed-{i}",
+            type="MANAGED",
+            state="ENABLED",
+            computeResources={
+                "type": "FARGATE",
+                "maxvCpus": 100,
+                "subnets": account.subnets,
+                "securityGroupIds": [account.security_group],
+            },
+            serviceRole=account.service_role,
+        )
+        environment_arns.append(response["computeEnvironmentArn"])
+    for i in range(queues):
+        batch.create_job_queue(
+            jobQueueName=f"seed-{i}",
+            state="ENABLED",
+            priority=10,
+            computeEnvironmentOrder=[
+                {
+                    "order": 10,
+                    "computeEnvironment": environment_arns[i % len(environment_arns)],
+                }
+            ],
+        )
+    for revision in range(revisions):
+        for i in range(definitions):
+            batch.register_job_definition(
+                jobDefinitionName=f"seed-{i}",
+                type="container",
+                containerProperties={
+                    "image": f"seed:{revision}",
+                    "vcpus": 1,
+                    "memory": 512,
+                },
+            )
+
+
+# counts the calls of every client made by the benchmarks
+metrics = Metrics()
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    # time func repeat times, then once more to find its peak memory and API calls
+    seconds: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    metrics.reset()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    calls = {
+        f"{service}.{operation}": stats["calls"]
+        for service, operations in metrics.snapshot().items()
+        for operation, stats in operations.items()
+    }
+    return {
+        "seconds": seconds,
+        "median_seconds": statistics.median(seconds),
+        "min_seconds": min(seconds),
+        "peak_memory_bytes": peak,
+        "calls": calls,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark chorecoral against a local moto server"
+    )
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--environments", type=int, default=200)
+    parser.add_argument("--queues", type=int, default=200)
+    parser.add_argument("--definitions", type=int, default=20)
+    parser.add_argument("--revisions", type=int, default=20)
+    parser.add_argument("--submit-jobs", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    # moto does not check these, but boto3 needs something to sign with
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+
+    endpoint_url = start_server()
+    account = Account(endpoint_url)
+    batch = boto3.client("batch", endpoint_url=endpoint_url)
+    seed(
+        batch,
+        account,
+        args.environments,
+        args.queues,
+        args.definitions,
+        args.revisions,
+    )
+
+    def build(builder: Builder, name_prefix: str = "benchmark") -> JobManager:
+        return builder.build(
+            account.service_role,
+            account.security_group,
+            account.subnets,
+            IMAGE_NAME,
+            IMAGE_TAG,
+            name_prefix=name_prefix,
+            max_pool_connections=50,
+        )
+
+    def new_builder(**kwargs) -> Builder:
+        # each with its own clients, so none are already warmed up
+        return Builder(
+            client_pool=ClientPool(),
+            endpoint_url=endpoint_url,
+            metrics=metrics,
+            **kwargs,
+        )
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    # the first build creates everything, later ones find it
+    created = iter(range(args.repeat + 1))
+    results["build_create"] = measure(
+        lambda: build(new_builder(), f"benchmark-create-{next(created)}"), args.repeat
+    )
+    manager = build(new_builder())
+    results["build_cold"] = measure(lambda: build(new_builder()), args.repeat)
+    warm_builder = new_builder(cache=MemoryResourceCache())
+    build(warm_builder)
+    results["build_warm"] = measure(lambda: build(warm_builder), args.repeat)
+
+    commands = [["true"]] * args.submit_jobs
+
+    def submit_serial() -> None:
+        for i, command in enumerate(commands):
+            manager.submit(f"serial-{i}", command)
+
+    def submit_bulk() -> None:
+        for result in manager.submit_many(
+            (f"bulk-{i}", command) for i, command in enumerate(commands)
+        ):
+            if result.error is not None:
+                raise result.error
+
+    results["submit_serial"] = measure(submit_serial, args.repeat)
+    results["submit_bulk"] = measure(submit_bulk, args.repeat)
+
+    # fill the queue up for listing
+    start = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
+        hours=1
+    )
+    listed = len(list(manager.get_all(start)))
+    for result in manager.submit_many(
+        (f"seed-{i}", ["true"]) for i in range(max(0, args.jobs - listed))
+    ):
+        if result.error is not None:
+            raise result.error
+
+    results["get_all"] = measure(
+        lambda: sum(1 for _ in manager.get_all(start)), args.repeat
+    )
+    results["get_all_sharded"] = measure(
+        lambda: sum(1 for _ in manager.get_all(start, shards=4)), args.repeat
+    )
+    results["get_table"] = measure(lambda: manager.get_table(start), args.repeat)
+
+    output = {
+        "created": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "sizes": {
+            "environments": args.environments,
+            "queues": args.queues,
+            "definitions": args.definitions,
+            "revisions": args.revisions,
+            "submit_jobs": args.submit_jobs,
+            "jobs": len(list(manager.get_all(start))),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+    for name, result in results.items():
+        print(
+            f"{name:>16} {result['median_seconds']:9.3f}s "
+            f"{result['peak_memory_bytes'] / 1024 / 1024:9.1f}MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
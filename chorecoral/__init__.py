@@ -1,8 +1,85 @@
+import contextlib
 import datetime
+import functools
+import inspect
+import json
 import re
-from typing import Any, Iterable, Union
-
-import boto3
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+)
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import as_completed, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from botocore.exceptions import ClientError
+
+from .cache import (  # noqa: F401
+    JobDescriptionCache,
+    MemoryResourceCache,
+    ResourceCache,
+    SqliteResourceCache,
+    resource_cache_key,
+)
+from .clients import DEFAULT_CLIENT_POOL, ClientPool
+from .coalesce import CoalescedTask, CoalescingSubmitter  # noqa: F401
+from .commands import array_dispatch_command, parse_serial_output  # noqa: F401
+from .constants import (  # noqa: F401
+    ACTIVE_JOB_STATUSES,
+    ARRAY_SIZE_MAX,
+    ARRAY_SIZE_MIN,
+    CANCELLABLE_JOB_STATUSES,
+    DEPENDS_ON_LIMIT,
+    DESCRIBE_JOBS_LIMIT,
+    DESCRIBE_RESOURCES_LIMIT,
+    FARGATE_MEMORY_VCPU,
+    JOB_STATUSES,
+    RUNNING_JOB_STATUSES,
+    SQS_BATCH_LIMIT,
+    SQS_WAIT_TIME_MAX,
+    SUBMIT_PAYLOAD_LIMIT,
+    TERMINAL_JOB_STATUSES,
+)
+from .locks import BuildLock, SingleFlight, SqliteBuildLock  # noqa: F401
+from .metrics import CallRecord, Metrics, statsd_sink  # noqa: F401
+from .poller import JobNotFoundError, JobPoller  # noqa: F401
+from .profiler import JobProfile, hourly_price, recommend_size  # noqa: F401
+from .sharded import (  # noqa: F401
+    LeastLoadedPolicy,
+    RoundRobinPolicy,
+    ShardedJobManager,
+    WeightedPolicy,
+)
+from .table import JobTable  # noqa: F401
+from .tracker import JobTracker  # noqa: F401
+from .utils import (
+    SubmitResult,
+    call_with_backoff,
+    chunks,
+    imap_unordered,
+    paginate,
+    prefetch,
+    submit_concurrently,
+)
 
 
 class ComputeEnvironmentMismatchError(Exception):
@@ -21,17 +98,155 @@ class JobBlueprintCreationError(Exception):
     pass
 
 
+class ArrayJob:
+    job_id: str
+    size: int
+
+    def __init__(self, job_id: str, size: int):
+        self.job_id = job_id
+        self.size = size
+
+    def child_ids(self) -> List[str]:
+        # children of an array job are identified by the parent id and their index
+        return [f"{self.job_id}:{i}" for i in range(self.size)]
+
+
+def array_size(commands_or_size: Union[int, Sequence[Iterable[str]]]) -> int:
+    # the size of an array job, given either its size or a command per child
+    if isinstance(commands_or_size, int):
+        return commands_or_size
+    return len(commands_or_size)
+
+
+def created_meanwhile(
+    error: ClientError, get: Callable[[], Optional[str]]
+) -> Optional[str]:
+    # Batch reports creating something that already exists as a ClientException,
+    # so look for it again rather than failing
+    if error.response.get("Error", {}).get("Code") != "ClientException":
+        return None
+    return get()
+
+
+def create_or_get(create: Callable[[], str], get: Callable[[], Optional[str]]) -> str:
+    # create something, or if another process created it first use theirs
+    try:
+        return create()
+    except ClientError as e:
+        existing = created_meanwhile(e, get)
+        if existing is None:
+            raise
+        return existing
+
+
+class StopResult(NamedTuple):
+    job_id: str
+    # only known for jobs found by listing
+    name: Optional[str]
+    # "cancel" or "terminate"
+    action: str
+    # set if the job could not be stopped
+    error: Optional[BaseException]
+
+
+class GraphNode(NamedTuple):
+    name: str
+    command: Iterable[str] = ()
+    # submit an array job instead, of either a number of children running command
+    # or one command per child
+    array: Union[None, int, Sequence[Iterable[str]]] = None
+
+
+# where AWS Batch sends job logs unless the blueprint says otherwise
+# https://docs.aws.amazon.com/batch/latest/userguide/using_awslogs.html
+DEFAULT_LOG_GROUP = "/aws/batch/job"
+
+# given to AWS Batch as why jobs were stopped, unless told otherwise
+DEFAULT_STOP_REASON = "stopped by chorecoral"
+
+# shared by every Builder, so concurrent builds of the same resources coalesce
+BUILD_FLIGHTS = SingleFlight()
+
+# run by jobs that only gather up the dependencies of another job
+BARRIER_COMMAND = ["true"]
+
+
 class JobManager:
     queue: str
     blueprint: str
     client: Any
-
-    def __init__(self, batch_client, queue: str, blueprint: str):
+    poller: JobPoller
+    # descriptions of jobs recently asked for
+    descriptions: JobDescriptionCache
+    # SQS queue that job state change events are sent to, if built with events
+    events_queue_url: Optional[str]
+    sqs_client: Any
+    # counts the calls made by the clients, if given
+    metrics: Optional[Metrics]
+
+    def __init__(
+        self,
+        batch_client,
+        queue: str,
+        blueprint: str,
+        events_queue_url: Optional[str] = None,
+        sqs_client=None,
+        logs_client=None,
+        metrics: Optional[Metrics] = None,
+        logs_client_factory: Optional[Callable[[], Any]] = None,
+    ):
+        # None uses the shared default client
+        if batch_client is None:
+            batch_client = DEFAULT_CLIENT_POOL.get("batch")
         self.client = batch_client
         self.queue = queue
         self.blueprint = blueprint
-
-    def submit(self, name: str, command: Iterable[str]) -> str:
+        # shared by everything waiting on this manager's jobs
+        self.poller = JobPoller(batch_client)
+        self.descriptions = JobDescriptionCache()
+        self.events_queue_url = events_queue_url
+        if events_queue_url is not None and sqs_client is None:
+            sqs_client = DEFAULT_CLIENT_POOL.get(
+                "sqs", region_name=batch_client.meta.region_name
+            )
+        self.sqs_client = sqs_client
+        # None gets one on first use, as most managers never read logs, from the
+        # factory or else the shared default client for the same region
+        self._logs_client = logs_client
+        self._logs_client_factory = logs_client_factory
+        self.metrics = metrics
+        if metrics is not None:
+            for client in (batch_client, sqs_client, logs_client):
+                if client is not None:
+                    metrics.instrument(client)
+
+    @property
+    def logs_client(self):
+        if self._logs_client is None:
+            if self._logs_client_factory is not None:
+                logs_client = self._logs_client_factory()
+            else:
+                logs_client = DEFAULT_CLIENT_POOL.get(
+                    "logs", region_name=self.client.meta.region_name
+                )
+            if self.metrics is not None:
+                self.metrics.instrument(logs_client)
+            self._logs_client = logs_client
+        return self._logs_client
+
+    def _max_workers(self, max_workers: Optional[int], client=None) -> int:
+        # by default use one thread per connection the client can make
+        if max_workers is None:
+            client = self.client if client is None else client
+            max_workers = client.meta.config.max_pool_connections
+        return max_workers
+
+    def submit(
+        self,
+        name: str,
+        command: Iterable[str],
+        depends_on: Iterable[Dict[str, str]] = (),
+    ) -> str:
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.submit_job
 
         # optionally add a command if specified
@@ -39,57 +254,872 @@ class JobManager:
         if command:
             containerOverrides["command"] = command
 
+        # optionally wait for other jobs to finish first
+        kwargs = {}
+        depends_on = list(depends_on)
+        if depends_on:
+            kwargs["dependsOn"] = depends_on
+
         response = self.client.submit_job(
             jobName=name,
             jobQueue=self.queue,
             jobDefinition=self.blueprint,
             containerOverrides=containerOverrides,
+            **kwargs,
         )
 
         return response["jobId"]
 
-    def get_all(self, created_after: datetime.datetime):
+    def submit_many(
+        self,
+        jobs: Iterable[Tuple[str, Iterable[str]]],
+        max_workers: Optional[int] = None,
+    ) -> Iterator[SubmitResult]:
+        # submit (name, command) pairs concurrently, yielding results as they finish
+        # which is not necessarily the order they were given in
+
+        max_workers = self._max_workers(max_workers)
+        return submit_concurrently(self.submit, jobs, max_workers)
+
+    def submit_array(
+        self,
+        name: str,
+        commands_or_size: Union[int, Sequence[Iterable[str]]],
+        command: Iterable[str] = [],
+        depends_on: Iterable[Dict[str, str]] = (),
+    ) -> ArrayJob:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.submit_job
+
+        # either a number of identical children, or one command per child
+        size = array_size(commands_or_size)
+        if not isinstance(commands_or_size, int):
+            command = array_dispatch_command(commands_or_size)
+
+        if size < ARRAY_SIZE_MIN or size > ARRAY_SIZE_MAX:
+            raise ValueError(
+                f"array size {size} not between {ARRAY_SIZE_MIN} and {ARRAY_SIZE_MAX}"
+            )
+
+        # optionally add a command if specified
+        containerOverrides = {}
+        if command:
+            containerOverrides["command"] = list(command)
+
+        # the whole array is one request, so all the commands must fit in it
+        payload_size = len(json.dumps(containerOverrides))
+        if payload_size > SUBMIT_PAYLOAD_LIMIT:
+            raise ValueError(
+                f"overrides are {payload_size} bytes, more than {SUBMIT_PAYLOAD_LIMIT}"
+            )
+
+        # optionally wait for other jobs to finish first
+        kwargs = {}
+        depends_on = list(depends_on)
+        if depends_on:
+            kwargs["dependsOn"] = depends_on
+
+        response = self.client.submit_job(
+            jobName=name,
+            jobQueue=self.queue,
+            jobDefinition=self.blueprint,
+            arrayProperties={"size": size},
+            containerOverrides=containerOverrides,
+            **kwargs,
+        )
+
+        return ArrayJob(response["jobId"], size)
+
+    def _fan_in(
+        self, name: str, depends_on: List[Dict[str, str]]
+    ) -> List[Dict[str, str]]:
+        # A job can only depend on so many others, so any over that are gathered up
+        # by barrier jobs that depend on them instead, in as many rounds as needed.
+        # Array child to child dependencies have to stay on the job itself.
+        typed = [dependency for dependency in depends_on if "type" in dependency]
+        plain = [dependency for dependency in depends_on if "type" not in dependency]
+        room = DEPENDS_ON_LIMIT - len(typed)
+        if room < 0 or (room == 0 and plain):
+            raise ValueError(f"'{name}' has too many array dependencies")
+        barriers = 0
+        while len(plain) > room:
+            gathered = []
+            for chunk in chunks(plain, DEPENDS_ON_LIMIT):
+                job_id = call_with_backoff(
+                    self.submit,
+                    f"{name}_barrier_{barriers}",
+                    BARRIER_COMMAND,
+                    depends_on=chunk,
+                )
+                gathered.append({"jobId": job_id})
+                barriers += 1
+            plain = gathered
+        return typed + plain
+
+    def submit_graph(
+        self,
+        nodes: Mapping[Hashable, Union[GraphNode, Tuple]],
+        edges: Iterable[Tuple[Hashable, Hashable]],
+        max_workers: Optional[int] = None,
+    ) -> Dict[Hashable, str]:
+        # Submit every job of a graph up front, each depending on its parents
+        # through dependsOn, so Batch starts each job as soon as its parents finish.
+        # Nodes are GraphNodes (or tuples of their fields) and edges are (parent,
+        # child) pairs. Returns the job id of each node.
+        #
+        # Jobs are submitted a level at a time, all of a level concurrently, as a
+        # job can only depend on jobs that already exist. If a submission fails,
+        # those already submitted are left as they are.
+        graph = {
+            key: node if isinstance(node, GraphNode) else GraphNode(*node)
+            for key, node in nodes.items()
+        }
+        parents: Dict[Hashable, List[Hashable]] = {key: [] for key in graph}
+        children: Dict[Hashable, List[Hashable]] = {key: [] for key in graph}
+        for parent, child in dict.fromkeys(edges):
+            if parent not in graph or child not in graph:
+                raise ValueError(f"edge ({parent!r}, {child!r}) not between nodes")
+            parents[child].append(parent)
+            children[parent].append(child)
+
+        # group nodes into levels, each depending only on earlier levels
+        levels = []
+        waiting = {key: len(parents[key]) for key in graph}
+        level = [key for key, count in waiting.items() if count == 0]
+        while level:
+            levels.append(level)
+            following = []
+            for key in level:
+                for child in children[key]:
+                    waiting[child] -= 1
+                    if waiting[child] == 0:
+                        following.append(child)
+            level = following
+        if sum(len(level) for level in levels) != len(graph):
+            raise ValueError("graph has a cycle")
+
+        max_workers = self._max_workers(max_workers)
+
+        job_ids: Dict[Hashable, str] = {}
+
+        def submit(key: Hashable) -> str:
+            node = graph[key]
+            depends_on = []
+            for parent in parents[key]:
+                dependency = {"jobId": job_ids[parent]}
+                # arrays of the same size can depend child on child
+                parent_array = graph[parent].array
+                if (
+                    node.array is not None
+                    and parent_array is not None
+                    and array_size(node.array) == array_size(parent_array)
+                ):
+                    dependency["type"] = "N_TO_N"
+                depends_on.append(dependency)
+            depends_on = self._fan_in(node.name, depends_on)
+
+            if node.array is None:
+                return call_with_backoff(
+                    self.submit, node.name, node.command, depends_on=depends_on
+                )
+            return call_with_backoff(
+                self.submit_array,
+                node.name,
+                node.array,
+                node.command,
+                depends_on=depends_on,
+            ).job_id
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            for level in levels:
+                for key, job_id in zip(level, executor.map(submit, level)):
+                    job_ids[key] = job_id
+        return job_ids
+
+    def get_children(
+        self,
+        array_job_id: str,
+        statuses: Iterable[str] = JOB_STATUSES,
+        max_results: Optional[int] = None,
+    ):
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.list_jobs
 
+        # filters are not applied to children of array jobs, and without a status
+        # only RUNNING jobs are returned, so ask for each status in turn
+        for status in statuses:
+            yield from paginate(
+                self.client.list_jobs,
+                "jobSummaryList",
+                max_results,
+                arrayJobId=array_job_id,
+                jobStatus=status,
+            )
+
+    def get_all(
+        self,
+        created_after: datetime.datetime,
+        expand_arrays: bool = False,
+        shards: int = 1,
+        ordered: bool = False,
+        max_workers: Optional[int] = None,
+        max_results: Optional[int] = None,
+    ):
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.list_jobs
+
+        # optionally list slices of time in parallel
+        if shards > 1:
+            yield from self._get_all_sharded(
+                created_after, expand_arrays, shards, ordered, max_workers, max_results
+            )
+            return
+
         # convert created_after into a miliseconds since 1970 value
         created_miliseconds = str(int(created_after.timestamp() * 1000))
 
-        nextToken = None
-        first = True
-        while first or nextToken:
-            kwargs = {}
-            # handle a non-first page
-            if nextToken:
-                kwargs["nextToken"] = nextToken
+        jobs = paginate(
+            self.client.list_jobs,
+            "jobSummaryList",
+            max_results,
+            jobQueue=self.queue,
+            # filter to jobs after a date
+            # using a filter means all statuses returned
+            filters=[
+                {"name": "JOB_DEFINITION", "values": [self.blueprint]},
+                {"name": "AFTER_CREATED_AT", "values": [created_miliseconds]},
+            ],
+        )
+        for job in jobs:
+            yield job
+            # array parents report their size, children report their index
+            if expand_arrays and "size" in job.get("arrayProperties", {}):
+                yield from self.get_children(job["jobId"], max_results=max_results)
 
-            response = self.client.list_jobs(
+        # no more matches found
+
+    def count_jobs(
+        self, statuses: Iterable[str] = JOB_STATUSES, limit: Optional[int] = None
+    ) -> int:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.list_jobs
+
+        # how many jobs in the queue are in any of the statuses, from any blueprint,
+        # stopping at limit if given rather than listing every one of them
+        count = 0
+        for status in statuses:
+            for _ in paginate(
+                self.client.list_jobs,
+                "jobSummaryList",
+                # don't ask for a page that may not be needed
+                prefetch_pages=0 if limit is not None else 1,
                 jobQueue=self.queue,
-                # filter to jobs after a date
-                # using a filter means all statuses returned
-                filters=[
-                    {"name": "JOB_DEFINITION", "values": [self.blueprint]},
-                    {"name": "AFTER_CREATED_AT", "values": [created_miliseconds]},
-                ],
-                **kwargs,
-            )
-            for job in response["jobSummaryList"]:
-                yield job
+                jobStatus=status,
+            ):
+                count += 1
+                if limit is not None and count >= limit:
+                    return count
+        return count
+
+    def _stop_all(
+        self,
+        jobs: Iterable[Tuple[str, Optional[str], str]],
+        reason: str,
+        max_workers: Optional[int],
+    ) -> Iterator[StopResult]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.cancel_job
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.terminate_job
+
+        # stop (job id, name, action) triples concurrently, yielding results as they
+        # finish. Only a few more are taken from jobs than are in flight.
+
+        max_workers = self._max_workers(max_workers)
+        methods = {
+            "cancel": self.client.cancel_job,
+            "terminate": self.client.terminate_job,
+        }
+
+        def stop(job: Tuple[str, Optional[str], str]) -> None:
+            job_id, _, action = job
+            call_with_backoff(methods[action], jobId=job_id, reason=reason)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            for _, (job_id, name, action), future in imap_unordered(
+                executor, stop, jobs, max_workers * 2
+            ):
+                # a failure of one job should not stop the rest
+                yield StopResult(job_id, name, action, future.exception())
+
+    def terminate(
+        self,
+        job_ids: Iterable[str],
+        reason: str = DEFAULT_STOP_REASON,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[StopResult]:
+        # terminate the jobs concurrently, yielding results as they finish
+        yield from self._stop_all(
+            ((job_id, None, "terminate") for job_id in job_ids), reason, max_workers
+        )
+
+    def cancel_where(
+        self,
+        statuses: Iterable[str] = ACTIVE_JOB_STATUSES,
+        created_after: Optional[datetime.datetime] = None,
+        name_prefix: Optional[str] = None,
+        reason: str = DEFAULT_STOP_REASON,
+        max_workers: Optional[int] = None,
+        max_passes: int = 3,
+    ) -> Iterator[StopResult]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.list_jobs
 
-            # mark that we've finished the first page
-            first = False
-            # move to the next page, if applicable
-            if "nextToken" in response and response["nextToken"]:
-                nextToken = response["nextToken"]
+        # Stop every job in the queue, from any blueprint, that is in one of the
+        # statuses and matches the other filters. Those not started are cancelled
+        # and the rest terminated, concurrently while the listing continues, with
+        # results yielded as they finish. Listing filters cannot be combined with a
+        # status, so each status is listed on its own and the rest filtered here.
+        # Another pass is made for jobs the listing missed while it changed, and
+        # to retry those that failed, until one finds nothing or max_passes is
+        # reached. So a job that failed to stop may be yielded again.
+        statuses = list(statuses)
+        created_miliseconds = (
+            None if created_after is None else created_after.timestamp() * 1000
+        )
+        # asked to stop, or about to be
+        handled: Set[str] = set()
+
+        def matching() -> Iterator[Tuple[str, Optional[str], str]]:
+            for status in statuses:
+                action = "cancel" if status in CANCELLABLE_JOB_STATUSES else "terminate"
+                for job in paginate(
+                    self.client.list_jobs,
+                    "jobSummaryList",
+                    jobQueue=self.queue,
+                    jobStatus=status,
+                ):
+                    if job["jobId"] in handled:
+                        continue
+                    if (
+                        created_miliseconds is not None
+                        and job["createdAt"] <= created_miliseconds
+                    ):
+                        continue
+                    if name_prefix is not None and not job["jobName"].startswith(
+                        name_prefix
+                    ):
+                        continue
+                    handled.add(job["jobId"])
+                    yield job["jobId"], job["jobName"], action
+
+        for _ in range(max_passes):
+            found = False
+            for result in self._stop_all(matching(), reason, max_workers):
+                found = True
+                if result.error is not None:
+                    # try again on the next pass
+                    handled.discard(result.job_id)
+                yield result
+            if not found:
+                return
+
+    def describe(
+        self,
+        job_ids: Iterable[str],
+        max_workers: Optional[int] = None,
+        refresh: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_jobs
+
+        # full descriptions of the jobs, by job id, leaving out any that are not
+        # found. Those described recently enough are taken from the cache unless
+        # refresh is set, and the rest described 100 at a time concurrently.
+        job_ids = list(dict.fromkeys(job_ids))
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for job_id in job_ids:
+            job = None if refresh else self.descriptions.get(job_id)
+            if job is None:
+                missing.append(job_id)
             else:
-                # no next page
-                nextToken = None
+                found[job_id] = job
+        if not missing:
+            return found
+
+        max_workers = self._max_workers(max_workers)
+
+        def describe_chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+            return call_with_backoff(self.client.describe_jobs, jobs=chunk)["jobs"]
+
+        chunked = list(chunks(missing, DESCRIBE_JOBS_LIMIT))
+        with ThreadPoolExecutor(min(max_workers, len(chunked))) as executor:
+            for jobs in executor.map(describe_chunk, chunked):
+                for job in jobs:
+                    self.descriptions.set(job)
+                    found[job["jobId"]] = job
+        return {job_id: found[job_id] for job_id in job_ids if job_id in found}
+
+    def _log_stream(self, job: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        # the log group and stream of a job, the stream only once it has started
+        container = job.get("container", {})
+        options = container.get("logConfiguration", {}).get("options", {})
+        return (
+            options.get("awslogs-group", DEFAULT_LOG_GROUP),
+            container.get("logStreamName"),
+        )
 
-        # no more matches found
+    def _log_pages(
+        self, job_id: str, follow: bool, poll_interval: float, limit: Optional[int]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/logs.html#CloudWatchLogs.Client.get_log_events
+        kwargs: Dict[str, Any] = {"startFromHead": True}
+        if limit is not None:
+            kwargs["limit"] = limit
+        stream = None
+        finished = False
+        while True:
+            if stream is None:
+                job = self.describe([job_id], refresh=follow).get(job_id)
+                if job is None:
+                    raise JobNotFoundError(job_id)
+                group, stream = self._log_stream(job)
+                if stream is None:
+                    # not started yet
+                    if not follow or job["status"] in TERMINAL_JOB_STATUSES:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+
+            try:
+                response = call_with_backoff(
+                    self.logs_client.get_log_events,
+                    logGroupName=group,
+                    logStreamName=stream,
+                    **kwargs,
+                )
+            except ClientError as e:
+                # the stream is created a moment after the job starts
+                if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                    raise
+                if not follow or finished:
+                    return
+                response = {"events": [], "nextForwardToken": kwargs.get("nextToken")}
+            yield response["events"]
+
+            # the same token back again means there is nothing more for now
+            token = response["nextForwardToken"]
+            if token != kwargs.get("nextToken"):
+                kwargs["nextToken"] = token
+                continue
+            if not follow or finished:
+                return
+            # read once more after the job finishes, for anything written since
+            job = self.describe([job_id], refresh=True).get(job_id)
+            if job is None or job["status"] in TERMINAL_JOB_STATUSES:
+                finished = True
+            else:
+                time.sleep(poll_interval)
+
+    def logs(
+        self,
+        job_id: str,
+        follow: bool = False,
+        poll_interval: float = 5.0,
+        limit: Optional[int] = None,
+        prefetch_pages: int = 1,
+    ) -> Iterator[Dict[str, Any]]:
+        # Yield the log events of a job, oldest first. With follow this keeps
+        # waiting for more until the job has finished, otherwise it stops at the
+        # end of what has been written so far. Only prefetch_pages pages are held
+        # ahead of the caller.
+        pages = self._log_pages(job_id, follow, poll_interval, limit)
+        if prefetch_pages > 0:
+            pages = prefetch(pages, prefetch_pages)
+        try:
+            for events in pages:
+                yield from events
+        finally:
+            pages.close()
+
+    def logs_many(
+        self,
+        job_ids: Iterable[str],
+        tail: int = 100,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        # The last tail log events of each job, oldest first, for example to see why
+        # a lot of jobs failed. Jobs are described together, then their logs
+        # fetched concurrently. Jobs that never started have no events.
+        jobs = self.describe(job_ids, max_workers=max_workers)
+
+        max_workers = self._max_workers(max_workers, self.logs_client)
+
+        def tail_events(job: Dict[str, Any]) -> List[Dict[str, Any]]:
+            group, stream = self._log_stream(job)
+            if stream is None:
+                return []
+            try:
+                response = call_with_backoff(
+                    self.logs_client.get_log_events,
+                    logGroupName=group,
+                    logStreamName=stream,
+                    startFromHead=False,
+                    limit=tail,
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                    raise
+                return []
+            return response["events"]
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            return dict(zip(jobs, executor.map(tail_events, jobs.values())))
+
+    def get_table(self, created_after: datetime.datetime, **kwargs) -> JobTable:
+        # like get_all, but collected into compact columns rather than a dict each
+        # takes the same arguments as get_all
+        return JobTable(self.get_all(created_after, **kwargs))
+
+    def _sizes(self) -> Tuple[Optional[float], Optional[int], Optional[int]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_job_definitions
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_compute_environments
+
+        # vcpu and memory of each job, and the most vCPUs the queue can use at once
+        vcpu = memory = max_vcpus = None
+        response = self.client.describe_job_definitions(jobDefinitions=[self.blueprint])
+        for blueprint in response["jobDefinitions"]:
+            properties = blueprint.get("containerProperties", {})
+            requirements = {
+                requirement["type"]: requirement["value"]
+                for requirement in properties.get("resourceRequirements", [])
+            }
+            if "VCPU" in requirements:
+                vcpu = float(requirements["VCPU"])
+            if "MEMORY" in requirements:
+                memory = int(requirements["MEMORY"])
+
+        response = self.client.describe_job_queues(jobQueues=[self.queue])
+        environment_arns = [
+            order["computeEnvironment"]
+            for job_queue in response["jobQueues"]
+            for order in job_queue["computeEnvironmentOrder"]
+        ]
+        if environment_arns:
+            response = self.client.describe_compute_environments(
+                computeEnvironments=environment_arns
+            )
+            max_vcpus = sum(
+                environment["computeResources"]["maxvCpus"]
+                for environment in response["computeEnvironments"]
+            )
+        return vcpu, memory, max_vcpus
+
+    def profile(self, created_after: datetime.datetime, **kwargs) -> JobProfile:
+        # Where the time of the jobs created since then went: waiting to start,
+        # running, and how many ran at once against what the queue allows. Built
+        # while the listing is read, so jobs are never all held at once.
+        # takes the same arguments as get_all
+        profile = JobProfile(*self._sizes())
+        profile.extend(self.get_all(created_after, **kwargs))
+        return profile
+
+    def futures(self, job_ids: Iterable[str]) -> Dict[str, Future]:
+        # each future resolves to the job description once the job has finished
+        return self.poller.watch_all(job_ids)
+
+    def as_completed(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        # yield each job description as the job finishes
+        for future in as_completed(self.futures(job_ids).values(), timeout):
+            yield future.result()
+
+    def wait(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        # wait for all the jobs to finish, returning their descriptions in order
+        futures = self.futures(job_ids)
+        _, not_done = wait(futures.values(), timeout, ALL_COMPLETED)
+        if not_done:
+            raise FuturesTimeoutError(f"{len(not_done)} jobs not finished")
+        return [future.result() for future in futures.values()]
+
+    def events(
+        self,
+        wait_time: int = SQS_WAIT_TIME_MAX,
+        max_empty_receives: Optional[int] = None,
+        dedupe_size: int = 10000,
+    ) -> Iterator[Dict[str, Any]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sqs.html#SQS.Client.receive_message
+
+        # Yield the detail of each job state change event, which is a job
+        # description as of that change, as EventBridge delivers them. Long polling
+        # means this waits on SQS rather than calling Batch at all.
+        #
+        # Delivery is at least once and not in order, so repeats of a job and status
+        # seen recently are skipped. Messages are only deleted once yielded, so any
+        # not yet yielded when this stops will be received again later.
+        if self.events_queue_url is None:
+            raise ValueError("manager was not built with events")
+
+        seen: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        empty_receives = 0
+        while max_empty_receives is None or empty_receives < max_empty_receives:
+            response = call_with_backoff(
+                self.sqs_client.receive_message,
+                QueueUrl=self.events_queue_url,
+                MaxNumberOfMessages=SQS_BATCH_LIMIT,
+                WaitTimeSeconds=wait_time,
+            )
+            messages = response.get("Messages", [])
+            if not messages:
+                empty_receives += 1
+                continue
+            empty_receives = 0
+
+            handled = []
+            try:
+                for message in messages:
+                    handled.append(message)
+                    detail = json.loads(message["Body"]).get("detail", {})
+                    key = (detail.get("jobId"), detail.get("status"))
+                    if key in seen:
+                        seen.move_to_end(key)
+                        continue
+                    seen[key] = None
+                    if len(seen) > dedupe_size:
+                        seen.popitem(last=False)
+                    yield detail
+            finally:
+                # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sqs.html#SQS.Client.delete_message_batch
+                # at most ten per receive, so one request deletes them all
+                if handled:
+                    call_with_backoff(
+                        self.sqs_client.delete_message_batch,
+                        QueueUrl=self.events_queue_url,
+                        Entries=[
+                            {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+                            for i, message in enumerate(handled)
+                        ],
+                    )
+
+    def _get_shard_page(
+        self,
+        start: int,
+        end: Optional[int],
+        nextToken: Optional[str],
+        max_results: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        # one page of the jobs created in milliseconds [start, end)
+        # both filters are exclusive so widen them by one
+        filters = [
+            {"name": "JOB_DEFINITION", "values": [self.blueprint]},
+            {"name": "AFTER_CREATED_AT", "values": [str(start - 1)]},
+        ]
+        if end is not None:
+            filters.append({"name": "BEFORE_CREATED_AT", "values": [str(end)]})
+
+        kwargs = {}
+        # handle a non-first page
+        if nextToken:
+            kwargs["nextToken"] = nextToken
+        if max_results is not None:
+            kwargs["maxResults"] = max_results
+
+        return call_with_backoff(
+            self.client.list_jobs, jobQueue=self.queue, filters=filters, **kwargs
+        )
+
+    def _get_all_sharded(
+        self,
+        created_after: datetime.datetime,
+        expand_arrays: bool,
+        shards: int,
+        ordered: bool,
+        max_workers: Optional[int],
+        max_results: Optional[int] = None,
+        split_after_pages: int = 3,
+    ):
+        # Split the time since created_after into shards and page through them
+        # concurrently. A shard that is still going after a few pages is dense, so
+        # what is left of it is split in two so more threads can work on it.
+
+        start = int(created_after.timestamp() * 1000) + 1
+        now = int(datetime.datetime.now(tz=datetime.timezone.utc).timestamp() * 1000)
+        bounds = [start + (now - start) * i // shards for i in range(shards)]
+        # the last shard is open ended, to match the unsharded listing
+        ranges = list(zip(bounds, bounds[1:] + [None]))
+
+        max_workers = self._max_workers(max_workers)
+
+        # shards overlap where they are split so jobs may be listed twice
+        seen = set()
+        found = []
+        with ThreadPoolExecutor(max_workers) as executor:
+            # future -> (start, end, pages so far)
+            pending: Dict[Future, Tuple[int, Optional[int], int]] = {}
+            for shard_start, shard_end in ranges:
+                future = executor.submit(
+                    self._get_shard_page, shard_start, shard_end, None, max_results
+                )
+                pending[future] = (shard_start, shard_end, 0)
+
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        shard_start, shard_end, pages = pending.pop(future)
+                        response = future.result()
+                        pages += 1
+
+                        jobs = response["jobSummaryList"]
+                        for job in jobs:
+                            if job["jobId"] in seen:
+                                continue
+                            seen.add(job["jobId"])
+                            if ordered:
+                                found.append(job)
+                            else:
+                                yield job
+                                if expand_arrays and "size" in job.get(
+                                    "arrayProperties", {}
+                                ):
+                                    yield from self.get_children(
+                                        job["jobId"], max_results=max_results
+                                    )
+
+                        nextToken = response.get("nextToken")
+                        if not nextToken:
+                            # this shard is finished
+                            continue
+
+                        # jobs are listed newest first, so everything not yet
+                        # listed in this shard is no newer than the oldest so far
+                        oldest = min((job["createdAt"] for job in jobs), default=None)
+                        if (
+                            pages >= split_after_pages
+                            and oldest is not None
+                            and oldest - shard_start >= 1
+                        ):
+                            middle = (shard_start + oldest + 1) // 2
+                            for split_start, split_end in (
+                                (shard_start, middle),
+                                (middle, oldest + 1),
+                            ):
+                                future = executor.submit(
+                                    self._get_shard_page,
+                                    split_start,
+                                    split_end,
+                                    None,
+                                    max_results,
+                                )
+                                pending[future] = (split_start, split_end, 0)
+                        else:
+                            future = executor.submit(
+                                self._get_shard_page,
+                                shard_start,
+                                shard_end,
+                                nextToken,
+                                max_results,
+                            )
+                            pending[future] = (shard_start, shard_end, pages)
+            finally:
+                # if the consumer stops early, do not fetch anything else
+                for future in pending:
+                    future.cancel()
+
+        if ordered:
+            # newest first, the same as an unsharded listing
+            found.sort(key=lambda job: job["createdAt"], reverse=True)
+            for job in found:
+                yield job
+                if expand_arrays and "size" in job.get("arrayProperties", {}):
+                    yield from self.get_children(job["jobId"], max_results=max_results)
 
 
 class Builder:
-    def __init__(self):
-        pass
+    cache: Optional[ResourceCache]
+    verify_cache: bool
+    client_pool: ClientPool
+    region_name: Optional[str]
+    profile_name: Optional[str]
+    retry_mode: Optional[str]
+    metrics: Optional[Metrics]
+    # talk to somewhere other than AWS, such as moto running as a server
+    endpoint_url: Optional[str]
+    # held while resolving resources, to coordinate with other processes
+    build_lock: Optional[BuildLock]
+
+    def __init__(
+        self,
+        cache: Optional[ResourceCache] = None,
+        verify_cache: bool = True,
+        client_pool: Optional[ClientPool] = None,
+        region_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        retry_mode: Optional[str] = None,
+        metrics: Optional[Metrics] = None,
+        endpoint_url: Optional[str] = None,
+        build_lock: Optional[BuildLock] = None,
+    ):
+        self.cache = cache
+        self.verify_cache = verify_cache
+        # share clients with other builders unless told otherwise
+        self.client_pool = (
+            client_pool if client_pool is not None else DEFAULT_CLIENT_POOL
+        )
+        self.region_name = region_name
+        self.profile_name = profile_name
+        self.retry_mode = retry_mode
+        # counts the calls made by builds and the managers they return
+        self.metrics = metrics
+        self.endpoint_url = endpoint_url
+        # best paired with a cache shared between the same processes, such as a
+        # SqliteResourceCache, so that those waiting take what the holder resolved
+        self.build_lock = build_lock
+
+    def _check_compute_environment(
+        self,
+        compute_environment: Dict[str, Any],
+        service_role_arn: str,
+        security_group_id: str,
+        subnet_ids: Iterable[str],
+        compute_type: str = "FARGATE",
+        max_vcpus: int = 100,
+    ) -> str:
+        env_type = compute_environment["type"]
+        env_state = compute_environment["state"]
+        env_status = compute_environment["status"]
+        env_status_reason = compute_environment.get("statusReason")
+        env_service_role = compute_environment["serviceRole"]
+        env_compute_type = compute_environment["computeResources"]["type"]
+        env_compute_maxvcpus = compute_environment["computeResources"]["maxvCpus"]
+        env_compute_securitygroupids = compute_environment["computeResources"][
+            "securityGroupIds"
+        ]
+        env_compute_subnets = compute_environment["computeResources"]["subnets"]
+
+        if env_type != "MANAGED":
+            raise ComputeEnvironmentMismatchError(f"type is {env_type}")
+        if env_state != "ENABLED":
+            raise ComputeEnvironmentMismatchError(f"state is {env_state}")
+        if env_status in ("DELETING", "DELETED", "INVALID"):
+            raise ComputeEnvironmentMismatchError(
+                f"status is {env_status} because {env_status_reason}"
+            )
+        if env_service_role != service_role_arn:
+            raise ComputeEnvironmentMismatchError(f"service role is {env_service_role}")
+        if env_compute_type != compute_type:
+            raise ComputeEnvironmentMismatchError(
+                f"type is {env_compute_type} not {compute_type}"
+            )
+        if env_compute_maxvcpus != max_vcpus:
+            raise ComputeEnvironmentMismatchError(
+                f"maxvCpus is {env_compute_maxvcpus} not {max_vcpus}"
+            )
+        if frozenset(env_compute_securitygroupids) != frozenset([security_group_id]):
+            raise ComputeEnvironmentMismatchError(
+                f"security group ids are {env_compute_securitygroupids}"
+            )
+        if frozenset(env_compute_subnets) != frozenset(subnet_ids):
+            raise ComputeEnvironmentMismatchError(f"subnets are {env_compute_subnets}")
+
+        # got to here without problem so we can use it
+        return compute_environment["computeEnvironmentArn"]
 
     def _get_compute_environment(
         self,
@@ -98,82 +1128,27 @@ class Builder:
         service_role_arn: str,
         security_group_id: str,
         subnet_ids: Iterable[str],
+        compute_type: str = "FARGATE",
+        max_vcpus: int = 100,
     ) -> Union[str, None]:
 
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_compute_environments
 
-        nextToken = None
-        first = True
-        while first or nextToken:
-            kwargs = {}
-            # handle a non-first page
-            if nextToken:
-                kwargs["nextToken"] = nextToken
-
-            response = batch_client.describe_compute_environments(
-                **kwargs,
-            )
-            for compute_environment in response["computeEnvironments"]:
-                if compute_environment["computeEnvironmentName"] == name:
-                    # found a name match
-                    env_type = compute_environment["type"]
-                    env_state = compute_environment["state"]
-                    env_status = compute_environment["status"]
-                    env_status_reason = compute_environment["statusReason"]
-                    env_service_role = compute_environment["serviceRole"]
-                    env_compute_type = compute_environment["computeResources"]["type"]
-                    env_compute_maxvcpus = compute_environment["computeResources"][
-                        "maxvCpus"
-                    ]
-                    env_compute_securitygroupids = compute_environment[
-                        "computeResources"
-                    ]["securityGroupIds"]
-                    env_compute_subnets = compute_environment["computeResources"][
-                        "subnets"
-                    ]
-
-                    if env_type != "MANAGED":
-                        raise ComputeEnvironmentMismatchError(f"type is {env_type}")
-                    if env_state != "DISABLED":
-                        raise ComputeEnvironmentMismatchError(f"state is {env_state}")
-                    if env_status not in ("DELETING", "DELETED", "INVALID"):
-                        raise ComputeEnvironmentMismatchError(
-                            f"status is {env_status} because {env_status_reason}"
-                        )
-                    if env_service_role != service_role_arn:
-                        raise ComputeEnvironmentMismatchError(
-                            f"service role is {env_service_role}"
-                        )
-                    if env_compute_type != "FARGATE":
-                        raise ComputeEnvironmentMismatchError(
-                            f"type is {env_compute_type}"
-                        )
-                    if env_compute_maxvcpus != 100:
-                        raise ComputeEnvironmentMismatchError(
-                            f"maxvCpus is {env_compute_type}"
-                        )
-                    if frozenset(env_compute_securitygroupids) != frozenset(
-                        [security_group_id]
-                    ):
-                        raise ComputeEnvironmentMismatchError(
-                            f"security group ids are {env_compute_type}"
-                        )
-                    if frozenset(env_compute_subnets) != frozenset(subnet_ids):
-                        raise ComputeEnvironmentMismatchError(
-                            f"subnets are {env_compute_type}"
-                        )
-
-                    # got to here without problem so we can use it
-                    return compute_environment["computeEnvironmentArn"]
-
-            # mark that we've finished the first page
-            first = False
-            # move to the next page, if applicable
-            if "nextToken" in response and response["nextToken"]:
-                nextToken = response["nextToken"]
-            else:
-                # no next page
-                nextToken = None
+        # ask for only the named environment rather than searching all of them
+        response = batch_client.describe_compute_environments(
+            computeEnvironments=[name],
+        )
+        for compute_environment in response["computeEnvironments"]:
+            if compute_environment["computeEnvironmentName"] == name:
+                # found a name match
+                return self._check_compute_environment(
+                    compute_environment,
+                    service_role_arn,
+                    security_group_id,
+                    subnet_ids,
+                    compute_type,
+                    max_vcpus,
+                )
 
         # no match found
         return None
@@ -185,6 +1160,8 @@ class Builder:
         service_role_arn: str,
         security_group_id: str,
         subnet_ids: Iterable[str],
+        compute_type: str = "FARGATE",
+        max_vcpus: int = 100,
     ) -> str:
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.create_compute_environment
         response = batch_client.create_compute_environment(
@@ -193,9 +1170,10 @@ class Builder:
             state="ENABLED",
             computeResources={
                 # https://aws.amazon.com/fargate/ - Serverless compute for containers
-                "type": "FARGATE",
+                # FARGATE_SPOT is cheaper but jobs may be interrupted
+                "type": compute_type,
                 # The maximum number of Amazon EC2 vCPUs that a compute environment can reach.
-                "maxvCpus": 100,
+                "maxvCpus": max_vcpus,
                 # The VPC subnets where the compute resources are launched. These subnets
                 # must be within the same VPC. Fargate compute resources can contain up to 16
                 # subnets. For more information, see VPCs and Subnets in the Amazon VPC User
@@ -222,95 +1200,168 @@ class Builder:
         service_role_arn: str,
         security_group_id: str,
         subnet_ids: Iterable[str],
+        compute_type: str = "FARGATE",
+        max_vcpus: int = 100,
     ) -> str:
-        # Note: this is vulnerable to race conditions if another process creates between
-        # the get and the create.
-        existing = self._get_compute_environment(
-            batch_client, name, service_role_arn, security_group_id, subnet_ids
+        get = functools.partial(
+            self._get_compute_environment,
+            batch_client,
+            name,
+            service_role_arn,
+            security_group_id,
+            subnet_ids,
+            compute_type,
+            max_vcpus,
         )
+        existing = get()
         if existing:
             return existing
-        else:
-            return self._create_compute_environment(
-                batch_client, name, service_role_arn, security_group_id, subnet_ids
+        # another process may create it between the get and the create
+        return create_or_get(
+            functools.partial(
+                self._create_compute_environment,
+                batch_client,
+                name,
+                service_role_arn,
+                security_group_id,
+                subnet_ids,
+                compute_type,
+                max_vcpus,
+            ),
+            get,
+        )
+
+    def _compute_environments(
+        self, name: str, max_vcpus: int, spot_vcpus: int
+    ) -> List[Tuple[str, str, int]]:
+        # (name, type, maxvCpus) of each compute environment a queue should use, in
+        # the order jobs are placed on them. Spot capacity is cheaper so it is used
+        # first, with on-demand taking whatever does not fit.
+        environments = []
+        if spot_vcpus > 0:
+            spot_name = name + "_spot"
+            if len(spot_name) > 128:
+                raise ValueError(f"name invalid '{spot_name}'")
+            environments.append((spot_name, "FARGATE_SPOT", spot_vcpus))
+        if max_vcpus > 0:
+            environments.append((name, "FARGATE", max_vcpus))
+        if not environments:
+            raise ValueError("no capacity asked for")
+        return environments
+
+    def _check_queue(
+        self, job_queue: Dict[str, Any], compute_environment_arns: Sequence[str]
+    ) -> str:
+        queue_state = job_queue["state"]
+        queue_status = job_queue["status"]
+        queue_status_reason = job_queue.get("statusReason")
+        queue_compute_envs = job_queue["computeEnvironmentOrder"]
+
+        if queue_state != "ENABLED":
+            raise JobQueueMismatchError(f"state is {queue_state}")
+        if queue_status in ("DELETING", "DELETED", "INVALID"):
+            raise JobQueueMismatchError(
+                f"status is {queue_status} because {queue_status_reason}"
             )
+        queue_compute_env_arns = [
+            order["computeEnvironment"]
+            for order in sorted(queue_compute_envs, key=lambda order: order["order"])
+        ]
+        if queue_compute_env_arns != list(compute_environment_arns):
+            raise JobQueueMismatchError(
+                f"compute environments are {queue_compute_env_arns}"
+            )
+
+        # got to here without problem so we can use it
+        return job_queue["jobQueueArn"]
 
     def _get_queue(
-        self, batch_client, name: str, compute_environment_arn: str
+        self, batch_client, name: str, compute_environment_arns: Sequence[str]
     ) -> Union[None, str]:
 
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_job_queues
 
-        nextToken = None
-        first = True
-        while first or nextToken:
-            kwargs = {}
-            # handle a non-first page
-            if nextToken:
-                kwargs["nextToken"] = nextToken
-
-            response = batch_client.describe_job_queues(
-                **kwargs,
-            )
-            for job_queue in response["jobQueues"]:
-                if job_queue["jobQueueName"] == name:
-                    # found a name match
-
-                    queue_state = job_queue["state"]
-                    queue_status = job_queue["status"]
-                    queue_status_reason = job_queue["statusReason"]
-                    queue_compute_envs = job_queue["computeEnvironmentOrder"]
-
-                    if queue_state != "DISABLED":
-                        raise JobQueueMismatchError(f"state is {queue_state}")
-                    if queue_status not in ("DELETING", "DELETED", "INVALID"):
-                        raise JobQueueMismatchError(
-                            f"status is {queue_status} because {queue_status_reason}"
-                        )
-                    if len(queue_compute_envs) != 1:
-                        raise JobQueueMismatchError(
-                            f"status is {queue_status} because {queue_status_reason}"
-                        )
-
-                    # got to here without problem so we can use it
-                    return job_queue["jobQueueArn"]
-
-            # mark that we've finished the first page
-            first = False
-            # move to the next page, if applicable
-            if "nextToken" in response and response["nextToken"]:
-                nextToken = response["nextToken"]
-            else:
-                # no next page
-                nextToken = None
+        # ask for only the named queue rather than searching all of them
+        response = batch_client.describe_job_queues(
+            jobQueues=[name],
+        )
+        for job_queue in response["jobQueues"]:
+            if job_queue["jobQueueName"] == name:
+                # found a name match
+                return self._check_queue(job_queue, compute_environment_arns)
 
         # no match found
         return None
 
     def _create_queue(
-        self, batch_client, name: str, compute_environment_arn: str
+        self, batch_client, name: str, compute_environment_arns: Sequence[str]
     ) -> str:
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.create_job_queue
         response = batch_client.create_job_queue(
             jobQueueName=name,
             state="ENABLED",
             priority=10,
+            # jobs are placed on the first environment with capacity for them
             computeEnvironmentOrder=[
-                {"order": 10, "computeEnvironment": compute_environment_arn}
+                {"order": 10 * (i + 1), "computeEnvironment": compute_environment_arn}
+                for i, compute_environment_arn in enumerate(compute_environment_arns)
             ],
         )
         return response["jobQueueArn"]
 
     def _get_or_create_queue(
-        self, batch_client, name: str, compute_environment_arn: str
+        self, batch_client, name: str, compute_environment_arns: Sequence[str]
     ) -> str:
-        # Note: this is vulnerable to race conditions if another process creates between
-        # the get and the create.
-        existing = self._get_queue(batch_client, name, compute_environment_arn)
+        existing = self._get_queue(batch_client, name, compute_environment_arns)
         if existing:
             return existing
-        else:
-            return self._create_queue(batch_client, name, compute_environment_arn)
+        # another process may create it between the get and the create
+        return create_or_get(
+            functools.partial(
+                self._create_queue, batch_client, name, compute_environment_arns
+            ),
+            functools.partial(
+                self._get_queue, batch_client, name, compute_environment_arns
+            ),
+        )
+
+    def _check_blueprint(
+        self,
+        blueprint: Dict[str, Any],
+        image: str,
+        vcpu: Union[float, int],
+        memory: int,
+    ) -> str:
+        if blueprint["type"] != "container":
+            raise JobBlueprintMismatchError(f"type is {blueprint['type']}")
+        if blueprint["containerProperties"]["image"] != image:
+            raise JobBlueprintMismatchError(
+                f"image is {blueprint['containerProperties']['image']} not {image}"
+            )
+        # vcpu and memory are set as resource requirements, which
+        # replaced the older top-level container properties
+        requirements = {
+            requirement["type"]: requirement["value"]
+            for requirement in blueprint["containerProperties"].get(
+                "resourceRequirements", []
+            )
+        }
+        blueprint_vcpu = requirements.get(
+            "VCPU", blueprint["containerProperties"].get("vcpus")
+        )
+        blueprint_memory = requirements.get(
+            "MEMORY", blueprint["containerProperties"].get("memory")
+        )
+        if blueprint_vcpu is None or float(blueprint_vcpu) != vcpu:
+            raise JobBlueprintMismatchError(f"vcpu is {blueprint_vcpu} not {vcpu}")
+        if blueprint_memory is None or int(blueprint_memory) != memory:
+            raise JobBlueprintMismatchError(
+                f"memory is {blueprint_memory} not {memory}"
+            )
+        # TODO more validation
+
+        # got to here without problem so we can use it
+        return blueprint["jobDefinitionArn"]
 
     def _get_blueprint(
         self,
@@ -319,54 +1370,28 @@ class Builder:
         image: str,
         vcpu: Union[float, int],
         memory: int,
-    ) -> str:
+    ) -> Union[str, None]:
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_job_definitions
 
-        nextToken = None
-        first = True
-        while first or nextToken:
-            kwargs = {}
-            # handle a non-first page
-            if nextToken:
-                kwargs["nextToken"] = nextToken
-
-            response = batch_client.describe_job_definitions(
-                **kwargs,
-            )
-            for blueprint in response["jobDefinitions"]:
-                if blueprint["jobDefinitionName"] == name:
-                    # found a name match
-
-                    if blueprint["type"] != "container":
-                        raise JobBlueprintMismatchError(f"type is {blueprint['type']}")
-                    if blueprint["containerProperties"]["image"] != image:
-                        raise JobBlueprintMismatchError(
-                            f"image is {blueprint['containerProperties']['image']} not {image}"
-                        )
-                    if float(blueprint["containerProperties"]["vcpus"]) != vcpu:
-                        raise JobBlueprintMismatchError(
-                            f"vcpu is {blueprint['containerProperties']['vcpus']} not {vcpu}"
-                        )
-                    if int(blueprint["containerProperties"]["memory"]) != memory:
-                        raise JobBlueprintMismatchError(
-                            f"memory is {blueprint['containerProperties']['memory']} not {memory}"
-                        )
-                    # TODO more validation
-
-                    # got to here without problem so we can use it
-                    return blueprint["jobDefinitionArn"]
+        # ask for only the active revisions of the named definition and use the
+        # newest of them, rather than searching every revision of everything
+        latest = None
+        for blueprint in paginate(
+            batch_client.describe_job_definitions,
+            "jobDefinitions",
+            jobDefinitionName=name,
+            status="ACTIVE",
+        ):
+            if blueprint["jobDefinitionName"] != name:
+                continue
+            if latest is None or blueprint["revision"] > latest["revision"]:
+                latest = blueprint
 
-            # mark that we've finished the first page
-            first = False
-            # move to the next page, if applicable
-            if "nextToken" in response and response["nextToken"]:
-                nextToken = response["nextToken"]
-            else:
-                # no next page
-                nextToken = None
+        if latest is None:
+            # no match found
+            return None
 
-        # no match found
-        return None
+        return self._check_blueprint(latest, image, vcpu, memory)
 
     def _create_blueprint(
         self,
@@ -379,42 +1404,9 @@ class Builder:
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.register_job_definition
 
         # only certain vcpu & memory combinations allowed on Fargate
-        permitted_memory_vcpu = {
-            512: (0.25,),
-            1024: (0.25, 0.5),
-            2048: (0.25, 0.5, 1),
-            3072: (0.5, 1),
-            4096: (0.5, 1, 2),
-            5120: (1, 2),
-            6144: (1, 2),
-            7168: (1, 2),
-            8192: (1, 2, 4),
-            9216: (2, 4),
-            10240: (2, 4),
-            11264: (2, 4),
-            12288: (2, 4),
-            13312: (2, 4),
-            14336: (2, 4),
-            15360: (2, 4),
-            16384: (2, 4),
-            17408: (4,),
-            18432: (4,),
-            19456: (4,),
-            20480: (4,),
-            21504: (4,),
-            22528: (4,),
-            23552: (4,),
-            24576: (4,),
-            25600: (4,),
-            26624: (4,),
-            27648: (4,),
-            28672: (4,),
-            29696: (4,),
-            30720: (4,),
-        }
-        if memory not in permitted_memory_vcpu:
+        if memory not in FARGATE_MEMORY_VCPU:
             raise JobBlueprintCreationError(f"memory {memory} not acceptable")
-        if vcpu not in permitted_memory_vcpu[memory]:
+        if vcpu not in FARGATE_MEMORY_VCPU[memory]:
             raise JobBlueprintCreationError(f"vcpu {vcpu} not acceptable")
 
         containerProperties = {
@@ -449,14 +1441,187 @@ class Builder:
         memory: int,
     ) -> str:
 
-        # Note: this is vulnerable to race conditions if another process creates between
-        # the get and the create.
+        # Registering again only adds a revision, so there is no conflict to notice
+        # here. Builds hold build_lock to avoid adding needless revisions.
         existing = self._get_blueprint(batch_client, name, image, vcpu, memory)
         if existing:
             return existing
         else:
             return self._create_blueprint(batch_client, name, image, vcpu, memory)
 
+    def _get_or_create_events_queue(self, sqs_client, name: str) -> Tuple[str, str]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sqs.html#SQS.Client.create_queue
+
+        # creating a queue that already exists with the same attributes returns it
+        response = sqs_client.create_queue(QueueName=name)
+        queue_url = response["QueueUrl"]
+        response = sqs_client.get_queue_attributes(
+            QueueUrl=queue_url, AttributeNames=["QueueArn"]
+        )
+        return queue_url, response["Attributes"]["QueueArn"]
+
+    def _get_or_create_events_rule(
+        self, events_client, name: str, job_queue_arn: str, queue_arn: str
+    ) -> str:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/events.html#EventBridge.Client.put_rule
+        # https://docs.aws.amazon.com/batch/latest/userguide/batch_cwe_events.html
+
+        # both of these create or update, so are safe to repeat
+        response = events_client.put_rule(
+            Name=name,
+            EventPattern=json.dumps(
+                {
+                    "source": ["aws.batch"],
+                    "detail-type": ["Batch Job State Change"],
+                    "detail": {"jobQueue": [job_queue_arn]},
+                }
+            ),
+            State="ENABLED",
+        )
+        events_client.put_targets(
+            Rule=name, Targets=[{"Id": "chorecoral", "Arn": queue_arn}]
+        )
+        return response["RuleArn"]
+
+    def _get_or_create_events(self, name: str, job_queue_arn: str) -> str:
+        # route state changes of jobs in the queue to an SQS queue of the same name
+        sqs_client = self._client(service_name="sqs")
+        events_client = self._client(service_name="events")
+        queue_url, queue_arn = self._get_or_create_events_queue(sqs_client, name)
+        rule_arn = self._get_or_create_events_rule(
+            events_client, name, job_queue_arn, queue_arn
+        )
+
+        # https://docs.aws.amazon.com/eventbridge/latest/userguide/eb-use-resource-based.html#eb-sqs-permissions
+        # allow only this rule to send to the queue
+        policy = {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Effect": "Allow",
+                    "Principal": {"Service": "events.amazonaws.com"},
+                    "Action": "sqs:SendMessage",
+                    "Resource": queue_arn,
+                    "Condition": {"ArnEquals": {"aws:SourceArn": rule_arn}},
+                }
+            ],
+        }
+        sqs_client.set_queue_attributes(
+            QueueUrl=queue_url, Attributes={"Policy": json.dumps(policy)}
+        )
+        return queue_url
+
+    def _verify_cached(self, batch_client, cached: Dict[str, str]) -> bool:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_job_queues
+
+        # a single call to check the cached queue still exists and is usable
+        response = batch_client.describe_job_queues(jobQueues=[cached["job_queue_arn"]])
+        for job_queue in response["jobQueues"]:
+            if job_queue["jobQueueArn"] != cached["job_queue_arn"]:
+                continue
+            if job_queue["state"] != "ENABLED":
+                return False
+            if job_queue["status"] in ("DELETING", "DELETED", "INVALID"):
+                return False
+            compute_environments = [
+                order["computeEnvironment"]
+                for order in job_queue["computeEnvironmentOrder"]
+            ]
+            return all(
+                cached[key] in compute_environments
+                for key in ("spot_compute_environment_arn", "compute_environment_arn")
+                if key in cached
+            )
+        # no longer exists
+        return False
+
+    def _cache_key(
+        self,
+        batch_client,
+        name: str,
+        service_role_arn: str,
+        security_group_id: str,
+        subnet_ids: Iterable[str],
+        image_full: str,
+        vcpu: Union[float, int],
+        memory: int,
+        events: bool,
+        max_vcpus: int,
+        spot_vcpus: int,
+    ) -> str:
+        return resource_cache_key(
+            # the same names resolve to other resources in another account or region
+            region_name=batch_client.meta.region_name,
+            profile_name=self.profile_name,
+            endpoint_url=self.endpoint_url,
+            name=name,
+            service_role_arn=service_role_arn,
+            security_group_id=security_group_id,
+            subnet_ids=sorted(subnet_ids),
+            image=image_full,
+            vcpu=vcpu,
+            memory=memory,
+            events=events,
+            max_vcpus=max_vcpus,
+            spot_vcpus=spot_vcpus,
+        )
+
+    def _get_cached(self, batch_client, cache_key: str) -> Optional[Dict[str, str]]:
+        # what a previous build with the same inputs resolved to, if still usable
+        if not self.cache:
+            return None
+        cached = self.cache.get(cache_key)
+        if (
+            cached
+            and self.verify_cache
+            and not self._verify_cached(batch_client, cached)
+        ):
+            # stale, so forget it and resolve from scratch
+            self.cache.delete(cache_key)
+            return None
+        return cached
+
+    def _names(
+        self,
+        image_name: str,
+        image_tag: str,
+        image_repo: Union[str, None],
+        name_prefix: str,
+    ) -> Tuple[str, str]:
+        # build a single string for the image to be used
+        image_full = image_name
+        if image_tag:
+            image_full = image_full + ":" + image_tag
+        if image_repo:
+            image_full = image_repo + "/" + image_full
+
+        # create a name for this in general
+        # name must only be alphanumeric, with _- in middle
+        name = re.sub("[^A-Za-z0-9_-]", "_", name_prefix + "_" + image_full)
+        if not re.match("^[A-Za-z0-9][A-Za-z0-9_-]{1,126}[A-Za-z0-9]$", name):
+            raise ValueError(f"name invalid '{name}'")
+
+        return name, image_full
+
+    def _client(self, max_pool_connections: int = 10, service_name: str = "batch"):
+        # get a client, shared with any other build using the same settings
+        # allow enough connections for the job manager to submit concurrently
+        client = self.client_pool.get(
+            service_name,
+            region_name=self.region_name,
+            profile_name=self.profile_name,
+            max_pool_connections=max_pool_connections,
+            retry_mode=self.retry_mode,
+            endpoint_url=self.endpoint_url,
+        )
+        if self.metrics is not None:
+            self.metrics.instrument(client)
+        return client
+
+    def _logs_client(self):
+        # for managers to get a logs client with the same settings, if they need one
+        return self._client(service_name="logs")
+
     def build(
         self,
         service_role_arn: str,
@@ -469,6 +1634,10 @@ class Builder:
         memory: int = 512,
         command: Iterable[str] = [],
         name_prefix: str = "chorecoral",
+        max_pool_connections: int = 10,
+        events: bool = False,
+        max_vcpus: int = 100,
+        spot_vcpus: int = 0,
     ) -> JobManager:
 
         # TODO when a default service role is created its called AWSServiceRoleForBatch
@@ -479,33 +1648,458 @@ class Builder:
         # see https://docs.aws.amazon.com/batch/latest/userguide/execution-IAM-role.html
         # We should detect and use this role if no execution role is given
 
-        # build a single string for the image to be used
-        image_full = image_name
-        if image_tag:
-            image_full = image_full + ":" + image_tag
-        if image_repo:
-            image_full = image_repo + "/" + image_full
-
-        # create a name for this in general
-        # name must only be alphanumeric, with _- in middle
-        name = re.sub("[^A-Za-z0-9_-]", "_", name_prefix + "_" + image_full)
-        if not re.match("^[A-Za-z0-9][A-Za-z0-9_-]{1,126}[A-Za-z0-9]$", name):
-            raise ValueError(f"name invalid '{name}'")
+        name, image_full = self._names(image_name, image_tag, image_repo, name_prefix)
+        # optionally Spot capacity as well as, or instead of, on-demand
+        environments = self._compute_environments(name, max_vcpus, spot_vcpus)
+
+        batch_client = self._client(max_pool_connections)
+
+        # a previous build with the same inputs may have already resolved everything
+        subnet_ids = list(subnet_ids)
+        cache_key = self._cache_key(
+            batch_client,
+            name,
+            service_role_arn,
+            security_group_id,
+            subnet_ids,
+            image_full,
+            vcpu,
+            memory,
+            events,
+            max_vcpus,
+            spot_vcpus,
+        )
+        # optionally receive job state change events through SQS
+        sqs_client = self._client(service_name="sqs") if events else None
+        cached = self._get_cached(batch_client, cache_key)
+        if cached:
+            return JobManager(
+                batch_client,
+                cached["job_queue_arn"],
+                cached["job_definition_arn"],
+                cached.get("events_queue_url"),
+                sqs_client,
+                metrics=self.metrics,
+                logs_client_factory=self._logs_client,
+            )
 
-        # start up a client
-        batch_client = boto3.client("batch")
+        resolve_here = functools.partial(
+            self._resolve,
+            batch_client,
+            cache_key,
+            name,
+            environments,
+            service_role_arn,
+            security_group_id,
+            subnet_ids,
+            image_full,
+            vcpu,
+            memory,
+            events,
+        )
 
-        # ensure compute environment exists
-        compute_arn = self._get_or_create_compute_environment(
-            batch_client, name, service_role_arn, security_group_id, subnet_ids
+        def resolve() -> Dict[str, str]:
+            if self.build_lock is None:
+                return resolve_here()
+            with self.build_lock.hold(cache_key):
+                # whoever held the lock before may have just resolved the same
+                cached = self._get_cached(batch_client, cache_key)
+                if cached:
+                    return cached
+                return resolve_here()
+
+        # builds of the same resources at the same time in this process share one
+        # resolution, rather than each scanning and creating
+        resources = BUILD_FLIGHTS.do(cache_key, resolve)
+
+        return JobManager(
+            batch_client,
+            resources["job_queue_arn"],
+            resources["job_definition_arn"],
+            resources.get("events_queue_url"),
+            sqs_client,
+            metrics=self.metrics,
+            logs_client_factory=self._logs_client,
         )
 
+    def _resolve(
+        self,
+        batch_client,
+        cache_key: str,
+        name: str,
+        environments: Sequence[Tuple[str, str, int]],
+        service_role_arn: str,
+        security_group_id: str,
+        subnet_ids: List[str],
+        image_full: str,
+        vcpu: Union[float, int],
+        memory: int,
+        events: bool,
+    ) -> Dict[str, str]:
+        # find or create everything a build needs, returning their ARNs
+        # ensure compute environments exist
+        compute_arns = [
+            self._get_or_create_compute_environment(
+                batch_client,
+                environment_name,
+                service_role_arn,
+                security_group_id,
+                subnet_ids,
+                compute_type,
+                environment_vcpus,
+            )
+            for environment_name, compute_type, environment_vcpus in environments
+        ]
+
         # ensure queue exists
-        job_queue_arn = self._get_or_create_queue(batch_client, name, compute_arn)
+        job_queue_arn = self._get_or_create_queue(batch_client, name, compute_arns)
 
         # ensure blueprint exists
         job_definition_arn = self._get_or_create_blueprint(
             batch_client, name, image_full, vcpu, memory
         )
 
-        return JobManager(batch_client, job_queue_arn, job_definition_arn)
+        events_queue_url = None
+        if events:
+            events_queue_url = self._get_or_create_events(name, job_queue_arn)
+
+        resources = self._resources(
+            environments,
+            compute_arns,
+            job_queue_arn,
+            job_definition_arn,
+            events_queue_url,
+        )
+        if self.cache:
+            self.cache.set(cache_key, resources)
+        return resources
+
+    def _resources(
+        self,
+        environments: Sequence[Tuple[str, str, int]],
+        compute_arns: Sequence[str],
+        job_queue_arn: str,
+        job_definition_arn: str,
+        events_queue_url: Optional[str],
+    ) -> Dict[str, str]:
+        # what a build resolved to, as kept in the cache
+        resources = {
+            "job_queue_arn": job_queue_arn,
+            "job_definition_arn": job_definition_arn,
+        }
+        for (_, compute_type, _), compute_arn in zip(environments, compute_arns):
+            if compute_type == "FARGATE_SPOT":
+                resources["spot_compute_environment_arn"] = compute_arn
+            else:
+                resources["compute_environment_arn"] = compute_arn
+        if events_queue_url is not None:
+            resources["events_queue_url"] = events_queue_url
+        return resources
+
+    def _index_compute_environments(
+        self, batch_client, names: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_compute_environments
+        index = {}
+        for chunk in chunks(sorted(set(names)), DESCRIBE_RESOURCES_LIMIT):
+            for compute_environment in paginate(
+                batch_client.describe_compute_environments,
+                "computeEnvironments",
+                computeEnvironments=chunk,
+            ):
+                index[
+                    compute_environment["computeEnvironmentName"]
+                ] = compute_environment
+        return index
+
+    def _index_queues(
+        self, batch_client, names: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_job_queues
+        index = {}
+        for chunk in chunks(sorted(set(names)), DESCRIBE_RESOURCES_LIMIT):
+            for job_queue in paginate(
+                batch_client.describe_job_queues, "jobQueues", jobQueues=chunk
+            ):
+                index[job_queue["jobQueueName"]] = job_queue
+        return index
+
+    def _index_blueprints(self, batch_client) -> Dict[str, Dict[str, Any]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_job_definitions
+
+        # definitions can only be asked for by name one at a time, so instead list
+        # the newest active revision of all of them
+        index = {}
+        for blueprint in paginate(
+            batch_client.describe_job_definitions, "jobDefinitions", status="ACTIVE"
+        ):
+            name = blueprint["jobDefinitionName"]
+            if name not in index or blueprint["revision"] > index[name]["revision"]:
+                index[name] = blueprint
+        return index
+
+    def build_many(
+        self, specs: Mapping[Hashable, Mapping[str, Any]], max_workers: int = 10
+    ) -> Dict[Hashable, JobManager]:
+        # Like calling build for each of the specs, which are its arguments, but
+        # describes everything once up front instead of once per spec and then
+        # creates whatever is missing concurrently. As with build, specs found in
+        # the cache are not looked up at all, the rest are resolved holding
+        # build_lock, and anything another build creates meanwhile is used.
+
+        # resolve each spec to the full set of build arguments
+        signature = inspect.signature(self.build)
+        spec_args: Dict[Hashable, Dict[str, Any]] = {}
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for key, spec in specs.items():
+            bound = signature.bind(**spec)
+            bound.apply_defaults()
+            args = dict(bound.arguments)
+            args["subnet_ids"] = list(args["subnet_ids"])
+            args["name"], args["image_full"] = self._names(
+                args["image_name"],
+                args["image_tag"],
+                args["image_repo"],
+                args["name_prefix"],
+            )
+            spec_args[key] = args
+
+            # specs with the same name share resources so must agree on them
+            resources = {
+                field: args[field]
+                for field in (
+                    "service_role_arn",
+                    "security_group_id",
+                    "image_full",
+                    "vcpu",
+                    "memory",
+                )
+            }
+            resources["subnet_ids"] = frozenset(args["subnet_ids"])
+            resources["environments"] = tuple(
+                self._compute_environments(
+                    args["name"], args["max_vcpus"], args["spot_vcpus"]
+                )
+            )
+            if by_name.setdefault(args["name"], resources) != resources:
+                raise ValueError(f"conflicting specs for '{args['name']}'")
+
+        if not spec_args:
+            return {}
+
+        batch_client = self._client(
+            max(args["max_pool_connections"] for args in spec_args.values())
+        )
+
+        # previous builds with the same inputs may have already resolved some
+        for args in spec_args.values():
+            args["cache_key"] = self._cache_key(
+                batch_client,
+                args["name"],
+                args["service_role_arn"],
+                args["security_group_id"],
+                args["subnet_ids"],
+                args["image_full"],
+                args["vcpu"],
+                args["memory"],
+                args["events"],
+                args["max_vcpus"],
+                args["spot_vcpus"],
+            )
+        resolved: Dict[str, Dict[str, str]] = {}
+        pending: Dict[str, Dict[str, Any]] = {}
+        for args in spec_args.values():
+            cached = self._get_cached(batch_client, args["cache_key"])
+            if cached:
+                resolved[args["cache_key"]] = cached
+            else:
+                pending[args["cache_key"]] = args
+
+        with contextlib.ExitStack() as stack:
+            if pending and self.build_lock is not None:
+                # in a fixed order, so that builds of overlapping specs cannot each
+                # hold a lock the other is waiting for
+                for cache_key in sorted(pending):
+                    stack.enter_context(self.build_lock.hold(cache_key))
+                # whoever held them before may have just resolved the same
+                for cache_key in list(pending):
+                    cached = self._get_cached(batch_client, cache_key)
+                    if cached:
+                        resolved[cache_key] = cached
+                        del pending[cache_key]
+            if pending:
+                resolved.update(
+                    self._resolve_many(batch_client, pending, by_name, max_workers)
+                )
+
+        return {
+            key: JobManager(
+                self._client(args["max_pool_connections"]),
+                resolved[args["cache_key"]]["job_queue_arn"],
+                resolved[args["cache_key"]]["job_definition_arn"],
+                resolved[args["cache_key"]].get("events_queue_url"),
+                self._client(service_name="sqs") if args["events"] else None,
+                metrics=self.metrics,
+                logs_client_factory=self._logs_client,
+            )
+            for key, args in spec_args.items()
+        }
+
+    def _resolve_many(
+        self,
+        batch_client,
+        pending: Dict[str, Dict[str, Any]],
+        by_name: Dict[str, Dict[str, Any]],
+        max_workers: int,
+    ) -> Dict[str, Dict[str, str]]:
+        # find or create everything the pending specs need, returning their ARNs
+        # by cache key
+        by_name = {args["name"]: by_name[args["name"]] for args in pending.values()}
+
+        # describe everything once
+        names = list(by_name)
+        environment_names = [
+            environment_name
+            for resources in by_name.values()
+            for environment_name, _, _ in resources["environments"]
+        ]
+        compute_environments = self._index_compute_environments(
+            batch_client, environment_names
+        )
+        job_queues = self._index_queues(batch_client, names)
+        blueprints = self._index_blueprints(batch_client)
+
+        compute_arns: Dict[str, str] = {}
+        job_queue_arns: Dict[str, str] = {}
+        job_definition_arns: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers) as executor:
+            # check existing compute environments and blueprints, or create them
+            # and if another build created them meanwhile, use those instead
+            creating: Dict[Future, Tuple[Dict[str, str], str]] = {}
+            for name, resources in by_name.items():
+                for environment_name, compute_type, environment_vcpus in resources[
+                    "environments"
+                ]:
+                    if environment_name in compute_environments:
+                        compute_arns[
+                            environment_name
+                        ] = self._check_compute_environment(
+                            compute_environments[environment_name],
+                            resources["service_role_arn"],
+                            resources["security_group_id"],
+                            resources["subnet_ids"],
+                            compute_type,
+                            environment_vcpus,
+                        )
+                    else:
+                        environment_args = (
+                            batch_client,
+                            environment_name,
+                            resources["service_role_arn"],
+                            resources["security_group_id"],
+                            resources["subnet_ids"],
+                            compute_type,
+                            environment_vcpus,
+                        )
+                        future = executor.submit(
+                            create_or_get,
+                            functools.partial(
+                                call_with_backoff,
+                                self._create_compute_environment,
+                                *environment_args,
+                            ),
+                            functools.partial(
+                                self._get_compute_environment, *environment_args
+                            ),
+                        )
+                        creating[future] = (compute_arns, environment_name)
+
+                if name in blueprints:
+                    job_definition_arns[name] = self._check_blueprint(
+                        blueprints[name],
+                        resources["image_full"],
+                        resources["vcpu"],
+                        resources["memory"],
+                    )
+                else:
+                    future = executor.submit(
+                        call_with_backoff,
+                        self._create_blueprint,
+                        batch_client,
+                        name,
+                        resources["image_full"],
+                        resources["vcpu"],
+                        resources["memory"],
+                    )
+                    creating[future] = (job_definition_arns, name)
+
+            for future in as_completed(creating):
+                arns, name = creating[future]
+                arns[name] = future.result()
+
+            # queues need their compute environments to exist first
+            creating = {}
+            for name, resources in by_name.items():
+                queue_compute_arns = [
+                    compute_arns[environment_name]
+                    for environment_name, _, _ in resources["environments"]
+                ]
+                if name in job_queues:
+                    job_queue_arns[name] = self._check_queue(
+                        job_queues[name], queue_compute_arns
+                    )
+                else:
+                    future = executor.submit(
+                        create_or_get,
+                        functools.partial(
+                            call_with_backoff,
+                            self._create_queue,
+                            batch_client,
+                            name,
+                            queue_compute_arns,
+                        ),
+                        functools.partial(
+                            self._get_queue, batch_client, name, queue_compute_arns
+                        ),
+                    )
+                    creating[future] = (job_queue_arns, name)
+
+            for future in as_completed(creating):
+                arns, name = creating[future]
+                arns[name] = future.result()
+
+            # events need their queue to exist first
+            events_names = {args["name"] for args in pending.values() if args["events"]}
+            events_queue_urls: Dict[str, str] = {}
+            creating = {}
+            for name in events_names:
+                future = executor.submit(
+                    call_with_backoff,
+                    self._get_or_create_events,
+                    name,
+                    job_queue_arns[name],
+                )
+                creating[future] = (events_queue_urls, name)
+
+            for future in as_completed(creating):
+                urls, name = creating[future]
+                urls[name] = future.result()
+
+        resolved = {}
+        for cache_key, args in pending.items():
+            name = args["name"]
+            environments = by_name[name]["environments"]
+            resources = self._resources(
+                environments,
+                [
+                    compute_arns[environment_name]
+                    for environment_name, _, _ in environments
+                ],
+                job_queue_arns[name],
+                job_definition_arns[name],
+                events_queue_urls[name] if args["events"] else None,
+            )
+            if self.cache:
+                self.cache.set(cache_key, resources)
+            resolved[cache_key] = resources
+        return resolved
@@ -0,0 +1,126 @@
+import asyncio
+import datetime
+import functools
+import itertools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from . import ArrayJob, Builder, JobManager
+from .utils import call_with_backoff
+
+# how many jobs to take from a listing per trip to the executor
+LISTING_BATCH_SIZE = 100
+
+
+class AsyncJobManager:
+    # Wraps a JobManager for use from asyncio. Blocking calls run on a dedicated
+    # executor, and a semaphore caps how many are in flight at once so that lots
+    # of concurrent coroutines queue up here rather than in the connection pool.
+
+    manager: JobManager
+    max_concurrency: int
+
+    def __init__(
+        self,
+        manager: JobManager,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.manager = manager
+        # by default allow one call per connection the client can make
+        self.max_concurrency = manager._max_workers(max_concurrency)
+        self._own_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_concurrency, thread_name_prefix="chorecoral-async"
+            )
+        self._executor = executor
+        # created on first use so it belongs to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncJobManager":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def submit(self, name: str, command: Iterable[str]) -> str:
+        return await self._run(call_with_backoff, self.manager.submit, name, command)
+
+    async def submit_array(self, name: str, commands_or_size, **kwargs) -> ArrayJob:
+        return await self._run(
+            call_with_backoff,
+            self.manager.submit_array,
+            name,
+            commands_or_size,
+            **kwargs,
+        )
+
+    async def get_all(
+        self, created_after: datetime.datetime, **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # the synchronous listing is advanced a batch at a time on the executor,
+        # never on more than one thread at once
+        iterator = self.manager.get_all(created_after, **kwargs)
+        try:
+            while True:
+                batch = await self._run(
+                    lambda: list(itertools.islice(iterator, LISTING_BATCH_SIZE))
+                )
+                if not batch:
+                    return
+                for job in batch:
+                    yield job
+        finally:
+            iterator.close()
+
+    def _futures(self, job_ids: Iterable[str]) -> List[asyncio.Future]:
+        # shielded so that a cancelled or timed out waiter does not cancel the
+        # poller's futures, which other waiters may share
+        return [
+            asyncio.shield(asyncio.wrap_future(future))
+            for future in self.manager.futures(job_ids).values()
+        ]
+
+    async def wait(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        # wait for all the jobs to finish, returning their descriptions in order
+        return await asyncio.wait_for(asyncio.gather(*self._futures(job_ids)), timeout)
+
+    async def as_completed(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # yield each job description as the job finishes
+        for future in asyncio.as_completed(self._futures(job_ids), timeout=timeout):
+            yield await future
+
+
+class AsyncBuilder:
+    builder: Builder
+
+    def __init__(self, builder: Optional[Builder] = None):
+        self.builder = builder if builder is not None else Builder()
+
+    async def build(
+        self, *args, max_concurrency: Optional[int] = None, **kwargs
+    ) -> AsyncJobManager:
+        # takes the same arguments as Builder.build
+        loop = asyncio.get_running_loop()
+        manager = await loop.run_in_executor(
+            None, functools.partial(self.builder.build, *args, **kwargs)
+        )
+        return AsyncJobManager(manager, max_concurrency)
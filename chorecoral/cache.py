@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .constants import TERMINAL_JOB_STATUSES
+from .utils import sqlite_connect
+
+
+def resource_cache_key(**inputs: Any) -> str:
+    # stable hash of the inputs that decide which resources a build resolves to
+    encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResourceCache(ABC):
+    # maps a hash of build inputs to the ARNs they resolved to
+    # entries older than ttl seconds are ignored, or never if ttl is None
+    ttl: Optional[float]
+
+    def __init__(self, ttl: Optional[float] = 3600):
+        self.ttl = ttl
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, str]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class MemoryResourceCache(ResourceCache):
+    def __init__(self, ttl: Optional[float] = 3600):
+        super().__init__(ttl)
+        self._entries: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self._expired(stored_at):
+                del self._entries[key]
+                return None
+            return dict(value)
+
+    def set(self, key: str, value: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), dict(value))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SqliteResourceCache(ResourceCache):
+    # on disk so that it survives restarts and is shared between processes
+
+    path: str
+
+    def __init__(self, path: str, ttl: Optional[float] = 3600):
+        super().__init__(ttl)
+        self.path = path
+        with sqlite_connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS resources"
+                " (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        with sqlite_connect(self.path) as connection:
+            row = connection.execute(
+                "SELECT value, stored_at FROM resources WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, stored_at = row
+        if self._expired(stored_at):
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, str]) -> None:
+        with sqlite_connect(self.path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO resources (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+
+    def delete(self, key: str) -> None:
+        with sqlite_connect(self.path) as connection:
+            connection.execute("DELETE FROM resources WHERE key = ?", (key,))
+
+
+class JobDescriptionCache:
+    # Job descriptions by job id, dropping the least recently used past max_size.
+    # A finished job never changes so is kept until dropped, but any other is only
+    # used for ttl seconds after it was described.
+    max_size: int
+    ttl: float
+
+    def __init__(self, max_size: int = 10000, ttl: float = 10.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            stored_at, job = entry
+            if (
+                job["status"] not in TERMINAL_JOB_STATUSES
+                and time.monotonic() - stored_at > self.ttl
+            ):
+                del self._entries[job_id]
+                return None
+            self._entries.move_to_end(job_id)
+            return job
+
+    def set(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[job["jobId"]] = (time.monotonic(), job)
+            self._entries.move_to_end(job["jobId"])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
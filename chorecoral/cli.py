@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from . import Builder, JobManager, SqliteResourceCache
+from .clients import DEFAULT_CLIENT_POOL
+from .constants import JOB_STATUSES, TERMINAL_JOB_STATUSES
+from .utils import chunks
+
+# how many job statuses to ask about at once when summarizing
+STATUS_CHUNK_SIZE = 1000
+
+# print progress after this many submissions
+PROGRESS_EVERY = 1000
+
+
+class Checkpoint:
+    # The job id of each manifest line submitted so far, appended to a file as each
+    # is submitted so that a later run can carry on where this one stopped. The
+    # first line records the queue and blueprint the jobs went to.
+    #
+    # Which lines are done is kept as a bit per line rather than a set, so that a
+    # manifest of millions of lines still only needs a few hundred kilobytes.
+
+    path: str
+    queue: Optional[str]
+    blueprint: Optional[str]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queue = None
+        self.blueprint = None
+        self.done = 0
+        self._bits = bytearray()
+        if os.path.exists(path):
+            self._truncate_torn()
+            for entry in self.entries():
+                if "line" in entry:
+                    self._mark(entry["line"])
+                else:
+                    self.queue = entry["queue"]
+                    self.blueprint = entry["blueprint"]
+        self._file: Optional[TextIO] = None
+
+    def _truncate_torn(self) -> None:
+        # the last line may be cut short if a run was killed mid write, so drop it
+        # rather than appending the next entry onto the end of it
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            f.truncate(end)
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def job_ids(self) -> Iterator[str]:
+        for entry in self.entries():
+            if "jobId" in entry:
+                yield entry["jobId"]
+
+    def _mark(self, line: int) -> None:
+        byte, bit = divmod(line, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte - len(self._bits) + 1))
+        if not self._bits[byte] & (1 << bit):
+            self._bits[byte] |= 1 << bit
+            self.done += 1
+
+    def is_done(self, line: int) -> bool:
+        byte, bit = divmod(line, 8)
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << bit))
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(entry) + "\n")
+        # out of this process, so a crash does not lose it
+        self._file.flush()
+
+    def start(self, queue: str, blueprint: str) -> None:
+        if self.queue is None:
+            self._write({"queue": queue, "blueprint": blueprint})
+        self.queue = queue
+        self.blueprint = blueprint
+
+    def record(self, line: int, job_id: str) -> None:
+        self._write({"line": line, "jobId": job_id})
+        self._mark(line)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def parse_job(line: str) -> Tuple[str, List[str]]:
+    # a manifest line is an object with a name and a command
+    try:
+        job = json.loads(line)
+        name = job["name"]
+        command = job["command"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"not a job: {e}") from e
+    if not isinstance(command, list) or not all(
+        isinstance(part, str) for part in command
+    ):
+        raise ValueError("command is not a list of strings")
+    return name, command
+
+
+def read_manifest(path: str, checkpoint: Checkpoint) -> Iterator[Tuple[int, str]]:
+    # (line number, line) of each line not yet submitted, read a line at a time
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if line.strip() and not checkpoint.is_done(number):
+                yield number, line
+
+
+def number(text: str) -> Union[float, int]:
+    # Fargate sizes such as 0.25 and 1
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def submit(args: argparse.Namespace) -> int:
+    checkpoint = Checkpoint(args.checkpoint or args.manifest + ".checkpoint")
+    builder = Builder(
+        cache=SqliteResourceCache(args.cache) if args.cache else None,
+        region_name=args.region,
+        profile_name=args.profile,
+    )
+    manager = builder.build(
+        args.service_role,
+        args.security_group,
+        args.subnet,
+        args.image,
+        args.tag,
+        args.repo,
+        args.vcpu,
+        args.memory,
+        name_prefix=args.name_prefix,
+        max_pool_connections=args.max_workers,
+    )
+    if checkpoint.queue is not None and (
+        checkpoint.queue != manager.queue or checkpoint.blueprint != manager.blueprint
+    ):
+        print(f"{checkpoint.path} is for another queue or blueprint", file=sys.stderr)
+        return 2
+    checkpoint.start(manager.queue, manager.blueprint)
+
+    # the line numbers of the jobs in flight, by their position in the stream
+    lines: Dict[int, int] = {}
+    submitted = failed = 0
+
+    def jobs() -> Iterator[Tuple[str, List[str]]]:
+        nonlocal failed
+        position = 0
+        for line, text in read_manifest(args.manifest, checkpoint):
+            try:
+                job = parse_job(text)
+            except ValueError as e:
+                failed += 1
+                print(f"line {line} failed: {e}", file=sys.stderr)
+                continue
+            lines[position] = line
+            position += 1
+            yield job
+
+    try:
+        for result in manager.submit_many(jobs(), max_workers=args.max_workers):
+            line = lines.pop(result.index)
+            if result.error is not None:
+                # not recorded, so the next run tries it again
+                failed += 1
+                print(f"line {line} failed: {result.error}", file=sys.stderr)
+                continue
+            checkpoint.record(line, result.job_id)
+            submitted += 1
+            if submitted % PROGRESS_EVERY == 0:
+                print(f"submitted {submitted}", file=sys.stderr)
+    finally:
+        checkpoint.close()
+
+    print(f"submitted {submitted}, failed {failed}, {checkpoint.done} done in all")
+    return 1 if failed else 0
+
+
+class StatusCache:
+    # The last known status of each job, in sqlite next to the checkpoint, so that
+    # each summary only asks about jobs that were not finished last time.
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs"
+                " (job_id TEXT PRIMARY KEY, status TEXT NOT NULL)"
+            )
+
+    def get(self, job_ids: List[str]) -> Dict[str, str]:
+        query = (
+            "SELECT job_id, status FROM jobs"
+            f" WHERE job_id IN ({', '.join('?' for _ in job_ids)})"
+        )
+        return dict(self._connection.execute(query, job_ids).fetchall())
+
+    def set(self, statuses: Dict[str, str]) -> None:
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO jobs (job_id, status) VALUES (?, ?)",
+                statuses.items(),
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def status(args: argparse.Namespace) -> int:
+    checkpoint = Checkpoint(args.checkpoint or args.manifest + ".checkpoint")
+    if checkpoint.queue is None or checkpoint.blueprint is None:
+        print("nothing submitted yet", file=sys.stderr)
+        return 1
+    client = DEFAULT_CLIENT_POOL.get(
+        "batch", region_name=args.region, profile_name=args.profile
+    )
+    manager = JobManager(client, checkpoint.queue, checkpoint.blueprint)
+    cache = StatusCache(checkpoint.path + ".status")
+
+    counts = {job_status: 0 for job_status in JOB_STATUSES}
+    try:
+        for chunk in chunks(checkpoint.job_ids(), STATUS_CHUNK_SIZE):
+            known = cache.get(chunk)
+            # finished jobs never change, so only ask about the rest
+            unfinished = [
+                job_id
+                for job_id in chunk
+                if known.get(job_id) not in TERMINAL_JOB_STATUSES
+            ]
+            if unfinished:
+                described = manager.describe(unfinished, refresh=True)
+                fresh = {job_id: job["status"] for job_id, job in described.items()}
+                cache.set(fresh)
+                known.update(fresh)
+            for job_id in chunk:
+                if job_id in known:
+                    counts[known[job_id]] += 1
+    finally:
+        cache.close()
+
+    with open(args.manifest) as f:
+        total = sum(1 for line in f if line.strip())
+    print(f"submitted {checkpoint.done} of {total}")
+    for job_status, count in counts.items():
+        print(f"{job_status} {count}")
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="chorecoral", description="Submit and follow AWS Batch jobs."
+    )
+    parser.add_argument("--region")
+    parser.add_argument("--profile")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = subparsers.add_parser(
+        "submit",
+        help="submit each job of a manifest",
+        description="Submit each line of a JSONL manifest, an object with a name"
+        " and a command, as a job. Run again to carry on after a failure.",
+    )
+    submit_parser.set_defaults(func=submit)
+    submit_parser.add_argument("manifest")
+    submit_parser.add_argument("--checkpoint", help="defaults to beside the manifest")
+    submit_parser.add_argument("--service-role", required=True)
+    submit_parser.add_argument("--security-group", required=True)
+    submit_parser.add_argument("--subnet", required=True, action="append")
+    submit_parser.add_argument("--image", required=True)
+    submit_parser.add_argument("--tag", default="latest")
+    submit_parser.add_argument("--repo")
+    submit_parser.add_argument("--vcpu", type=number, default=0.25)
+    submit_parser.add_argument("--memory", type=int, default=512)
+    submit_parser.add_argument("--name-prefix", default="chorecoral")
+    submit_parser.add_argument("--max-workers", type=int, default=10)
+    submit_parser.add_argument("--cache", help="sqlite file of resolved resources")
+
+    status_parser = subparsers.add_parser(
+        "status",
+        help="summarize the jobs of a manifest",
+        description="Count the jobs submitted from a manifest by status.",
+    )
+    status_parser.set_defaults(func=status)
+    status_parser.add_argument("manifest")
+    status_parser.add_argument("--checkpoint", help="defaults to beside the manifest")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parser().parse_args(argv)
+    return args.func(args)
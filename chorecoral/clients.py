@@ -0,0 +1,80 @@
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+
+class ClientPool:
+    # Creating a boto3 client loads and parses the service model, which is slow and
+    # takes memory, and each client has its own connection pool. Clients are
+    # thread-safe so they can be shared: one per service, region, profile and
+    # connection settings.
+
+    def __init__(self):
+        self._sessions: Dict[Optional[str], boto3.session.Session] = {}
+        self._clients: Dict[Tuple[Hashable, ...], Any] = {}
+        # sessions are not thread-safe, so creating clients is serialized
+        self._lock = threading.Lock()
+
+    def _session(self, profile_name: Optional[str]) -> boto3.session.Session:
+        # must be called with the lock held
+        session = self._sessions.get(profile_name)
+        if session is None:
+            session = boto3.session.Session(profile_name=profile_name)
+            self._sessions[profile_name] = session
+        return session
+
+    def session(self, profile_name: Optional[str] = None) -> boto3.session.Session:
+        with self._lock:
+            return self._session(profile_name)
+
+    def get(
+        self,
+        service_name: str = "batch",
+        region_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        max_pool_connections: int = 10,
+        retry_mode: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        endpoint_url: Optional[str] = None,
+    ):
+        key = (
+            service_name,
+            region_name,
+            profile_name,
+            max_pool_connections,
+            retry_mode,
+            max_attempts,
+            endpoint_url,
+        )
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # https://botocore.amazonaws.com/v1/documentation/api/latest/reference/config.html
+                retries = {}
+                if retry_mode is not None:
+                    retries["mode"] = retry_mode
+                if max_attempts is not None:
+                    retries["max_attempts"] = max_attempts
+                config = Config(
+                    max_pool_connections=max_pool_connections,
+                    retries=retries or None,
+                )
+                client = self._session(profile_name).client(
+                    service_name,
+                    region_name=region_name,
+                    endpoint_url=endpoint_url,
+                    config=config,
+                )
+                self._clients[key] = client
+            return client
+
+    def clear(self) -> None:
+        # forget all clients, so the next get of each creates a new one
+        with self._lock:
+            self._clients.clear()
+
+
+# used unless something else is asked for
+DEFAULT_CLIENT_POOL = ClientPool()
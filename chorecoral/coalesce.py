@@ -0,0 +1,162 @@
+import json
+import shlex
+import threading
+from typing import Any, Iterable, List, Optional
+
+from .commands import serial_command
+from .constants import ARRAY_SIZE_MAX, ARRAY_SIZE_MIN, SUBMIT_PAYLOAD_LIMIT
+from .utils import call_with_backoff
+
+# allowance for the shell script around each command, see serial_command
+TASK_OVERHEAD_BYTES = 100
+
+
+class CoalescedTask:
+    # one small command, and where it ended up once its bucket was submitted
+
+    name: str
+    command: List[str]
+    runtime: float
+    # position within its bucket, as printed in the job's log by serial_command
+    index: int
+    # set once submitted
+    job_id: Optional[str]
+    # in array mode, the child job that runs this task
+    child_job_id: Optional[str]
+    # set instead of job_id if its bucket could not be submitted
+    error: Optional[Exception]
+
+    def __init__(self, name: str, command: Iterable[str], runtime: float, index: int):
+        self.name = name
+        self.command = list(command)
+        self.runtime = runtime
+        self.index = index
+        self.job_id = None
+        self.child_job_id = None
+        self.error = None
+
+
+class CoalescingSubmitter:
+    # Buffers small commands and submits them together, so that the start up
+    # overhead of a Fargate job is paid once per bucket rather than once per task.
+    #
+    # A bucket is submitted once adding another task would take it past max_tasks,
+    # past max_runtime seconds of estimated work, or past what fits in one request.
+    # Each bucket is either one job running its tasks one after another, or if
+    # array_size is given an array job with each child running a slice of them.
+    #
+    # As with submit_many, a bucket that cannot be submitted does not raise. Its
+    # tasks get the error instead, so the rest can still be submitted.
+
+    manager: Any
+    name_prefix: str
+    max_tasks: int
+    max_runtime: Optional[float]
+    array_size: Optional[int]
+
+    def __init__(
+        self,
+        manager,
+        name_prefix: str = "coalesced",
+        max_tasks: int = 100,
+        max_runtime: Optional[float] = None,
+        array_size: Optional[int] = None,
+    ):
+        if array_size is not None and not (
+            ARRAY_SIZE_MIN <= array_size <= ARRAY_SIZE_MAX
+        ):
+            raise ValueError(
+                f"array size {array_size} not between {ARRAY_SIZE_MIN} and {ARRAY_SIZE_MAX}"
+            )
+        self.manager = manager
+        self.name_prefix = name_prefix
+        self.max_tasks = max_tasks
+        self.max_runtime = max_runtime
+        self.array_size = array_size
+        self._tasks: List[CoalescedTask] = []
+        self._runtime = 0.0
+        self._bytes = 0
+        self._buckets = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "CoalescingSubmitter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def add(
+        self, name: str, command: Iterable[str], runtime: float = 0.0
+    ) -> CoalescedTask:
+        command = list(command)
+        # estimate how much this adds to the request, quoted once more in array
+        # mode because of the dispatch script around each slice
+        quoted = shlex.join(command)
+        if self.array_size is not None:
+            quoted = shlex.quote(quoted)
+        size = len(json.dumps(quoted)) + TASK_OVERHEAD_BYTES
+        with self._lock:
+            # submit what we have if this task would not fit with it
+            if self._tasks and (
+                len(self._tasks) >= self.max_tasks
+                or (
+                    self.max_runtime is not None
+                    and self._runtime + runtime > self.max_runtime
+                )
+                or self._bytes + size > SUBMIT_PAYLOAD_LIMIT
+            ):
+                self._flush()
+            task = CoalescedTask(name, command, runtime, len(self._tasks))
+            self._tasks.append(task)
+            self._runtime += runtime
+            self._bytes += size
+        return task
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        # must be called with the lock held
+        tasks = self._tasks
+        if not tasks:
+            return
+        name = f"{self.name_prefix}_{self._buckets}"
+        self._buckets += 1
+        try:
+            self._submit(name, tasks)
+        except Exception as e:
+            for task in tasks:
+                task.error = e
+        # only once submitted or failed, so no task is dropped unaccounted for
+        self._tasks = []
+        self._runtime = 0.0
+        self._bytes = 0
+
+    def _submit(self, name: str, tasks: List[CoalescedTask]) -> None:
+        commands = [task.command for task in tasks]
+        # an array needs at least two children, so small buckets are run as one job
+        slices = min(self.array_size or 1, len(tasks))
+        if slices < ARRAY_SIZE_MIN:
+            job_id = call_with_backoff(
+                self.manager.submit, name, serial_command(commands)
+            )
+            for task in tasks:
+                task.job_id = job_id
+            return
+
+        # split into contiguous slices, one per child
+        bounds = [len(tasks) * i // slices for i in range(slices + 1)]
+        array_job = call_with_backoff(
+            self.manager.submit_array,
+            name,
+            [
+                serial_command(commands[start:end], start)
+                for start, end in zip(bounds, bounds[1:])
+            ],
+        )
+        child_ids = array_job.child_ids()
+        for child, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            for task in tasks[start:end]:
+                task.job_id = array_job.job_id
+                task.child_job_id = child_ids[child]
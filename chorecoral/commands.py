@@ -0,0 +1,43 @@
+import shlex
+from typing import Dict, Iterable, List, Sequence
+
+
+def array_dispatch_command(commands: Sequence[Iterable[str]]) -> List[str]:
+    # Every child of an array job gets the same container overrides, so to run a
+    # different command in each child we ship all of them in a small shell script
+    # and let each child pick its own by AWS_BATCH_JOB_ARRAY_INDEX.
+    # https://docs.aws.amazon.com/batch/latest/userguide/array_index_example.html
+    lines = ['case "$AWS_BATCH_JOB_ARRAY_INDEX" in']
+    for i, command in enumerate(commands):
+        lines.append(f"{i}) exec {shlex.join(command)} ;;")
+    lines.append("*) exit 1 ;;")
+    lines.append("esac")
+    return ["sh", "-c", "\n".join(lines)]
+
+
+# printed by serial_command around each command, for parse_serial_output to find
+TASK_MARKER = "chorecoral-task"
+
+
+def serial_command(
+    commands: Sequence[Iterable[str]], first_index: int = 0
+) -> List[str]:
+    # Run several commands one after another in one container. Each one's exit
+    # code is printed so that it can be recovered from the job's log, and the job
+    # fails if any of them did.
+    lines = ["rc=0"]
+    for i, command in enumerate(commands, first_index):
+        lines.append(shlex.join(command))
+        lines.append(f's=$?; echo "{TASK_MARKER} {i} exit $s"; [ $s -eq 0 ] || rc=1')
+    lines.append("exit $rc")
+    return ["sh", "-c", "\n".join(lines)]
+
+
+def parse_serial_output(lines: Iterable[str]) -> Dict[int, int]:
+    # map the index of each command run by serial_command to its exit code
+    exits = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 4 and parts[0] == TASK_MARKER and parts[2] == "exit":
+            exits[int(parts[1])] = int(parts[3])
+    return exits
@@ -0,0 +1,94 @@
+# all the states a job can be in, in the order it moves through them
+# https://docs.aws.amazon.com/batch/latest/userguide/job_states.html
+JOB_STATUSES = (
+    "SUBMITTED",
+    "PENDING",
+    "RUNNABLE",
+    "STARTING",
+    "RUNNING",
+    "SUCCEEDED",
+    "FAILED",
+)
+
+# once a job reaches one of these it never changes again
+TERMINAL_JOB_STATUSES = ("SUCCEEDED", "FAILED")
+
+# jobs in these have not started, so can be cancelled rather than terminated
+# https://docs.aws.amazon.com/batch/latest/APIReference/API_CancelJob.html
+CANCELLABLE_JOB_STATUSES = ("SUBMITTED", "PENDING", "RUNNABLE")
+
+# jobs in these can still be stopped
+ACTIVE_JOB_STATUSES = ("SUBMITTED", "PENDING", "RUNNABLE", "STARTING", "RUNNING")
+
+# jobs in these have been scheduled, so are about to finish or could do soon
+RUNNING_JOB_STATUSES = ("STARTING", "RUNNING")
+
+# array jobs must have between 2 and 10,000 children
+# https://docs.aws.amazon.com/batch/latest/userguide/array_jobs.html
+ARRAY_SIZE_MIN = 2
+ARRAY_SIZE_MAX = 10000
+
+# maximum size of a SubmitJob request payload
+# https://docs.aws.amazon.com/batch/latest/userguide/service_limits.html
+SUBMIT_PAYLOAD_LIMIT = 30 * 1024
+
+# maximum number of jobs in one DescribeJobs request
+# https://docs.aws.amazon.com/batch/latest/APIReference/API_DescribeJobs.html
+DESCRIBE_JOBS_LIMIT = 100
+
+# maximum number of names in one DescribeComputeEnvironments or DescribeJobQueues
+# https://docs.aws.amazon.com/batch/latest/APIReference/API_DescribeJobQueues.html
+DESCRIBE_RESOURCES_LIMIT = 100
+
+# most messages one SQS ReceiveMessage or DeleteMessageBatch can handle
+# https://docs.aws.amazon.com/AWSSimpleQueueService/latest/APIReference/API_ReceiveMessage.html
+SQS_BATCH_LIMIT = 10
+
+# longest an SQS ReceiveMessage can wait for a message to arrive
+SQS_WAIT_TIME_MAX = 20
+
+# most jobs one job can depend on
+# https://docs.aws.amazon.com/batch/latest/userguide/job_dependencies.html
+DEPENDS_ON_LIMIT = 20
+
+# the vcpu that can go with each amount of memory (MiB) on Fargate
+# https://docs.aws.amazon.com/batch/latest/userguide/fargate.html#fargate-job-definitions
+FARGATE_MEMORY_VCPU = {
+    512: (0.25,),
+    1024: (0.25, 0.5),
+    2048: (0.25, 0.5, 1),
+    3072: (0.5, 1),
+    4096: (0.5, 1, 2),
+    5120: (1, 2),
+    6144: (1, 2),
+    7168: (1, 2),
+    8192: (1, 2, 4),
+    9216: (2, 4),
+    10240: (2, 4),
+    11264: (2, 4),
+    12288: (2, 4),
+    13312: (2, 4),
+    14336: (2, 4),
+    15360: (2, 4),
+    16384: (2, 4),
+    17408: (4,),
+    18432: (4,),
+    19456: (4,),
+    20480: (4,),
+    21504: (4,),
+    22528: (4,),
+    23552: (4,),
+    24576: (4,),
+    25600: (4,),
+    26624: (4,),
+    27648: (4,),
+    28672: (4,),
+    29696: (4,),
+    30720: (4,),
+}
+
+# Fargate on-demand prices in us-east-1, per vCPU hour and per GB of memory hour,
+# only used to compare sizes against each other
+# https://aws.amazon.com/fargate/pricing/
+FARGATE_VCPU_HOUR_PRICE = 0.04048
+FARGATE_GB_HOUR_PRICE = 0.004445
@@ -0,0 +1,98 @@
+import contextlib
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Any, Callable, ContextManager, Dict, Hashable, Iterator
+
+from .utils import sqlite_connect
+
+
+class SingleFlight:
+    # Runs a function once per key at a time. Calls for a key that is already
+    # being run wait for that run and get its result, or its error, instead of
+    # running it again.
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class BuildLock(ABC):
+    # held while a build resolves its resources, so that builds of the same
+    # resources in other processes wait rather than resolving them too
+
+    @abstractmethod
+    def hold(self, key: str) -> ContextManager[None]:
+        ...
+
+
+class SqliteBuildLock(BuildLock):
+    # A lease in a sqlite database, shared by every process on a host. A lease
+    # that is not released within ttl seconds, for example by a process that
+    # died, is taken over by the next one to ask.
+
+    path: str
+    ttl: float
+    poll_interval: float
+
+    def __init__(self, path: str, ttl: float = 600.0, poll_interval: float = 0.5):
+        self.path = path
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        with sqlite_connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS leases"
+                " (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _acquire(self, key: str, owner: str) -> bool:
+        # take the lease if nobody holds it, in one transaction
+        now = time.time()
+        with sqlite_connect(self.path) as connection:
+            connection.execute(
+                "DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now)
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + self.ttl),
+            )
+            row = connection.execute(
+                "SELECT owner FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and row[0] == owner
+
+    @contextlib.contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        owner = uuid.uuid4().hex
+        while not self._acquire(key, owner):
+            time.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            with sqlite_connect(self.path) as connection:
+                connection.execute(
+                    "DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner)
+                )
@@ -0,0 +1,212 @@
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from botocore import xform_name
+
+from .utils import THROTTLE_ERROR_CODES
+
+# upper bounds of the latency histogram buckets, in seconds, with one more
+# bucket for anything slower than the last
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class CallRecord(NamedTuple):
+    # one API call, as given to a sink once it has returned
+    service: str
+    operation: str
+    # seconds, including any retries made by botocore
+    latency: float
+    retries: int
+    throttles: int
+    # the error code the call returned, if any
+    error: Optional[str]
+
+
+class _OperationStats:
+    # counters for one operation, only touched with the metrics lock held
+    __slots__ = (
+        "calls",
+        "errors",
+        "pages",
+        "retries",
+        "throttles",
+        "total",
+        "buckets",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.pages = 0
+        self.retries = 0
+        self.throttles = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        # estimate from the histogram, the upper bound of the bucket it falls in
+        if not self.calls:
+            return None
+        rank = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "pages": self.pages,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "latency_total": self.total,
+            "latency_mean": self.total / self.calls if self.calls else None,
+            "latency_p50": self.percentile(0.5),
+            "latency_p90": self.percentile(0.9),
+            "latency_p99": self.percentile(0.99),
+            "latency_buckets": dict(
+                zip(LATENCY_BUCKETS + (float("inf"),), self.buckets)
+            ),
+        }
+
+
+class Metrics:
+    # Counts the API calls made by instrumented clients, per service and
+    # operation, by hooking botocore's event system. Each call only takes a
+    # timestamp, a few dict lookups and a short lock, so this can be left on.
+    # Optionally each call is also given to a sink as a CallRecord.
+    #
+    # Clients from a ClientPool are shared, so instrumenting one counts the calls
+    # of everything else using it too.
+
+    sink: Optional[Callable[[CallRecord], None]]
+
+    def __init__(self, sink: Optional[Callable[[CallRecord], None]] = None):
+        self.sink = sink
+        self._stats: Dict[Tuple[str, str], _OperationStats] = {}
+        self._lock = threading.Lock()
+        # for the handlers, and the key in the botocore request context for what is
+        # known about the call so far, so that several can instrument one client
+        self._prefix = f"chorecoral-metrics-{id(self)}"
+
+    def instrument(self, client) -> Any:
+        # start counting the calls made by a client, returning it for chaining
+        # instrumenting the same client again does nothing
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/guide/events.html
+        events = client.meta.events
+        events.register(
+            "before-call", self._before_call, unique_id=f"{self._prefix}-before"
+        )
+        events.register(
+            "needs-retry", self._needs_retry, unique_id=f"{self._prefix}-retry"
+        )
+        events.register(
+            "after-call",
+            self._make_after_call(client),
+            unique_id=f"{self._prefix}-after",
+        )
+        return client
+
+    def _before_call(self, context: Dict[str, Any], **kwargs) -> None:
+        context[self._prefix] = [time.perf_counter(), 0]
+
+    def _needs_retry(
+        self, response: Optional[Tuple[Any, Dict[str, Any]]], request_dict, **kwargs
+    ) -> None:
+        # called after every attempt, including the last, to decide whether to try
+        # again. Leave that to the retry handler and only count the throttles.
+        if response is None:
+            return
+        code = response[1].get("Error", {}).get("Code")
+        if code in THROTTLE_ERROR_CODES:
+            state = request_dict.get("context", {}).get(self._prefix)
+            if state is not None:
+                state[1] += 1
+
+    def _make_after_call(self, client) -> Callable:
+        # whether each operation of the client can be paginated
+        paginated_operations: Dict[str, bool] = {}
+
+        def after_call(
+            parsed: Dict[str, Any], model, context: Dict[str, Any], **kwargs
+        ) -> None:
+            state = context.get(self._prefix)
+            if state is None:
+                return
+            latency = time.perf_counter() - state[0]
+            throttles = state[1]
+            retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+            error = parsed.get("Error", {}).get("Code")
+            operation = model.name
+            service = model.service_model.service_name
+            paginated = paginated_operations.get(operation)
+            if paginated is None:
+                paginated = client.can_paginate(xform_name(operation))
+                paginated_operations[operation] = paginated
+
+            with self._lock:
+                stats = self._stats.get((service, operation))
+                if stats is None:
+                    stats = self._stats[(service, operation)] = _OperationStats()
+                stats.calls += 1
+                stats.total += latency
+                stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+                stats.retries += retries
+                stats.throttles += throttles
+                if error is not None:
+                    stats.errors += 1
+                elif paginated:
+                    stats.pages += 1
+
+            if self.sink is not None:
+                self.sink(
+                    CallRecord(service, operation, latency, retries, throttles, error)
+                )
+
+        return after_call
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        # the counts so far, by service and then operation
+        with self._lock:
+            result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (service, operation), stats in sorted(self._stats.items()):
+                result.setdefault(service, {})[operation] = stats.snapshot()
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+def statsd_sink(statsd, prefix: str = "chorecoral") -> Callable[[CallRecord], None]:
+    # a sink for a StatsD style client with timing(name, ms) and incr(name, count),
+    # naming each metric after the service and operation
+    def sink(record: CallRecord) -> None:
+        name = f"{prefix}.{record.service}.{record.operation}"
+        statsd.timing(f"{name}.latency", record.latency * 1000)
+        statsd.incr(f"{name}.calls")
+        if record.retries:
+            statsd.incr(f"{name}.retries", record.retries)
+        if record.throttles:
+            statsd.incr(f"{name}.throttles", record.throttles)
+        if record.error is not None:
+            statsd.incr(f"{name}.errors")
+
+    return sink
@@ -0,0 +1,172 @@
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Dict, Iterable, Optional
+
+from botocore.exceptions import ClientError
+
+from .constants import (
+    DESCRIBE_JOBS_LIMIT,
+    RUNNING_JOB_STATUSES,
+    TERMINAL_JOB_STATUSES,
+)
+from .utils import call_with_backoff, chunks
+
+
+class JobNotFoundError(Exception):
+    pass
+
+
+class JobPoller:
+    # A single background thread that watches any number of jobs, describing them
+    # 100 at a time and resolving a future for each once it is finished.
+    #
+    # It polls every min_interval while any job is starting or running or has just
+    # changed status, and backs off towards max_interval while they all sit waiting
+    # to be scheduled.
+
+    client: Any
+    min_interval: float
+    max_interval: float
+    # how many polls a job can be missing from before it is given up on
+    missing_limit: int
+
+    def __init__(
+        self,
+        batch_client,
+        min_interval: float = 5.0,
+        max_interval: float = 60.0,
+        missing_limit: int = 3,
+    ):
+        self.client = batch_client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.missing_limit = missing_limit
+        self._futures: Dict[str, Future] = {}
+        self._statuses: Dict[str, str] = {}
+        self._missing: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, job_id: str) -> Future:
+        # the future resolves to the job description once the job has finished
+        return self.watch_all([job_id])[job_id]
+
+    def watch_all(self, job_ids: Iterable[str]) -> Dict[str, Future]:
+        # add them all before polling so they are described together
+        futures = {}
+        with self._lock:
+            for job_id in job_ids:
+                future = self._futures.get(job_id)
+                if future is None or future.cancelled():
+                    future = Future()
+                    self._futures[job_id] = future
+                futures[job_id] = future
+            # look at new jobs promptly
+            self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="chorecoral-poller", daemon=True
+                )
+                self._thread.start()
+        return futures
+
+    def _forget(self, job_id: str) -> None:
+        self._futures.pop(job_id, None)
+        self._statuses.pop(job_id, None)
+        self._missing.pop(job_id, None)
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        except BaseException:
+            # something unexpected stopped the loop, so fail the futures rather than
+            # leave anyone waiting on them forever, and let the next watch start a
+            # new thread
+            with self._lock:
+                self._thread = None
+                error = RuntimeError("job poller stopped")
+                for job_id in list(self._futures):
+                    self._resolve(job_id, exception=error)
+            raise
+
+    def _loop(self) -> None:
+        interval = self.min_interval
+        while True:
+            self._wake.clear()
+            with self._lock:
+                # stop watching jobs that are finished or nobody is waiting on
+                for job_id, future in list(self._futures.items()):
+                    if future.done():
+                        self._forget(job_id)
+                job_ids = list(self._futures)
+                if not job_ids:
+                    # nothing left, a new thread is started by the next watch
+                    self._thread = None
+                    return
+
+            try:
+                changed = self._poll(job_ids)
+            except Exception:
+                # such as the connection dropping or timing out, which may well
+                # pass, so keep polling but less often
+                interval = min(self.max_interval, interval * 2)
+                self._wake.wait(interval)
+                continue
+
+            with self._lock:
+                statuses = list(self._statuses.values())
+            if changed or any(status in RUNNING_JOB_STATUSES for status in statuses):
+                interval = self.min_interval
+            else:
+                interval = min(self.max_interval, interval * 2)
+            self._wake.wait(interval)
+
+    def _poll(self, job_ids: Iterable[str]) -> bool:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_jobs
+        # returns if any job changed status
+        changed = False
+        for chunk in chunks(job_ids, DESCRIBE_JOBS_LIMIT):
+            try:
+                response = call_with_backoff(self.client.describe_jobs, jobs=chunk)
+            except ClientError as e:
+                # will not work next time either, so tell anyone waiting
+                with self._lock:
+                    for job_id in chunk:
+                        self._resolve(job_id, exception=e)
+                continue
+
+            found = set()
+            with self._lock:
+                for job in response["jobs"]:
+                    job_id = job["jobId"]
+                    found.add(job_id)
+                    self._missing.pop(job_id, None)
+                    if self._statuses.get(job_id) != job["status"]:
+                        changed = True
+                        self._statuses[job_id] = job["status"]
+                    if job["status"] in TERMINAL_JOB_STATUSES:
+                        self._resolve(job_id, result=job)
+
+                # newly submitted jobs may take a moment to be described
+                for job_id in chunk:
+                    if job_id in found:
+                        continue
+                    self._missing[job_id] = self._missing.get(job_id, 0) + 1
+                    if self._missing[job_id] >= self.missing_limit:
+                        self._resolve(job_id, exception=JobNotFoundError(job_id))
+        return changed
+
+    def _resolve(self, job_id: str, result=None, exception=None) -> None:
+        # must be called with the lock held
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                if exception is not None:
+                    future.set_exception(exception)
+                else:
+                    future.set_result(result)
+            except InvalidStateError:
+                # cancelled by whoever was waiting on it
+                pass
+        self._forget(job_id)
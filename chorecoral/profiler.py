@@ -0,0 +1,189 @@
+import datetime
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .constants import (
+    FARGATE_GB_HOUR_PRICE,
+    FARGATE_MEMORY_VCPU,
+    FARGATE_VCPU_HOUR_PRICE,
+)
+from .table import MISSING, JobTable
+
+# how Batch reports a container killed for using more memory than it was given
+# https://docs.aws.amazon.com/batch/latest/userguide/troubleshooting.html
+OUT_OF_MEMORY_REASON = "OutOfMemoryError"
+
+
+def hourly_price(memory: int, vcpu: Union[float, int]) -> float:
+    # what a Fargate job of this size costs per hour
+    return vcpu * FARGATE_VCPU_HOUR_PRICE + memory / 1024 * FARGATE_GB_HOUR_PRICE
+
+
+def recommend_size(
+    peak_vcpu: float, peak_memory: float, headroom: float = 0.2
+) -> Tuple[int, Union[float, int]]:
+    # The cheapest (memory, vcpu) allowed on Fargate with room for the peak vCPUs
+    # and memory (MiB) a job was seen to use, plus headroom as a fraction of
+    # each. Batch does not report usage, so this comes from elsewhere, such as
+    # CloudWatch Container Insights.
+    need_vcpu = peak_vcpu * (1 + headroom)
+    need_memory = peak_memory * (1 + headroom)
+    sizes = [
+        (memory, vcpu)
+        for memory, vcpus in FARGATE_MEMORY_VCPU.items()
+        for vcpu in vcpus
+        if memory >= need_memory and vcpu >= need_vcpu
+    ]
+    if not sizes:
+        raise ValueError(
+            f"nothing on Fargate fits {need_vcpu} vcpu and {need_memory} memory"
+        )
+    return min(sizes, key=lambda size: hourly_price(*size))
+
+
+class JobProfile:
+    # Where the time of a blueprint's jobs goes, built up one job summary at a
+    # time so that it can be filled from a listing as each page arrives. The jobs
+    # are kept in a JobTable, with only why failed jobs failed kept alongside.
+
+    # of each job, if known, from the blueprint and its queue
+    vcpu: Optional[float]
+    memory: Optional[int]
+    max_vcpus: Optional[int]
+    table: JobTable
+
+    def __init__(
+        self,
+        vcpu: Optional[float] = None,
+        memory: Optional[int] = None,
+        max_vcpus: Optional[int] = None,
+    ):
+        self.vcpu = vcpu
+        self.memory = memory
+        self.max_vcpus = max_vcpus
+        self.table = JobTable()
+        self._failure_reasons: Dict[str, int] = {}
+        self._exit_codes: Dict[int, int] = {}
+
+    @property
+    def jobs(self) -> int:
+        return len(self.table)
+
+    def add(self, job: Dict[str, Any]) -> None:
+        # a job summary from list_jobs, or a description from describe_jobs
+        self.table.append(job)
+        if job["status"] == "FAILED":
+            container = job.get("container", {})
+            # the container says why it stopped, the job only why it never ran
+            reason = container.get("reason") or job.get("statusReason") or "unknown"
+            self._failure_reasons[reason] = self._failure_reasons.get(reason, 0) + 1
+            exit_code = container.get("exitCode")
+            if exit_code is not None:
+                self._exit_codes[exit_code] = self._exit_codes.get(exit_code, 0) + 1
+
+    def extend(self, jobs: Iterable[Dict[str, Any]]) -> None:
+        for job in jobs:
+            self.add(job)
+
+    def failure_rate(self) -> Optional[float]:
+        # of the jobs that have finished, None if none have
+        counts = self.table.counts()
+        finished = counts["SUCCEEDED"] + counts["FAILED"]
+        return counts["FAILED"] / finished if finished else None
+
+    def failure_reasons(self) -> Dict[str, int]:
+        # most common first
+        items = self._failure_reasons.items()
+        return dict(sorted(items, key=lambda item: (-item[1], item[0])))
+
+    def exit_codes(self) -> Dict[int, int]:
+        # of the failed jobs whose container exited
+        return dict(sorted(self._exit_codes.items()))
+
+    def out_of_memory(self) -> int:
+        # failures from running out of memory, a sign memory should go up
+        return sum(
+            count
+            for reason, count in self._failure_reasons.items()
+            if reason.startswith(OUT_OF_MEMORY_REASON)
+        )
+
+    def concurrency(
+        self, interval: float = 60.0, now: Optional[float] = None
+    ) -> List[Tuple[datetime.datetime, int]]:
+        # The most jobs running at once in each interval of seconds, from the
+        # first start to the last stop. Jobs still running count until now.
+        table = self.table
+        if not any(started != MISSING for started in table.started_at):
+            return []
+        if now is None:
+            now = time.time()
+        now_miliseconds = int(now * 1000)
+        changes = []
+        for started, stopped in zip(table.started_at, table.stopped_at):
+            if started == MISSING:
+                continue
+            changes.append((started, 1))
+            changes.append((now_miliseconds if stopped == MISSING else stopped, -1))
+        changes.sort()
+        width = int(interval * 1000)
+        first = changes[0][0] // width
+        count = changes[-1][0] // width - first + 1
+        # the most running after any change in each interval, after the last, and
+        # whether there was a change right as it began
+        peaks: List[Optional[int]] = [None] * count
+        ends: List[Optional[int]] = [None] * count
+        changed_at_start = [False] * count
+        running = 0
+        for i, (when, change) in enumerate(changes):
+            running += change
+            # everything at the same moment happens at once
+            if i + 1 < len(changes) and changes[i + 1][0] == when:
+                continue
+            bucket = when // width - first
+            if when % width == 0:
+                changed_at_start[bucket] = True
+            peaks[bucket] = max(running, peaks[bucket] or 0)
+            ends[bucket] = running
+
+        curve = []
+        running = 0
+        for i in range(count):
+            # what was running as the interval began counts too, unless it changed
+            # at that very moment
+            peak = peaks[i] or 0
+            if not changed_at_start[i]:
+                peak = max(peak, running)
+            when = datetime.datetime.fromtimestamp(
+                (first + i) * width / 1000, tz=datetime.timezone.utc
+            )
+            curve.append((when, peak))
+            end = ends[i]
+            if end is not None:
+                running = end
+        return curve
+
+    def report(self, interval: float = 60.0) -> Dict[str, Any]:
+        # everything above, with concurrency as vCPUs against what the queue allows
+        curve = self.concurrency(interval)
+        peak_jobs = max((jobs for _, jobs in curve), default=0)
+        counts = self.table.counts()
+        report: Dict[str, Any] = {
+            "jobs": self.jobs,
+            "succeeded": counts["SUCCEEDED"],
+            "failed": counts["FAILED"],
+            "failure_rate": self.failure_rate(),
+            "failure_reasons": self.failure_reasons(),
+            "exit_codes": self.exit_codes(),
+            "out_of_memory": self.out_of_memory(),
+            "queue_wait_seconds": self.table.queue_wait_percentiles(),
+            "run_time_seconds": self.table.run_time_percentiles(),
+            "concurrency": [(when.isoformat(), jobs) for when, jobs in curve],
+            "peak_concurrency": peak_jobs,
+            "max_vcpus": self.max_vcpus,
+        }
+        if self.vcpu is not None:
+            report["peak_vcpus"] = peak_jobs * self.vcpu
+            if self.max_vcpus:
+                report["peak_vcpu_utilization"] = peak_jobs * self.vcpu / self.max_vcpus
+        return report
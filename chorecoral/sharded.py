@@ -0,0 +1,247 @@
+import datetime
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ALL_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import as_completed, wait
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .utils import SubmitResult, call_with_backoff, submit_concurrently
+
+# statuses of jobs that are taking up a queue's capacity, or waiting for it
+LOAD_JOB_STATUSES = ("RUNNABLE", "STARTING", "RUNNING")
+
+
+class RoundRobinPolicy:
+    # each shard in turn
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, managers: Sequence[Any]) -> int:
+        with self._lock:
+            return next(self._counter) % len(managers)
+
+
+class WeightedPolicy:
+    # Shards in proportion to their weights, spread out rather than in runs.
+    # This is the smooth weighted round robin that nginx uses for upstreams.
+
+    weights: List[float]
+
+    def __init__(self, weights: Iterable[float]):
+        self.weights = list(weights)
+        if not self.weights or min(self.weights) < 0 or sum(self.weights) <= 0:
+            raise ValueError(f"weights {self.weights} invalid")
+        self._current = [0.0] * len(self.weights)
+        self._lock = threading.Lock()
+
+    def choose(self, managers: Sequence[Any]) -> int:
+        if len(managers) != len(self.weights):
+            raise ValueError(f"{len(self.weights)} weights for {len(managers)} shards")
+        with self._lock:
+            for i, weight in enumerate(self.weights):
+                self._current[i] += weight
+            chosen = max(range(len(self.weights)), key=self._current.__getitem__)
+            self._current[chosen] -= sum(self.weights)
+            return chosen
+
+
+class LeastLoadedPolicy:
+    # The shard with the fewest jobs waiting or running. Counting jobs takes a
+    # list_jobs call per status so counts are only refreshed every
+    # refresh_interval seconds, and in between each submission adds one to the
+    # count of its shard.
+    #
+    # Only one caller refreshes at a time, without holding the lock, while the
+    # rest carry on choosing from the counts it is replacing.
+
+    refresh_interval: float
+
+    # Counting stops at this many jobs per shard, so that a refresh during a large
+    # burst takes a few list_jobs calls rather than one per hundred jobs. Shards
+    # with more than this are all as loaded as each other.
+    max_count: int
+
+    def __init__(self, refresh_interval: float = 10.0, max_count: int = 1000):
+        self.refresh_interval = refresh_interval
+        self.max_count = max_count
+        self._loads: Optional[List[int]] = None
+        self._refreshed = 0.0
+        self._refreshing = False
+        self._condition = threading.Condition()
+
+    def _refresh(self, managers: Sequence[Any]) -> List[int]:
+        # count every shard at the same time
+        with ThreadPoolExecutor(len(managers)) as executor:
+            return list(
+                executor.map(
+                    lambda manager: call_with_backoff(
+                        manager.count_jobs, LOAD_JOB_STATUSES, self.max_count
+                    ),
+                    managers,
+                )
+            )
+
+    def _take(self, loads: List[int]) -> int:
+        # must be called with the lock held
+        chosen = min(range(len(loads)), key=loads.__getitem__)
+        loads[chosen] += 1
+        return chosen
+
+    def choose(self, managers: Sequence[Any]) -> int:
+        while True:
+            with self._condition:
+                loads = self._loads
+                if loads is not None and len(loads) != len(managers):
+                    loads = None
+                if not self._refreshing and (
+                    loads is None
+                    or time.monotonic() - self._refreshed > self.refresh_interval
+                ):
+                    self._refreshing = True
+                    break
+                if loads is not None:
+                    return self._take(loads)
+                # nothing to go on until the first count is done
+                self._condition.wait()
+
+        try:
+            counted = self._refresh(managers)
+        except BaseException:
+            with self._condition:
+                # whoever is waiting tries again
+                self._refreshing = False
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._refreshing = False
+            self._loads = counted
+            self._refreshed = time.monotonic()
+            self._condition.notify_all()
+            return self._take(counted)
+
+
+class ShardedJobManager:
+    # Fronts several job managers, for example for queues in different regions or
+    # accounts, as if they were one. Submissions are spread over them by a policy,
+    # and listing and waiting work across all of them.
+
+    managers: List[Any]
+    policy: Any
+
+    # how many jobs to remember the manager of, beyond which the least recently
+    # used are forgotten and looked up again if needed
+    owners_size: int
+
+    def __init__(self, managers: Iterable[Any], policy=None, owners_size: int = 100000):
+        self.managers = list(managers)
+        if not self.managers:
+            raise ValueError("no managers")
+        self.policy = policy if policy is not None else RoundRobinPolicy()
+        self.owners_size = owners_size
+        # which manager each job was submitted through
+        self._owners: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, owners: Dict[str, Any]) -> None:
+        # must be called with the lock held
+        for job_id, manager in owners.items():
+            self._owners[job_id] = manager
+            self._owners.move_to_end(job_id)
+        while len(self._owners) > self.owners_size:
+            self._owners.popitem(last=False)
+
+    def choose(self) -> Any:
+        return self.managers[self.policy.choose(self.managers)]
+
+    def submit(self, name: str, command: Iterable[str]) -> str:
+        manager = self.choose()
+        job_id = manager.submit(name, command)
+        with self._lock:
+            self._remember({job_id: manager})
+        return job_id
+
+    def submit_many(
+        self,
+        jobs: Iterable[Tuple[str, Iterable[str]]],
+        max_workers: Optional[int] = None,
+    ) -> Iterator[SubmitResult]:
+        # like JobManager.submit_many, with each job going to the shard chosen for it
+        # and by default as many threads as all the shards would use between them
+        if max_workers is None:
+            max_workers = sum(manager._max_workers(None) for manager in self.managers)
+        return submit_concurrently(self.submit, jobs, max_workers)
+
+    def get_all(
+        self, created_after: datetime.datetime, **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        # takes the same arguments as JobManager.get_all, merging the shards
+        # newest first as each of them is listed
+        return heapq.merge(
+            *(manager.get_all(created_after, **kwargs) for manager in self.managers),
+            key=lambda job: job.get("createdAt", 0),
+            reverse=True,
+        )
+
+    def _owned(self, job_ids: Iterable[str]) -> Dict[str, Any]:
+        # the manager of each job, looking up any not submitted through this
+        job_ids = list(dict.fromkeys(job_ids))
+        with self._lock:
+            owners = {
+                job_id: self._owners[job_id]
+                for job_id in job_ids
+                if job_id in self._owners
+            }
+        unknown = [job_id for job_id in job_ids if job_id not in owners]
+        for manager in self.managers:
+            if not unknown:
+                break
+            for job_id in manager.describe(unknown):
+                owners[job_id] = manager
+            unknown = [job_id for job_id in unknown if job_id not in owners]
+        if unknown:
+            raise KeyError(f"{len(unknown)} jobs not found in any shard")
+        with self._lock:
+            self._remember(owners)
+        return {job_id: owners[job_id] for job_id in job_ids}
+
+    def futures(self, job_ids: Iterable[str]) -> Dict[str, Future]:
+        # each future resolves to the job description once the job has finished
+        owners = self._owned(job_ids)
+        futures = {}
+        for manager in self.managers:
+            owned = [job_id for job_id in owners if owners[job_id] is manager]
+            if owned:
+                futures.update(manager.futures(owned))
+        return {job_id: futures[job_id] for job_id in owners}
+
+    def as_completed(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        # yield each job description as the job finishes
+        for future in as_completed(self.futures(job_ids).values(), timeout):
+            yield future.result()
+
+    def wait(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        # wait for all the jobs to finish, returning their descriptions in order
+        futures = self.futures(job_ids)
+        _, not_done = wait(futures.values(), timeout, ALL_COMPLETED)
+        if not_done:
+            raise FuturesTimeoutError(f"{len(not_done)} jobs not finished")
+        return [future.result() for future in futures.values()]
@@ -0,0 +1,201 @@
+import csv
+import datetime
+from array import array
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence
+
+from .constants import JOB_STATUSES
+
+# stored for times a job has not reached yet
+MISSING = -1
+
+
+def percentiles(
+    values: Sequence[float], points: Iterable[float]
+) -> Dict[float, Optional[float]]:
+    # linearly interpolated between the closest ranks, None if there are no values
+    ordered = sorted(values)
+    result: Dict[float, Optional[float]] = {}
+    for point in points:
+        if not ordered:
+            result[point] = None
+            continue
+        rank = (len(ordered) - 1) * point / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        result[point] = ordered[lower] + (ordered[upper] - ordered[lower]) * (
+            rank - lower
+        )
+    return result
+
+
+class JobTable:
+    # Job summaries held as columns rather than one dict each, which takes tens
+    # of bytes per job instead of kilobytes.
+    #
+    # Times are milliseconds since 1970 in typed arrays, statuses are their index
+    # in JOB_STATUSES, job ids are packed end to end in one buffer, and names are
+    # interned since many jobs usually share a few.
+
+    created_at: array
+    started_at: array
+    stopped_at: array
+    status: array
+
+    def __init__(self, jobs: Iterable[Dict[str, Any]] = ()):
+        self.created_at = array("q")
+        self.started_at = array("q")
+        self.stopped_at = array("q")
+        self.status = array("B")
+        self._status_codes = {status: i for i, status in enumerate(JOB_STATUSES)}
+        # the end of each job id in the buffer
+        self._id_ends = array("L")
+        self._ids = bytearray()
+        self._name_codes: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._name = array("L")
+        self.extend(jobs)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def append(self, job: Dict[str, Any]) -> None:
+        # a job summary from list_jobs, or a description from describe_jobs
+        self.created_at.append(job["createdAt"])
+        self.started_at.append(job.get("startedAt", MISSING))
+        self.stopped_at.append(job.get("stoppedAt", MISSING))
+        self.status.append(self._status_codes[job["status"]])
+        self._ids += job["jobId"].encode()
+        self._id_ends.append(len(self._ids))
+        name_code = self._name_codes.get(job["jobName"])
+        if name_code is None:
+            name_code = len(self._names)
+            self._name_codes[job["jobName"]] = name_code
+            self._names.append(job["jobName"])
+        self._name.append(name_code)
+
+    def extend(self, jobs: Iterable[Dict[str, Any]]) -> None:
+        for job in jobs:
+            self.append(job)
+
+    def job_id(self, i: int) -> str:
+        start = self._id_ends[i - 1] if i > 0 else 0
+        return self._ids[start : self._id_ends[i]].decode()
+
+    def name(self, i: int) -> str:
+        return self._names[self._name[i]]
+
+    def job_status(self, i: int) -> str:
+        return JOB_STATUSES[self.status[i]]
+
+    def nbytes(self) -> int:
+        # roughly the memory held, not counting the interned names
+        columns = (
+            self.created_at,
+            self.started_at,
+            self.stopped_at,
+            self.status,
+            self._id_ends,
+            self._name,
+        )
+        return sum(column.itemsize * len(column) for column in columns) + len(self._ids)
+
+    def counts(self) -> Dict[str, int]:
+        # how many jobs are in each status
+        counts = [0] * len(JOB_STATUSES)
+        for code in self.status:
+            counts[code] += 1
+        return {status: counts[i] for i, status in enumerate(JOB_STATUSES)}
+
+    def queue_waits(self) -> List[float]:
+        # seconds from creation to starting, for the jobs that have started
+        return [
+            (started - created) / 1000
+            for created, started in zip(self.created_at, self.started_at)
+            if started != MISSING
+        ]
+
+    def run_times(self) -> List[float]:
+        # seconds from starting to stopping, for the jobs that have done both
+        return [
+            (stopped - started) / 1000
+            for started, stopped in zip(self.started_at, self.stopped_at)
+            if started != MISSING and stopped != MISSING
+        ]
+
+    def queue_wait_percentiles(
+        self, points: Iterable[float] = (50, 90, 99)
+    ) -> Dict[float, Optional[float]]:
+        return percentiles(self.queue_waits(), points)
+
+    def run_time_percentiles(
+        self, points: Iterable[float] = (50, 90, 99)
+    ) -> Dict[float, Optional[float]]:
+        return percentiles(self.run_times(), points)
+
+    def failures_per_hour(self) -> Dict[datetime.datetime, int]:
+        # failed jobs by the hour they stopped in, or were created in if never run
+        failed = self._status_codes["FAILED"]
+        hour = 60 * 60 * 1000
+        counts: Dict[int, int] = {}
+        for code, created, stopped in zip(
+            self.status, self.created_at, self.stopped_at
+        ):
+            if code != failed:
+                continue
+            when = (stopped if stopped != MISSING else created) // hour
+            counts[when] = counts.get(when, 0) + 1
+        result = {}
+        for when in sorted(counts):
+            start = datetime.datetime.fromtimestamp(
+                when * hour / 1000, tz=datetime.timezone.utc
+            )
+            result[start] = counts[when]
+        return result
+
+    def to_csv(self, file: IO[str]) -> None:
+        # one row per job, times as milliseconds since 1970 and blank if missing
+        writer = csv.writer(file)
+        writer.writerow(
+            ("job_id", "name", "status", "created_at", "started_at", "stopped_at")
+        )
+        for i in range(len(self)):
+            writer.writerow(
+                (
+                    self.job_id(i),
+                    self.name(i),
+                    self.job_status(i),
+                    self.created_at[i],
+                    "" if self.started_at[i] == MISSING else self.started_at[i],
+                    "" if self.stopped_at[i] == MISSING else self.stopped_at[i],
+                )
+            )
+
+    def to_arrow(self):
+        # needs the optional pyarrow dependency, see the arrow extra in setup.py
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("to_arrow requires pyarrow to be installed") from e
+
+        def times(column: array):
+            return pyarrow.array(
+                [None if value == MISSING else value for value in column],
+                type=pyarrow.timestamp("ms", tz="UTC"),
+            )
+
+        return pyarrow.table(
+            {
+                "job_id": pyarrow.array([self.job_id(i) for i in range(len(self))]),
+                "name": pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(self._name, type=pyarrow.uint32()),
+                    pyarrow.array(self._names, type=pyarrow.string()),
+                ),
+                "status": pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(self.status, type=pyarrow.uint8()),
+                    pyarrow.array(JOB_STATUSES),
+                ),
+                "created_at": times(self.created_at),
+                "started_at": times(self.started_at),
+                "stopped_at": times(self.stopped_at),
+            }
+        )
@@ -0,0 +1,179 @@
+import datetime
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .constants import DESCRIBE_JOBS_LIMIT, TERMINAL_JOB_STATUSES
+from .utils import call_with_backoff, chunks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    job_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    status_reason TEXT,
+    exit_code INTEGER,
+    created_at INTEGER NOT NULL,
+    started_at INTEGER,
+    stopped_at INTEGER,
+    terminal INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_terminal ON jobs (terminal);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# once a job is terminal its row is never updated again
+UPSERT = """
+INSERT INTO jobs (
+    job_id, job_name, status, status_reason, exit_code,
+    created_at, started_at, stopped_at, terminal
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (job_id) DO UPDATE SET
+    status = excluded.status,
+    status_reason = excluded.status_reason,
+    exit_code = excluded.exit_code,
+    started_at = excluded.started_at,
+    stopped_at = excluded.stopped_at,
+    terminal = excluded.terminal
+WHERE jobs.terminal = 0
+"""
+
+COLUMNS = (
+    "job_id",
+    "job_name",
+    "status",
+    "status_reason",
+    "exit_code",
+    "created_at",
+    "started_at",
+    "stopped_at",
+)
+
+
+class JobTracker:
+    # Keeps the state of a job manager's jobs in sqlite, so that each poll only
+    # has to ask about jobs that can still change plus any newly created jobs.
+
+    manager: Any
+    path: str
+    overlap: datetime.timedelta
+
+    def __init__(
+        self,
+        manager,
+        path: str = ":memory:",
+        created_after: Optional[datetime.datetime] = None,
+        overlap: datetime.timedelta = datetime.timedelta(minutes=1),
+    ):
+        self.manager = manager
+        self.path = path
+        # jobs can appear in listings a little after their creation time
+        self.overlap = overlap
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+        # an existing store remembers where it got to
+        if self._get_watermark() is None:
+            if created_after is None:
+                raise ValueError("created_after is required for a new tracker")
+            self._set_watermark(int(created_after.timestamp() * 1000))
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _get_watermark(self) -> Optional[int]:
+        row = self._connection.execute(
+            "SELECT value FROM state WHERE key = 'watermark'"
+        ).fetchone()
+        return None if row is None else int(row[0])
+
+    def _set_watermark(self, watermark: int) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES ('watermark', ?)",
+                (str(watermark),),
+            )
+
+    def _store(self, jobs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # save jobs, returning those whose status is different to before
+        changed = []
+        with self._connection:
+            for job in jobs:
+                row = self._connection.execute(
+                    "SELECT status FROM jobs WHERE job_id = ?", (job["jobId"],)
+                ).fetchone()
+                if row is not None and row[0] == job["status"]:
+                    continue
+                self._connection.execute(
+                    UPSERT,
+                    (
+                        job["jobId"],
+                        job["jobName"],
+                        job["status"],
+                        job.get("statusReason"),
+                        job.get("container", {}).get("exitCode"),
+                        job["createdAt"],
+                        job.get("startedAt"),
+                        job.get("stoppedAt"),
+                        job["status"] in TERMINAL_JOB_STATUSES,
+                    ),
+                )
+                changed.append(job)
+        return changed
+
+    def poll(self) -> List[Dict[str, Any]]:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/batch.html#Batch.Client.describe_jobs
+        with self._lock:
+            watermark = self._get_watermark()
+
+            # discover jobs created since last time
+            created_after = datetime.datetime.fromtimestamp(
+                watermark / 1000, tz=datetime.timezone.utc
+            )
+            listed = list(self.manager.get_all(created_after - self.overlap))
+            changed = self._store(listed)
+
+            # refresh the jobs that were not in that listing and may still change
+            listed_ids = frozenset(job["jobId"] for job in listed)
+            active_ids = [
+                job_id
+                for (job_id,) in self._connection.execute(
+                    "SELECT job_id FROM jobs WHERE terminal = 0"
+                )
+                if job_id not in listed_ids
+            ]
+            for chunk in chunks(active_ids, DESCRIBE_JOBS_LIMIT):
+                response = call_with_backoff(
+                    self.manager.client.describe_jobs, jobs=chunk
+                )
+                changed.extend(self._store(response["jobs"]))
+
+            # move on so older jobs are not listed again
+            if listed:
+                latest = max(job["createdAt"] for job in listed)
+                self._set_watermark(max(watermark, latest))
+
+        return changed
+
+    def jobs(
+        self, statuses: Optional[Iterable[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        query = f"SELECT {', '.join(COLUMNS)} FROM jobs"
+        params: List[str] = []
+        if statuses is not None:
+            params = list(statuses)
+            query += f" WHERE status IN ({', '.join('?' for _ in params)})"
+        query += " ORDER BY created_at"
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        for row in rows:
+            yield dict(zip(COLUMNS, row))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
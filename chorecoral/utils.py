@@ -0,0 +1,231 @@
+import contextlib
+import itertools
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from botocore.exceptions import ClientError
+
+# error codes AWS uses when a request was rejected for being too frequent
+# https://docs.aws.amazon.com/batch/latest/APIReference/CommonErrors.html
+THROTTLE_ERROR_CODES = frozenset(
+    ("TooManyRequestsException", "ThrottlingException", "Throttling")
+)
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    if not isinstance(error, ClientError):
+        return False
+    return error.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+def call_with_backoff(
+    func: Callable,
+    *args,
+    attempts: int = 8,
+    base_delay: float = 0.1,
+    max_delay: float = 20.0,
+    **kwargs,
+):
+    # retry throttled calls with "full jitter" exponential backoff so that many
+    # threads being throttled at once do not all retry at the same moment
+    # https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs)
+        except ClientError as e:
+            if not is_throttle_error(e) or attempt + 1 >= attempts:
+                raise
+        time.sleep(random.uniform(0, min(max_delay, base_delay * 2**attempt)))
+
+
+@contextlib.contextmanager
+def sqlite_connect(path: str) -> Iterator[sqlite3.Connection]:
+    # sqlite connections cannot be shared between threads, so open one per use
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        # commit on success, rollback on error
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def chunks(items: Iterable, size: int) -> Iterator[List]:
+    # split items into lists of at most size, without reading ahead of that
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_unordered(
+    executor: Executor, func: Callable, items: Iterable, max_in_flight: int
+) -> Iterator[Tuple[int, Any, Future]]:
+    # run func over items on the executor, yielding (index, item, future) as each
+    # finishes. Only max_in_flight items are pulled from the iterable at any time
+    # so that very long (or infinite) generators are never materialized.
+    iterator = enumerate(items)
+    pending: Dict[Future, Tuple[int, Any]] = {}
+    exhausted = False
+    try:
+        while True:
+            # top up the in-flight work
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = (index, item)
+
+            if not pending:
+                # nothing running and nothing left to run
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                yield index, item, future
+    finally:
+        # if the consumer stops early, do not start anything else
+        for future in pending:
+            future.cancel()
+
+
+class SubmitResult(NamedTuple):
+    # position of the job in the submitted iterable
+    index: int
+    name: str
+    # exactly one of job_id and error is set
+    job_id: Optional[str]
+    error: Optional[BaseException]
+
+
+def submit_concurrently(
+    submit: Callable[[str, Iterable[str]], str],
+    jobs: Iterable[Tuple[str, Iterable[str]]],
+    max_workers: int,
+) -> Iterator[SubmitResult]:
+    # submit (name, command) pairs with submit on max_workers threads, retrying
+    # throttling, and yield results as they finish
+
+    def submit_job(job: Tuple[str, Iterable[str]]) -> str:
+        name, command = job
+        return call_with_backoff(submit, name, command)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        for index, (name, _), future in imap_unordered(
+            executor, submit_job, jobs, max_workers * 2
+        ):
+            # a failure of one job should not stop the rest
+            error = future.exception()
+            if error:
+                yield SubmitResult(index, name, None, error)
+            else:
+                yield SubmitResult(index, name, future.result(), None)
+
+
+def prefetch(iterable: Iterable, depth: int) -> Iterator:
+    # Advance an iterable on a background thread, up to depth items ahead of what
+    # has been taken, so that producing the next item overlaps with whatever the
+    # caller is doing with this one. Closing this stops the thread once it has
+    # finished with the item it is on.
+    buffer: queue.Queue = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(entry: Tuple[str, Any]) -> bool:
+        # wait for room, unless told to stop
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run() -> None:
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(("item", item)):
+                    return
+            put(("done", None))
+        except BaseException as e:
+            put(("error", e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=run, name="chorecoral-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+def paginate(
+    method: Callable,
+    items_key: str,
+    max_results: Optional[int] = None,
+    prefetch_pages: int = 1,
+    **kwargs,
+) -> Iterator[Any]:
+    # Yield every item of a paginated describe or list call, following nextToken
+    # from page to page. Unless prefetch_pages is 0 the next pages are requested
+    # in the background while the caller works through the current one.
+    if max_results is not None:
+        kwargs["maxResults"] = max_results
+
+    def pages() -> Iterator[Dict[str, Any]]:
+        nextToken = None
+        first = True
+        while first or nextToken:
+            # handle a non-first page
+            if nextToken:
+                kwargs["nextToken"] = nextToken
+
+            response = method(**kwargs)
+            yield response
+
+            # mark that we've finished the first page
+            first = False
+            # move to the next page, if applicable
+            nextToken = response.get("nextToken")
+
+    responses = pages() if prefetch_pages < 1 else prefetch(pages(), prefetch_pages)
+    try:
+        for response in responses:
+            yield from response[items_key]
+    finally:
+        responses.close()
@@ -11,6 +11,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/sanogenetics/chore-coral",
     install_requires=["boto3"],
+    entry_points={"console_scripts": ["chorecoral = chorecoral.cli:main"]},
     extras_require={
         "dev": [
             "pytest-cov",
@@ -20,8 +21,9 @@ setup(
             "pip-tools",
             "pipdeptree",
             "pre-commit",
-            "moto >= 3.0.2.dev17",  # minimum version to include fixes
+            "moto[server] >= 3.0.2.dev17",  # minimum version to include fixes
             "docker",  # optional moto requirement to mock batch
         ],
+        "arrow": ["pyarrow"],  # for JobTable.to_arrow
     },
 )
@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+
+import boto3
+
+from chorecoral import JobManager, JobPoller
+from chorecoral.aio import AsyncBuilder, AsyncJobManager
+
+
+class TestAsyncJobManager:
+    def test_build_submit(
+        self, aws_iam, aws_batch, service_role, security_group, subnets
+    ):
+        """
+        GIVEN an asynchronously built job manager
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+
+        async def run():
+            async with await AsyncBuilder().build(
+                service_role,
+                security_group,
+                subnets,
+                "alpine",
+                "3.15.4",
+                max_concurrency=4,
+            ) as manager:
+                manager.manager.poller = JobPoller(
+                    manager.manager.client, min_interval=0.1, max_interval=0.2
+                )
+                """
+                WHEN many jobs are submitted at once and waited on
+                """
+                job_ids = await asyncio.gather(
+                    *(
+                        manager.submit(f"Test_job_{i}", ["sleep", "10"])
+                        for i in range(20)
+                    )
+                )
+                listed = [job async for job in manager.get_all(now)]
+                finished = await manager.wait(job_ids, timeout=30)
+                return job_ids, listed, finished
+
+        job_ids, listed, finished = asyncio.run(run())
+        """
+        THEN they should all be listed and finished
+        """
+        assert len(set(job_ids)) == 20
+        assert {job["jobId"] for job in listed} == set(job_ids)
+        assert [job["jobId"] for job in finished] == job_ids
+
+    def test_server_mode(self, moto_server):
+        """
+        GIVEN a job queue and definition in moto running as a server
+        """
+        iam = boto3.client("iam", endpoint_url=moto_server)
+        ec2 = boto3.client("ec2", endpoint_url=moto_server)
+        batch = boto3.client("batch", endpoint_url=moto_server)
+        role = iam.create_role(RoleName="server_role", AssumeRolePolicyDocument="{}")
+        vpc_id = [vpc for vpc in ec2.describe_vpcs()["Vpcs"] if vpc["IsDefault"]][0][
+            "VpcId"
+        ]
+        subnets = ec2.describe_subnets(
+            Filters=[{"Name": "vpc-id", "Values": [vpc_id]}]
+        )["Subnets"]
+        group = ec2.create_security_group(
+            GroupName="server_group", Description="server group"
+        )
+        environment = batch.create_compute_environment(
+            computeEnvironmentName="server",
+            type="MANAGED",
+            state="ENABLED",
+            computeResources={
+                "type": "FARGATE",
+                "maxvCpus": 100,
+                "subnets": [subnet["SubnetId"] for subnet in subnets],
+                "securityGroupIds": [group["GroupId"]],
+            },
+            serviceRole=role["Role"]["Arn"],
+        )
+        queue = batch.create_job_queue(
+            jobQueueName="server",
+            state="ENABLED",
+            priority=10,
+            computeEnvironmentOrder=[
+                {
+                    "order": 10,
+                    "computeEnvironment": environment["computeEnvironmentArn"],
+                }
+            ],
+        )
+        blueprint = batch.register_job_definition(
+            jobDefinitionName="server",
+            type="container",
+            containerProperties={"image": "alpine", "vcpus": 1, "memory": 512},
+        )
+        sync_manager = JobManager(
+            batch, queue["jobQueueArn"], blueprint["jobDefinitionArn"]
+        )
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+
+        async def run():
+            async with AsyncJobManager(sync_manager) as manager:
+                """
+                WHEN jobs are submitted concurrently over the network
+                """
+                job_ids = await asyncio.gather(
+                    *(
+                        manager.submit(f"Test_job_{i}", ["sleep", "10"])
+                        for i in range(10)
+                    )
+                )
+                listed = [job async for job in manager.get_all(now)]
+                return job_ids, listed
+
+        job_ids, listed = asyncio.run(run())
+        """
+        THEN they should all be listed
+        """
+        assert {job["jobId"] for job in listed} == set(job_ids)
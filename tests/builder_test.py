@@ -1,6 +1,16 @@
 import datetime
+import threading
 
-from chorecoral import Builder
+import boto3
+import pytest
+
+from chorecoral import (
+    Builder,
+    ComputeEnvironmentMismatchError,
+    MemoryResourceCache,
+    SqliteBuildLock,
+    SqliteResourceCache,
+)
 
 
 class TestBuilder:
@@ -23,8 +33,415 @@ class TestBuilder:
         assert len(jobs) == 1
         assert jobs[0]["jobId"] == job_id
 
-    # TODO with many compute environments for pagination
-    # TODO with many job queues for pagination
+    def test_cached(
+        self, aws_iam, aws_batch, service_role, security_group, subnets, batch_calls
+    ):
+        """
+        GIVEN a builder with a cache that has already built a blueprint
+        """
+        builder = Builder(cache=MemoryResourceCache())
+        manager = builder.build(
+            service_role, security_group, subnets, "alpine", "3.15.1"
+        )
+        batch_calls.clear()
+        """
+        WHEN the same blueprint is built again
+        """
+        manager_warm = builder.build(
+            service_role, security_group, subnets, "alpine", "3.15.1"
+        )
+        """
+        THEN it should resolve to the same resources with one verification call
+        """
+        assert manager_warm.queue == manager.queue
+        assert manager_warm.blueprint == manager.blueprint
+        assert [operation for operation, _ in batch_calls] == ["DescribeJobQueues"]
+
+    def test_cached_stale(
+        self, aws_iam, aws_batch, service_role, security_group, subnets
+    ):
+        """
+        GIVEN a builder with a cache entry for a queue that no longer exists
+        """
+        builder = Builder(cache=MemoryResourceCache())
+        manager = builder.build(
+            service_role, security_group, subnets, "alpine", "3.15.2"
+        )
+        (key,) = builder.cache._entries.keys()
+        builder.cache.set(
+            key,
+            {
+                "compute_environment_arn": "arn:missing",
+                "job_queue_arn": "arn:missing",
+                "job_definition_arn": "arn:missing",
+            },
+        )
+        """
+        WHEN the same blueprint is built again
+        """
+        manager_stale = builder.build(
+            service_role, security_group, subnets, "alpine", "3.15.2"
+        )
+        """
+        THEN it should fall back to finding the existing resources
+        """
+        assert manager_stale.queue == manager.queue
+        assert manager_stale.blueprint == manager.blueprint
+        assert builder.cache.get(key)["job_queue_arn"] == manager.queue
+
+    def test_cached_region(
+        self, aws_iam, aws_batch, service_role, security_group, subnets
+    ):
+        """
+        GIVEN a cache that a builder for one region has built a blueprint with
+        """
+        cache = MemoryResourceCache()
+        manager = Builder(cache=cache).build(
+            service_role, security_group, subnets, "alpine", "3.15.8"
+        )
+        """
+        WHEN a builder for another region, sharing that cache, builds the same
+        """
+        ec2 = boto3.client("ec2", region_name="us-east-1")
+        other_security_group = ec2.create_security_group(
+            GroupName="test security group", Description="test security group"
+        )["GroupId"]
+        other_subnets = [
+            subnet["SubnetId"] for subnet in ec2.describe_subnets()["Subnets"]
+        ]
+        other = Builder(cache=cache, region_name="us-east-1", verify_cache=False)
+        manager_other = other.build(
+            service_role, other_security_group, other_subnets, "alpine", "3.15.8"
+        )
+        """
+        THEN it should resolve its own resources rather than those of the first
+        """
+        assert ":us-east-1:" in manager_other.queue
+        assert manager_other.queue != manager.queue
+        assert len(cache._entries) == 2
+
+    def test_many_unrelated(
+        self,
+        aws_iam,
+        aws_batch,
+        service_role,
+        security_group,
+        subnets,
+        batch_calls,
+    ):
+        """
+        GIVEN an account with hundreds of unrelated resources
+        """
+        for i in range(100):
+            response = aws_batch.create_compute_environment(
+                computeEnvironmentName=f"unrelated_{i}",
+                type="MANAGED",
+                state="ENABLED",
+                computeResources={
+                    "type": "FARGATE",
+                    "maxvCpus": 100,
+                    "subnets": subnets,
+                    "securityGroupIds": [security_group],
+                },
+                serviceRole=service_role,
+            )
+            aws_batch.create_job_queue(
+                jobQueueName=f"unrelated_{i}",
+                state="ENABLED",
+                priority=10,
+                computeEnvironmentOrder=[
+                    {
+                        "order": 10,
+                        "computeEnvironment": response["computeEnvironmentArn"],
+                    }
+                ],
+            )
+            for image in ("alpine:1", "alpine:2", "alpine:3"):
+                aws_batch.register_job_definition(
+                    jobDefinitionName=f"unrelated_{i}",
+                    type="container",
+                    containerProperties={"image": image, "vcpus": 1, "memory": 512},
+                )
+        batch_calls.clear()
+        """
+        WHEN a new blueprint is built and then built again
+        """
+        manager = Builder().build(
+            service_role, security_group, subnets, "alpine", "3.15.3"
+        )
+        manager_warm = Builder().build(
+            service_role, security_group, subnets, "alpine", "3.15.3"
+        )
+        """
+        THEN each lookup should be one call that only asks for the named resource
+        """
+        assert manager_warm.queue == manager.queue
+        assert manager_warm.blueprint == manager.blueprint
+        name = "chorecoral_alpine_3_15_3"
+        lookups = [
+            ("DescribeComputeEnvironments", {"computeEnvironments": [name]}),
+            ("DescribeJobQueues", {"jobQueues": [name]}),
+            ("DescribeJobDefinitions", {"jobDefinitionName": name, "status": "ACTIVE"}),
+        ]
+        operations = [operation for operation, _ in batch_calls]
+        assert operations == [
+            "DescribeComputeEnvironments",
+            "CreateComputeEnvironment",
+            "DescribeJobQueues",
+            "CreateJobQueue",
+            "DescribeJobDefinitions",
+            "RegisterJobDefinition",
+            "DescribeComputeEnvironments",
+            "DescribeJobQueues",
+            "DescribeJobDefinitions",
+        ]
+        assert [call for call in batch_calls if call[0].startswith("Describe")] == (
+            lookups + lookups
+        )
+
+    def test_build_many(
+        self, aws_iam, aws_batch, service_role, security_group, subnets, batch_calls
+    ):
+        """
+        GIVEN one blueprint that already exists
+        """
+        Builder().build(service_role, security_group, subnets, "alpine", "3.16.0")
+        batch_calls.clear()
+        """
+        WHEN it and several new ones are built together
+        """
+        common = {
+            "service_role_arn": service_role,
+            "security_group_id": security_group,
+            "subnet_ids": subnets,
+            "image_name": "alpine",
+        }
+        specs = {tag: dict(common, image_tag=tag) for tag in ("3.16.0", "3.16.1")}
+        specs["big"] = dict(common, image_tag="3.16.2", vcpu=1, memory=2048)
+        managers = Builder().build_many(specs)
+        """
+        THEN each resource type should be described once and only new ones created
+        """
+        assert set(managers) == {"3.16.0", "3.16.1", "big"}
+        operations = [operation for operation, _ in batch_calls]
+        for operation in (
+            "DescribeComputeEnvironments",
+            "DescribeJobQueues",
+            "DescribeJobDefinitions",
+        ):
+            assert operations.count(operation) == 1
+        for operation in (
+            "CreateComputeEnvironment",
+            "CreateJobQueue",
+            "RegisterJobDefinition",
+        ):
+            assert operations.count(operation) == 2
+        """
+        AND building them one at a time should find the same resources
+        """
+        manager = Builder().build(
+            service_role,
+            security_group,
+            subnets,
+            "alpine",
+            "3.16.2",
+            vcpu=1,
+            memory=2048,
+        )
+        assert manager.queue == managers["big"].queue
+        assert manager.blueprint == managers["big"].blueprint
+
+    def test_build_many_cached(
+        self, aws_iam, aws_batch, service_role, security_group, subnets, batch_calls
+    ):
+        """
+        GIVEN a builder with a cache that has built several blueprints together
+        """
+        builder = Builder(cache=MemoryResourceCache())
+        specs = {
+            tag: {
+                "service_role_arn": service_role,
+                "security_group_id": security_group,
+                "subnet_ids": subnets,
+                "image_name": "alpine",
+                "image_tag": tag,
+            }
+            for tag in ("3.16.6", "3.16.7")
+        }
+        managers = builder.build_many(specs)
+        batch_calls.clear()
+        """
+        WHEN they are built together again
+        """
+        managers_warm = builder.build_many(specs)
+        """
+        THEN each should resolve to the same resources with one verification call
+        """
+        for tag in specs:
+            assert managers_warm[tag].queue == managers[tag].queue
+            assert managers_warm[tag].blueprint == managers[tag].blueprint
+        operations = [operation for operation, _ in batch_calls]
+        assert operations == ["DescribeJobQueues", "DescribeJobQueues"]
+
+    def test_build_many_concurrent(
+        self,
+        aws_iam,
+        aws_batch,
+        service_role,
+        security_group,
+        subnets,
+        batch_calls,
+        tmp_path,
+    ):
+        """
+        GIVEN many workers, each with a builder sharing a lock and cache on disk
+        """
+        path = str(tmp_path / "build.sqlite")
+        builders = [
+            Builder(cache=SqliteResourceCache(path), build_lock=SqliteBuildLock(path))
+            for _ in range(4)
+        ]
+        specs = {
+            tag: {
+                "service_role_arn": service_role,
+                "security_group_id": security_group,
+                "subnet_ids": subnets,
+                "image_name": "alpine",
+                "image_tag": tag,
+            }
+            for tag in ("3.16.8", "3.16.9")
+        }
+        """
+        WHEN they all build the same new blueprints together at once
+        """
+        results = []
+
+        def build_many(builder):
+            results.append(builder.build_many(specs))
+
+        threads = [threading.Thread(target=build_many, args=(b,)) for b in builders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        """
+        THEN the resources should be created once and shared by all of them
+        """
+        assert len(results) == 4
+        for tag in specs:
+            assert len({(r[tag].queue, r[tag].blueprint) for r in results}) == 1
+        operations = [operation for operation, _ in batch_calls]
+        for operation in (
+            "CreateComputeEnvironment",
+            "CreateJobQueue",
+            "RegisterJobDefinition",
+        ):
+            assert operations.count(operation) == 2
+
+    def test_concurrent(
+        self,
+        aws_iam,
+        aws_batch,
+        service_role,
+        security_group,
+        subnets,
+        batch_calls,
+        tmp_path,
+    ):
+        """
+        GIVEN many workers, each with a builder sharing a lock and cache on disk
+        """
+        path = str(tmp_path / "build.sqlite")
+        builders = [
+            Builder(cache=SqliteResourceCache(path), build_lock=SqliteBuildLock(path))
+            for _ in range(8)
+        ]
+        """
+        WHEN they all build the same new blueprint at once
+        """
+        managers = []
+
+        def build(builder):
+            managers.append(
+                builder.build(service_role, security_group, subnets, "alpine", "3.16.4")
+            )
+
+        threads = [threading.Thread(target=build, args=(b,)) for b in builders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        """
+        THEN the resources should be created once and shared by all of them
+        """
+        assert len(managers) == 8
+        assert len({(m.queue, m.blueprint) for m in managers}) == 1
+        operations = [operation for operation, _ in batch_calls]
+        for operation in (
+            "CreateComputeEnvironment",
+            "CreateJobQueue",
+            "RegisterJobDefinition",
+        ):
+            assert operations.count(operation) == 1
+
+    def test_spot(self, aws_iam, aws_batch, service_role, security_group, subnets):
+        """
+        GIVEN a builder
+        """
+        builder = Builder()
+        """
+        WHEN it builds with both Spot and on-demand capacity
+        """
+        manager = builder.build(
+            service_role,
+            security_group,
+            subnets,
+            "alpine",
+            "3.16.3",
+            max_vcpus=200,
+            spot_vcpus=400,
+        )
+        """
+        THEN the queue should use Spot first then on-demand, each as big as asked
+        """
+        queue = aws_batch.describe_job_queues(jobQueues=[manager.queue])["jobQueues"][0]
+        order = sorted(queue["computeEnvironmentOrder"], key=lambda o: o["order"])
+        environments = aws_batch.describe_compute_environments(
+            computeEnvironments=[o["computeEnvironment"] for o in order]
+        )["computeEnvironments"]
+        by_arn = {env["computeEnvironmentArn"]: env for env in environments}
+        resources = [by_arn[o["computeEnvironment"]]["computeResources"] for o in order]
+        assert [(r["type"], r["maxvCpus"]) for r in resources] == [
+            ("FARGATE_SPOT", 400),
+            ("FARGATE", 200),
+        ]
+        """
+        AND building it again should find the same resources
+        """
+        again = builder.build(
+            service_role,
+            security_group,
+            subnets,
+            "alpine",
+            "3.16.3",
+            max_vcpus=200,
+            spot_vcpus=400,
+        )
+        assert again.queue == manager.queue
+        """
+        AND building it with other capacity should fail
+        """
+        with pytest.raises(ComputeEnvironmentMismatchError):
+            builder.build(
+                service_role,
+                security_group,
+                subnets,
+                "alpine",
+                "3.16.3",
+                max_vcpus=100,
+                spot_vcpus=400,
+            )
+
     # TODO with invalid compute environment vCPU for errors
     # TODO with invalid compute environment memory for errors
     # TODO with invalid compute environment existing already for errors
@@ -0,0 +1,99 @@
+import pytest
+
+from chorecoral import (
+    JobDescriptionCache,
+    ResourceCache,
+    SqliteResourceCache,
+    resource_cache_key,
+)
+
+
+class TestResourceCache:
+    def test_incomplete(self):
+        """
+        GIVEN a cache that does not say how to delete entries
+        """
+
+        class IncompleteCache(ResourceCache):
+            def get(self, key):
+                return None
+
+            def set(self, key, value):
+                pass
+
+        """
+        WHEN it is created
+        THEN it should fail straight away
+        """
+        with pytest.raises(TypeError):
+            IncompleteCache()
+
+
+class TestSqliteResourceCache:
+    def test_roundtrip(self, tmp_path):
+        """
+        GIVEN an on-disk cache with a stored entry
+        """
+        key = resource_cache_key(name="test", subnet_ids=["a", "b"])
+        SqliteResourceCache(str(tmp_path / "cache.db")).set(key, {"arn": "arn:1"})
+        """
+        WHEN it is opened again
+        """
+        cache = SqliteResourceCache(str(tmp_path / "cache.db"))
+        """
+        THEN the entry should still be there
+        """
+        assert cache.get(key) == {"arn": "arn:1"}
+        assert cache.get(resource_cache_key(name="other")) is None
+
+    def test_expired(self, tmp_path):
+        """
+        GIVEN an on-disk cache with no time to live
+        """
+        cache = SqliteResourceCache(str(tmp_path / "cache.db"), ttl=-1)
+        """
+        WHEN an entry is stored
+        """
+        cache.set("key", {"arn": "arn:1"})
+        """
+        THEN it should be expired already
+        """
+        assert cache.get("key") is None
+
+
+class TestJobDescriptionCache:
+    def test_terminal_kept(self):
+        """
+        GIVEN a cache with no time to live
+        """
+        cache = JobDescriptionCache(ttl=-1)
+        """
+        WHEN a finished and an unfinished job are stored
+        """
+        cache.set({"jobId": "1", "status": "SUCCEEDED"})
+        cache.set({"jobId": "2", "status": "RUNNING"})
+        """
+        THEN only the finished one should be kept
+        """
+        assert cache.get("1") == {"jobId": "1", "status": "SUCCEEDED"}
+        assert cache.get("2") is None
+
+    def test_least_recently_used(self):
+        """
+        GIVEN a full cache
+        """
+        cache = JobDescriptionCache(max_size=2)
+        cache.set({"jobId": "1", "status": "FAILED"})
+        cache.set({"jobId": "2", "status": "FAILED"})
+        """
+        WHEN one entry is used and another added
+        """
+        cache.get("1")
+        cache.set({"jobId": "3", "status": "FAILED"})
+        """
+        THEN the entry used least recently should be dropped
+        """
+        assert len(cache) == 2
+        assert cache.get("2") is None
+        assert cache.get("1") is not None
+        assert cache.get("3") is not None
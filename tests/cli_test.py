@@ -0,0 +1,105 @@
+import json
+
+from chorecoral.cli import Checkpoint, main
+
+
+def write_manifest(path, jobs):
+    with open(path, "a") as f:
+        for name in jobs:
+            f.write(json.dumps({"name": name, "command": ["true"]}) + "\n")
+
+
+class TestCheckpoint:
+    def test_resume(self, tmp_path):
+        """
+        GIVEN a checkpoint with some lines recorded and a last line cut short
+        """
+        path = str(tmp_path / "checkpoint")
+        checkpoint = Checkpoint(path)
+        checkpoint.start("queue", "blueprint")
+        checkpoint.record(1, "job-1")
+        checkpoint.record(3, "job-3")
+        checkpoint.close()
+        with open(path, "a") as f:
+            f.write('{"line": 4, "jo')
+        """
+        WHEN it is read again
+        """
+        checkpoint = Checkpoint(path)
+        """
+        THEN it should know which lines are done and where they went
+        """
+        assert checkpoint.queue == "queue"
+        assert checkpoint.blueprint == "blueprint"
+        assert checkpoint.done == 2
+        assert [checkpoint.is_done(line) for line in range(1, 6)] == [
+            True,
+            False,
+            True,
+            False,
+            False,
+        ]
+        assert list(checkpoint.job_ids()) == ["job-1", "job-3"]
+        """
+        WHEN another line is recorded and it is read a second time
+        THEN the new line should be done as well
+        """
+        checkpoint.record(2, "job-2")
+        checkpoint.close()
+        checkpoint = Checkpoint(path)
+        assert checkpoint.done == 3
+        assert [checkpoint.is_done(line) for line in range(1, 6)] == [
+            True,
+            True,
+            True,
+            False,
+            False,
+        ]
+        assert list(checkpoint.job_ids()) == ["job-1", "job-3", "job-2"]
+
+
+class TestMain:
+    def test_submit(
+        self,
+        tmp_path,
+        capsys,
+        aws_iam,
+        aws_batch,
+        service_role,
+        security_group,
+        subnets,
+    ):
+        """
+        GIVEN a manifest with a line that is not a job
+        """
+        manifest = str(tmp_path / "manifest.jsonl")
+        write_manifest(manifest, ["Test_cli_0", "Test_cli_1"])
+        with open(manifest, "a") as f:
+            f.write("not json\n")
+        arguments = ["submit", manifest, "--service-role", service_role]
+        arguments += ["--security-group", security_group, "--image", "alpine"]
+        arguments += ["--tag", "3.15.0", "--name-prefix", "Testcli"]
+        for subnet in subnets:
+            arguments += ["--subnet", subnet]
+        """
+        WHEN it is submitted
+        THEN the jobs should be submitted and the bad line reported
+        """
+        assert main(arguments) == 1
+        assert "line 3 failed" in capsys.readouterr().err
+        assert Checkpoint(manifest + ".checkpoint").done == 2
+        """
+        AND WHEN more lines are added and it is submitted again
+        THEN only the new lines should be submitted
+        """
+        write_manifest(manifest, ["Test_cli_3"])
+        assert main(arguments) == 1
+        assert "submitted 1, failed 1, 3 done in all" in capsys.readouterr().out
+        """
+        AND WHEN its status is asked for
+        THEN every submitted job should be counted
+        """
+        assert main(["status", manifest]) == 0
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == "submitted 3 of 4"
+        assert sum(int(line.split()[1]) for line in lines[1:]) == 3
@@ -0,0 +1,50 @@
+import threading
+
+from chorecoral import Builder, ClientPool
+
+
+class TestClientPool:
+    def test_shared(self, aws_credentials):
+        """
+        GIVEN a client pool
+        """
+        pool = ClientPool()
+        """
+        WHEN clients are asked for from many threads at once
+        """
+        clients = []
+
+        def get():
+            clients.append(pool.get("batch", max_pool_connections=50))
+
+        threads = [threading.Thread(target=get) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        """
+        THEN they should all get the same client, with the settings asked for
+        """
+        assert len({id(client) for client in clients}) == 1
+        assert clients[0].meta.config.max_pool_connections == 50
+        assert pool.get("batch", max_pool_connections=10) is not clients[0]
+
+    def test_builds_share_client(
+        self, aws_iam, aws_batch, service_role, security_group, subnets
+    ):
+        """
+        GIVEN a builder with its own client pool
+        """
+        builder = Builder(client_pool=ClientPool(), retry_mode="adaptive")
+        """
+        WHEN it builds several managers
+        """
+        managers = [
+            builder.build(service_role, security_group, subnets, "alpine", tag)
+            for tag in ("3.15.5", "3.15.6", "3.15.5")
+        ]
+        """
+        THEN they should share one client
+        """
+        assert managers[0].client is managers[1].client is managers[2].client
+        assert managers[0].client.meta.config.retries["mode"] == "adaptive"
@@ -0,0 +1,106 @@
+import subprocess
+
+from chorecoral import CoalescingSubmitter, parse_serial_output
+from chorecoral.commands import serial_command
+
+
+class TestCoalescingSubmitter:
+    def test_serial_command(self):
+        """
+        GIVEN a serial command for several commands, one of which fails
+        """
+        command = serial_command([["echo", "a"], ["false"], ["echo", "b c"]], 10)
+        """
+        WHEN it is run
+        """
+        result = subprocess.run(command, capture_output=True, text=True)
+        """
+        THEN every command should run and report its exit code
+        """
+        assert result.returncode == 1
+        assert parse_serial_output(result.stdout.splitlines()) == {
+            10: 0,
+            11: 1,
+            12: 0,
+        }
+
+    def test_buckets(self, manager):
+        """
+        GIVEN a submitter that packs up to two tasks per job
+        """
+        """
+        WHEN five tasks are added
+        """
+        with CoalescingSubmitter(manager, "Test_bucket", max_tasks=2) as submitter:
+            tasks = [submitter.add(f"task_{i}", ["sleep", str(i)]) for i in range(5)]
+        """
+        THEN they should be submitted as three jobs
+        """
+        assert len({task.job_id for task in tasks}) == 3
+        assert tasks[0].job_id == tasks[1].job_id
+        assert [task.index for task in tasks] == [0, 1, 0, 1, 0]
+        assert all(task.child_job_id is None for task in tasks)
+
+    def test_runtime(self, manager):
+        """
+        GIVEN a submitter that packs up to a minute of work per job
+        """
+        """
+        WHEN tasks estimated to take 25 seconds each are added
+        """
+        with CoalescingSubmitter(manager, "Test_bucket", max_runtime=60) as submitter:
+            tasks = [submitter.add(f"task_{i}", ["sleep", "25"], 25) for i in range(5)]
+        """
+        THEN no more than two should share a job
+        """
+        assert [task.index for task in tasks] == [0, 1, 0, 1, 0]
+
+    def test_array(self, manager):
+        """
+        GIVEN a submitter that spreads each bucket over three array children
+        """
+        """
+        WHEN seven tasks are added
+        """
+        with CoalescingSubmitter(manager, "Test_bucket", array_size=3) as submitter:
+            tasks = [submitter.add(f"task_{i}", ["sleep", str(i)]) for i in range(7)]
+        """
+        THEN they should be one array job with contiguous slices per child
+        """
+        assert len({task.job_id for task in tasks}) == 1
+        job_id = tasks[0].job_id
+        assert [task.child_job_id for task in tasks] == [
+            f"{job_id}:0",
+            f"{job_id}:0",
+            f"{job_id}:1",
+            f"{job_id}:1",
+            f"{job_id}:2",
+            f"{job_id}:2",
+            f"{job_id}:2",
+        ]
+
+    def test_failed_bucket(self, manager):
+        """
+        GIVEN a submitter whose first bucket cannot be submitted
+        """
+        submit = manager.submit
+
+        def fail_first(name, command):
+            if name.endswith("_0"):
+                raise ValueError("too big")
+            return submit(name, command)
+
+        manager.submit = fail_first
+        """
+        WHEN more tasks are added than fit in one bucket
+        """
+        with CoalescingSubmitter(manager, "Test_bucket", max_tasks=2) as submitter:
+            tasks = [submitter.add(f"task_{i}", ["sleep", str(i)]) for i in range(3)]
+        """
+        THEN the tasks of the failed bucket should have its error, and the rest
+        should still be submitted
+        """
+        assert [str(task.error) for task in tasks[:2]] == ["too big", "too big"]
+        assert [task.job_id for task in tasks[:2]] == [None, None]
+        assert tasks[2].error is None
+        assert tasks[2].job_id is not None
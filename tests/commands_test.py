@@ -0,0 +1,22 @@
+import os
+import subprocess
+
+from chorecoral.commands import array_dispatch_command
+
+
+class TestCommands:
+    def test_array_dispatch_command(self):
+        """
+        GIVEN a dispatch command for several commands with awkward quoting
+        """
+        command = array_dispatch_command([["echo", "a"], ["echo", "b 'c' $d"]])
+        """
+        WHEN it is run as the second child of an array
+        """
+        env = dict(os.environ, AWS_BATCH_JOB_ARRAY_INDEX="1")
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        """
+        THEN only the second command should run, with its arguments intact
+        """
+        assert result.returncode == 0
+        assert result.stdout == "b 'c' $d\n"
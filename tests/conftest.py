@@ -1,9 +1,16 @@
 import os
-from typing import List
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import boto3
 import moto
 import pytest
+from botocore.exceptions import ClientError
+from moto.server import DomainDispatcherApplication, create_backend_app
+from werkzeug.serving import make_server
+
+from chorecoral import DEFAULT_CLIENT_POOL, Builder, JobManager
 
 
 @pytest.fixture(scope="session")
@@ -40,6 +47,24 @@ def aws_ec2(aws_credentials):
         yield boto3.client("ec2")
 
 
+@pytest.fixture(scope="session")
+def aws_events(aws_credentials):
+    with moto.mock_events():
+        yield boto3.client("events")
+
+
+@pytest.fixture(scope="session")
+def aws_logs(aws_credentials):
+    with moto.mock_logs():
+        yield boto3.client("logs")
+
+
+@pytest.fixture(scope="session")
+def aws_sqs(aws_credentials):
+    with moto.mock_sqs():
+        yield boto3.client("sqs")
+
+
 @pytest.fixture(scope="session")
 def service_role(aws_iam) -> str:
     role = aws_iam.create_role(
@@ -77,3 +102,129 @@ def subnets(aws_ec2, virtual_private_cloud: str) -> List[str]:
     )
     subnet_ids = [subnet["SubnetId"] for subnet in response["Subnets"]]
     return subnet_ids
+
+
+@pytest.fixture
+def manager(
+    request, aws_iam, aws_batch, service_role, security_group, subnets
+) -> JobManager:
+    # moto does not filter job listings, so give each test its own queue
+    name_prefix = re.sub("[^A-Za-z0-9]", "", request.node.name)[:64]
+    return Builder().build(
+        service_role,
+        security_group,
+        subnets,
+        "alpine",
+        "3.15.0",
+        name_prefix=name_prefix,
+    )
+
+
+@pytest.fixture
+def batch_calls(aws_batch) -> List[Tuple[str, Dict[str, Any]]]:
+    # record each batch operation called by shared clients created from now on
+    calls: List[Tuple[str, Dict[str, Any]]] = []
+
+    def record(model, params, **kwargs):
+        calls.append((model.name, dict(params)))
+
+    DEFAULT_CLIENT_POOL.clear()
+    session = DEFAULT_CLIENT_POOL.session()
+    session.events.register("provide-client-params.batch", record)
+    yield calls
+    session.events.unregister("provide-client-params.batch", record)
+
+
+@pytest.fixture(scope="session")
+def moto_server(aws_credentials) -> str:
+    # moto running as a real http server, for code that talks to it over the network
+    server = make_server(
+        "127.0.0.1", 0, DomainDispatcherApplication(create_backend_app), threaded=True
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class FakeBatchClient:
+    # Just enough of the Batch job calls for tests that need jobs in particular
+    # states or at particular times, which moto cannot set up or filter by.
+    # Listings are paged and each call is recorded.
+
+    def __init__(
+        self,
+        jobs: Iterable[Dict[str, Any]],
+        page_size: int = 100,
+        fail_once: Iterable[str] = (),
+    ):
+        self.jobs = {job["jobId"]: dict(job) for job in jobs}
+        self.page_size = page_size
+        self.meta = boto3.client("batch").meta
+        self.list_calls = 0
+        self.describe_calls: List[List[str]] = []
+        self.stopped: List[Tuple[str, str]] = []
+        # jobs that fail to stop the first time they are asked to
+        self.fail_once = set(fail_once)
+        self._lock = threading.Lock()
+
+    def list_jobs(
+        self,
+        jobQueue: str,
+        jobStatus: Optional[str] = None,
+        filters: Iterable[Dict[str, Any]] = (),
+        nextToken: Optional[str] = None,
+    ):
+        with self._lock:
+            self.list_calls += 1
+        after = before = None
+        for job_filter in filters:
+            if job_filter["name"] == "AFTER_CREATED_AT":
+                after = int(job_filter["values"][0])
+            if job_filter["name"] == "BEFORE_CREATED_AT":
+                before = int(job_filter["values"][0])
+        matches = [
+            job
+            for job in self.jobs.values()
+            if (jobStatus is None or job["status"] == jobStatus)
+            and (after is None or job["createdAt"] > after)
+            and (before is None or job["createdAt"] < before)
+        ]
+        # newest first, as Batch lists them
+        matches.sort(key=lambda job: (job.get("createdAt", 0), job["jobId"]))
+        matches.reverse()
+        offset = int(nextToken or 0)
+        page = matches[offset : offset + self.page_size]
+        response = {"jobSummaryList": [dict(job) for job in page]}
+        if offset + self.page_size < len(matches):
+            response["nextToken"] = str(offset + self.page_size)
+        return response
+
+    def describe_jobs(self, jobs: List[str]):
+        assert len(jobs) <= 100
+        with self._lock:
+            self.describe_calls.append(jobs)
+        return {
+            "jobs": [dict(self.jobs[job_id]) for job_id in jobs if job_id in self.jobs]
+        }
+
+    def _stop(self, action: str, jobId: str, reason: str):
+        with self._lock:
+            if jobId in self.fail_once:
+                self.fail_once.discard(jobId)
+                raise ClientError({"Error": {"Code": "ServerException"}}, action)
+            self.stopped.append((action, jobId))
+            self.jobs[jobId]["status"] = "FAILED"
+        return {}
+
+    def cancel_job(self, jobId: str, reason: str):
+        return self._stop("cancel", jobId, reason)
+
+    def terminate_job(self, jobId: str, reason: str):
+        return self._stop("terminate", jobId, reason)
+
+
+@pytest.fixture
+def fake_batch(aws_credentials):
+    # makes fake batch clients from the jobs they should have
+    return FakeBatchClient
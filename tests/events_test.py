@@ -0,0 +1,157 @@
+import json
+from typing import Any, Dict, List
+
+import boto3
+import pytest
+
+from chorecoral import Builder, JobManager
+
+
+def count_calls(client, operation: str) -> List[Dict[str, Any]]:
+    # the parameters of each call of an operation made by the client from now on
+    calls: List[Dict[str, Any]] = []
+    client.meta.events.register(
+        f"provide-client-params.sqs.{operation}",
+        lambda params, **kwargs: calls.append(dict(params)),
+    )
+    return calls
+
+
+def waiting(sqs_client, queue_url: str) -> int:
+    # messages in the queue, whether received or not, that are not yet deleted
+    attributes = sqs_client.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=[
+            "ApproximateNumberOfMessages",
+            "ApproximateNumberOfMessagesNotVisible",
+        ],
+    )["Attributes"]
+    return sum(int(count) for count in attributes.values())
+
+
+def state_change(job_id: str, status: str) -> str:
+    # as EventBridge delivers a Batch Job State Change event to SQS
+    return json.dumps(
+        {
+            "detail-type": "Batch Job State Change",
+            "source": "aws.batch",
+            "detail": {"jobId": job_id, "jobName": job_id, "status": status},
+        }
+    )
+
+
+class TestEvents:
+    def test_build(
+        self,
+        aws_iam,
+        aws_batch,
+        aws_events,
+        aws_sqs,
+        service_role,
+        security_group,
+        subnets,
+    ):
+        """
+        GIVEN a builder
+        """
+        builder = Builder()
+        """
+        WHEN it builds a manager with events
+        """
+        manager = builder.build(
+            service_role, security_group, subnets, "alpine", "3.15.7", events=True
+        )
+        """
+        THEN state changes of jobs in its queue should be routed to an SQS queue
+        that only that rule can send to
+        """
+        assert manager.events_queue_url in aws_sqs.list_queues()["QueueUrls"]
+        name = manager.events_queue_url.rsplit("/", 1)[1]
+        rule = aws_events.describe_rule(Name=name)
+        pattern = json.loads(rule["EventPattern"])
+        assert pattern["detail-type"] == ["Batch Job State Change"]
+        assert pattern["detail"]["jobQueue"] == [manager.queue]
+        targets = aws_events.list_targets_by_rule(Rule=name)["Targets"]
+        attributes = aws_sqs.get_queue_attributes(
+            QueueUrl=manager.events_queue_url, AttributeNames=["QueueArn", "Policy"]
+        )["Attributes"]
+        assert [target["Arn"] for target in targets] == [attributes["QueueArn"]]
+        policy = json.loads(attributes["Policy"])
+        condition = policy["Statement"][0]["Condition"]["ArnEquals"]
+        assert condition["aws:SourceArn"] == rule["Arn"]
+
+        """
+        WHEN it builds the same again
+        """
+        again = builder.build(
+            service_role, security_group, subnets, "alpine", "3.15.7", events=True
+        )
+        """
+        THEN it should reuse the same queue and rule
+        """
+        assert again.events_queue_url == manager.events_queue_url
+        assert len(aws_events.list_targets_by_rule(Rule=name)["Targets"]) == 1
+
+    def test_events(self, aws_sqs):
+        """
+        GIVEN a manager with events, and a queue of state changes with repeats
+        """
+        queue_url = aws_sqs.create_queue(QueueName="test_events")["QueueUrl"]
+        manager = JobManager(
+            boto3.client("batch"), "queue", "blueprint", queue_url, aws_sqs
+        )
+        changes = [(f"job{i}", "RUNNING") for i in range(15)]
+        changes += [(f"job{i}", "SUCCEEDED") for i in range(15)]
+        for job_id, status in changes + changes[:5]:
+            aws_sqs.send_message(
+                QueueUrl=queue_url, MessageBody=state_change(job_id, status)
+            )
+        receives = count_calls(aws_sqs, "ReceiveMessage")
+        deletes = count_calls(aws_sqs, "DeleteMessageBatch")
+        """
+        WHEN the events are read until there are no more
+        """
+        events = list(manager.events(wait_time=0, max_empty_receives=2))
+        """
+        THEN each change should be yielded once, received and deleted ten at a time
+        """
+        assert [(event["jobId"], event["status"]) for event in events] == changes
+        assert [len(delete["Entries"]) for delete in deletes] == [10, 10, 10, 5]
+        assert len(receives) == 4 + 2
+        assert waiting(aws_sqs, queue_url) == 0
+
+    def test_events_stopped(self, aws_sqs):
+        """
+        GIVEN a manager with events, and a queue of state changes
+        """
+        queue_url = aws_sqs.create_queue(QueueName="test_events_stopped")["QueueUrl"]
+        manager = JobManager(
+            boto3.client("batch"), "queue", "blueprint", queue_url, aws_sqs
+        )
+        for i in range(10):
+            aws_sqs.send_message(
+                QueueUrl=queue_url, MessageBody=state_change(f"job{i}", "SUCCEEDED")
+            )
+        """
+        WHEN reading stops part way through a batch
+        """
+        events = manager.events(wait_time=0)
+        next(events)
+        next(events)
+        events.close()
+        """
+        THEN only the events yielded should have been deleted
+        """
+        assert waiting(aws_sqs, queue_url) == 8
+
+    def test_events_not_built(self, aws_credentials):
+        """
+        GIVEN a manager built without events
+        """
+        manager = JobManager(boto3.client("batch"), "queue", "blueprint")
+        """
+        WHEN events are read
+        THEN it should say so
+        """
+        with pytest.raises(ValueError):
+            next(manager.events())
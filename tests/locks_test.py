@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from chorecoral import BuildLock, SingleFlight, SqliteBuildLock
+
+
+class TestSingleFlight:
+    def test_coalesced(self):
+        """
+        GIVEN a slow function
+        """
+        flights = SingleFlight()
+        runs = []
+
+        def slow():
+            runs.append(None)
+            time.sleep(0.2)
+            return {"arn": "a"}
+
+        """
+        WHEN it is called for the same key from many threads at once
+        """
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        """
+        THEN it should run once, with every caller getting its result
+        """
+        assert len(runs) == 1
+        assert results == [{"arn": "a"}] * 10
+        """
+        AND it should run again once that has finished
+        """
+        flights.do("key", slow)
+        assert len(runs) == 2
+
+
+class TestBuildLock:
+    def test_incomplete(self):
+        """
+        GIVEN a build lock that does not say how to hold it
+        """
+
+        class IncompleteLock(BuildLock):
+            pass
+
+        """
+        WHEN it is created
+        THEN it should fail straight away
+        """
+        with pytest.raises(TypeError):
+            IncompleteLock()
+
+
+class TestSqliteBuildLock:
+    def test_exclusive(self, tmp_path):
+        """
+        GIVEN two locks on the same database, as if in different processes
+        """
+        path = str(tmp_path / "locks.sqlite")
+        locks = [SqliteBuildLock(path, poll_interval=0.01) for _ in range(2)]
+        """
+        WHEN both are held for the same key from different threads
+        """
+        held = []
+
+        def hold(lock, name):
+            with lock.hold("key"):
+                held.append((name, "start"))
+                time.sleep(0.1)
+                held.append((name, "end"))
+
+        threads = [
+            threading.Thread(target=hold, args=(lock, i))
+            for i, lock in enumerate(locks)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        """
+        THEN one should wait for the other to be released
+        """
+        assert held[0][0] == held[1][0]
+        assert held[2][0] == held[3][0]
+
+    def test_expired(self, tmp_path):
+        """
+        GIVEN a lease that was never released
+        """
+        path = str(tmp_path / "locks.sqlite")
+        lock = SqliteBuildLock(path, ttl=0.1, poll_interval=0.01)
+        assert lock._acquire("key", "dead")
+        """
+        WHEN the lock is held after the lease has expired
+        """
+        start = time.monotonic()
+        with lock.hold("key"):
+            """
+            THEN it should be taken over
+            """
+            assert time.monotonic() - start < 5
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from chorecoral import Builder, ClientPool, JobManager
+
+
+@pytest.fixture(scope="session")
+def log_group(aws_logs) -> str:
+    # where jobs log to by default
+    aws_logs.create_log_group(logGroupName="/aws/batch/job")
+    return "/aws/batch/job"
+
+
+def job(job_id: str, status: str, stream=None):
+    description = {"jobId": job_id, "status": status, "container": {}}
+    if stream is not None:
+        description["container"]["logStreamName"] = stream
+    return description
+
+
+def put_logs(aws_logs, stream: str, messages):
+    now = int(time.time() * 1000)
+    aws_logs.put_log_events(
+        logGroupName="/aws/batch/job",
+        logStreamName=stream,
+        logEvents=[
+            {"timestamp": now + i, "message": message}
+            for i, message in enumerate(messages)
+        ],
+    )
+
+
+class TestLogs:
+    def test_logs(self, aws_logs, log_group, fake_batch):
+        """
+        GIVEN a finished job with several pages of logs
+        """
+        aws_logs.create_log_stream(logGroupName=log_group, logStreamName="a")
+        put_logs(aws_logs, "a", [f"line {i}" for i in range(25)])
+        client = fake_batch([job("1", "FAILED", "a"), job("2", "FAILED")])
+        manager = JobManager(client, "queue", "blueprint", logs_client=aws_logs)
+        """
+        WHEN its logs are read
+        """
+        events = list(manager.logs("1", limit=10))
+        """
+        THEN every line should be read once, in order
+        """
+        assert [event["message"] for event in events] == [
+            f"line {i}" for i in range(25)
+        ]
+        """
+        AND a job that never started should have none
+        """
+        assert list(manager.logs("2")) == []
+
+        """
+        WHEN the ends of the logs of many jobs are read
+        """
+        tails = manager.logs_many(["1", "2", "missing"], tail=3)
+        """
+        THEN each job found should have its last few lines
+        """
+        assert {job_id: [e["message"] for e in tails[job_id]] for job_id in tails} == {
+            "1": ["line 22", "line 23", "line 24"],
+            "2": [],
+        }
+
+    def test_follow(self, aws_logs, log_group, fake_batch):
+        """
+        GIVEN a running job that is still writing logs
+        """
+        aws_logs.create_log_stream(logGroupName=log_group, logStreamName="b")
+        put_logs(aws_logs, "b", ["start"])
+        client = fake_batch([job("1", "RUNNING", "b")])
+        manager = JobManager(client, "queue", "blueprint", logs_client=aws_logs)
+
+        def finish():
+            time.sleep(0.3)
+            put_logs(aws_logs, "b", ["middle", "end"])
+            client.jobs["1"]["status"] = "SUCCEEDED"
+
+        thread = threading.Thread(target=finish)
+        thread.start()
+        """
+        WHEN its logs are followed
+        """
+        events = list(manager.logs("1", follow=True, poll_interval=0.1))
+        thread.join()
+        """
+        THEN every line should be read, stopping once the job finished
+        """
+        assert [event["message"] for event in events] == ["start", "middle", "end"]
+
+    def test_lazy_client(
+        self, aws_iam, aws_batch, aws_logs, service_role, security_group, subnets
+    ):
+        """
+        GIVEN a manager from a builder with its own clients
+        """
+        client_pool = ClientPool()
+        manager = Builder(client_pool=client_pool).build(
+            service_role, security_group, subnets, "alpine", "3.16.5"
+        )
+        """
+        WHEN it has not read any logs
+        THEN it should not have a logs client
+        """
+        assert [key[0] for key in client_pool._clients] == ["batch"]
+        """
+        AND WHEN it needs to read logs
+        THEN it should get one from the builder's pool
+        """
+        assert manager.logs_client is client_pool.get("logs")
@@ -0,0 +1,411 @@
+import datetime
+import itertools
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from chorecoral import GraphNode, JobManager
+
+
+class TestJobManager:
+    def test_submit_array(self, manager):
+        """
+        GIVEN a job manager
+        """
+        """
+        WHEN an array of three different commands is submitted
+        """
+        array_job = manager.submit_array(
+            "Test_array_1", [["echo", "a"], ["echo", "b c"], ["sleep", "10"]]
+        )
+        """
+        THEN it should be a single job with a child per command
+        """
+        assert array_job.size == 3
+        assert array_job.child_ids() == [
+            f"{array_job.job_id}:0",
+            f"{array_job.job_id}:1",
+            f"{array_job.job_id}:2",
+        ]
+        jobs = tuple(manager.get_all(datetime.datetime(1970, 1, 1)))
+        assert len(jobs) == 1
+        assert jobs[0]["jobId"] == array_job.job_id
+
+    def test_get_all_expand_arrays(self, aws_credentials):
+        """
+        GIVEN an array job with two children
+        """
+        client = boto3.client("batch")
+        manager = JobManager(client, "queue", "blueprint")
+        stubber = Stubber(client)
+        stubber.add_response(
+            "list_jobs",
+            {
+                "jobSummaryList": [
+                    {
+                        "jobId": "parent",
+                        "jobName": "array",
+                        "arrayProperties": {"size": 2},
+                    }
+                ]
+            },
+        )
+        for status in ("SUBMITTED", "PENDING", "RUNNABLE", "STARTING", "RUNNING"):
+            stubber.add_response(
+                "list_jobs",
+                {"jobSummaryList": []},
+                {"arrayJobId": "parent", "jobStatus": status},
+            )
+        stubber.add_response(
+            "list_jobs",
+            {
+                "jobSummaryList": [
+                    {
+                        "jobId": "parent:0",
+                        "jobName": "array",
+                        "arrayProperties": {"index": 0},
+                    }
+                ]
+            },
+            {"arrayJobId": "parent", "jobStatus": "SUCCEEDED"},
+        )
+        stubber.add_response(
+            "list_jobs",
+            {
+                "jobSummaryList": [
+                    {
+                        "jobId": "parent:1",
+                        "jobName": "array",
+                        "arrayProperties": {"index": 1},
+                    }
+                ]
+            },
+            {"arrayJobId": "parent", "jobStatus": "FAILED"},
+        )
+        """
+        WHEN all jobs are listed with arrays expanded
+        """
+        with stubber:
+            jobs = tuple(
+                manager.get_all(datetime.datetime(1970, 1, 1), expand_arrays=True)
+            )
+        """
+        THEN the parent should be followed by its children
+        """
+        assert [job["jobId"] for job in jobs] == ["parent", "parent:0", "parent:1"]
+
+    def test_submit_many(self, manager):
+        """
+        GIVEN a job manager
+        """
+        """
+        WHEN an endless generator of jobs is submitted
+        """
+        jobs = ((f"Test_job_{i}", ["sleep", str(i)]) for i in itertools.count())
+        results = tuple(itertools.islice(manager.submit_many(jobs, max_workers=4), 20))
+        """
+        THEN the results should stream back without consuming the whole generator
+        """
+        assert len(results) == 20
+        assert all(result.error is None for result in results)
+        assert len({result.job_id for result in results}) == 20
+        assert next(jobs)[0].startswith("Test_job_")
+
+    def test_submit_many_throttled(self, aws_credentials):
+        """
+        GIVEN a client that is throttled once then fails outright
+        """
+        client = boto3.client("batch")
+        manager = JobManager(client, "queue", "blueprint")
+        stubber = Stubber(client)
+        stubber.add_client_error(
+            "submit_job", "TooManyRequestsException", http_status_code=429
+        )
+        stubber.add_response("submit_job", {"jobId": "1", "jobName": "first"})
+        stubber.add_client_error("submit_job", "ClientException")
+        """
+        WHEN two jobs are submitted
+        """
+        with stubber:
+            results = tuple(
+                manager.submit_many(
+                    [("first", ["true"]), ("second", ["true"])], max_workers=1
+                )
+            )
+        """
+        THEN the throttled job should be retried and the failure reported
+        """
+        results = sorted(results)
+        assert results[0].job_id == "1"
+        assert results[0].error is None
+        assert results[1].job_id is None
+        assert isinstance(results[1].error, ClientError)
+
+    def test_get_all_sharded(self, fake_batch):
+        """
+        GIVEN a week of jobs, mostly bunched up in one hour
+        """
+        start = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
+            days=7
+        )
+        start_ms = int(start.timestamp() * 1000)
+        jobs = [
+            {"jobId": str(i), "createdAt": start_ms + i * 3600 * 1000}
+            for i in range(1, 24 * 7)
+        ]
+        jobs += [
+            {"jobId": f"busy_{i}", "createdAt": start_ms + 1000 * i}
+            for i in range(1, 201)
+        ]
+        client = fake_batch(jobs, page_size=10)
+        manager = JobManager(client, "queue", "blueprint")
+        """
+        WHEN they are listed in ordered shards
+        """
+        listed = tuple(manager.get_all(start, shards=4, ordered=True, max_workers=4))
+        """
+        THEN every job should be listed once, newest first
+        """
+        newest_first = sorted(jobs, key=lambda job: job["createdAt"], reverse=True)
+        assert [job["jobId"] for job in listed] == [
+            job["jobId"] for job in newest_first
+        ]
+
+    def test_get_table(self, fake_batch):
+        """
+        GIVEN several pages of jobs
+        """
+        start = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
+            days=1
+        )
+        start_ms = int(start.timestamp() * 1000)
+        jobs = [
+            {
+                "jobId": str(i),
+                "jobName": "job",
+                "status": "SUCCEEDED",
+                "createdAt": start_ms + i,
+            }
+            for i in range(1, 251)
+        ]
+        manager = JobManager(fake_batch(jobs), "queue", "blueprint")
+        """
+        WHEN they are collected into a table
+        """
+        table = manager.get_table(start)
+        """
+        THEN all of them should be in it
+        """
+        assert len(table) == 250
+        assert table.counts()["SUCCEEDED"] == 250
+        assert table.job_id(0) == "250"
+
+    def test_get_all_sharded_moto(self, manager):
+        """
+        GIVEN a job manager with some jobs
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        job_ids = {manager.submit(f"Test_job_{i}", ["sleep", "10"]) for i in range(5)}
+        """
+        WHEN they are listed in shards
+        """
+        jobs = tuple(manager.get_all(now, shards=3))
+        """
+        THEN each job should be listed once
+        """
+        assert len(jobs) == 5
+        assert {job["jobId"] for job in jobs} == job_ids
+
+    def test_count_jobs(self, fake_batch):
+        """
+        GIVEN a few hundred jobs waiting and a few running
+        """
+        jobs = [{"jobId": str(i), "status": "RUNNABLE"} for i in range(250)]
+        jobs += [{"jobId": f"running-{i}", "status": "RUNNING"} for i in range(5)]
+        client = fake_batch(jobs)
+        manager = JobManager(client, "queue", "blueprint")
+        """
+        WHEN they are counted
+        THEN every job in the statuses should be counted
+        """
+        assert manager.count_jobs(["RUNNABLE", "RUNNING"]) == 255
+        """
+        WHEN they are counted up to a limit
+        THEN counting should stop once the limit is reached, listing no more pages
+        """
+        client.list_calls = 0
+        assert manager.count_jobs(["RUNNABLE", "RUNNING"], limit=150) == 150
+        assert client.list_calls == 2
+
+    def test_describe(self, fake_batch):
+        """
+        GIVEN a few hundred jobs, some finished
+        """
+        jobs = [
+            {"jobId": str(i), "status": "SUCCEEDED" if i % 2 else "RUNNING"}
+            for i in range(250)
+        ]
+        client = fake_batch(jobs)
+        manager = JobManager(client, "queue", "blueprint")
+        """
+        WHEN they and a job that does not exist are described
+        """
+        job_ids = [job["jobId"] for job in jobs] + ["missing"]
+        described = manager.describe(job_ids)
+        """
+        THEN each should be described, 100 at a time, in the order asked for
+        """
+        assert list(described) == job_ids[:-1]
+        assert sorted(len(chunk) for chunk in client.describe_calls) == [51, 100, 100]
+
+        """
+        WHEN they are described again once unfinished jobs have expired
+        """
+        manager.descriptions.ttl = -1
+        client.describe_calls.clear()
+        described = manager.describe(job_ids)
+        """
+        THEN only the unfinished ones should be described again
+        """
+        assert len(described) == 250
+        assert sorted(sum(client.describe_calls, [])) == sorted(
+            job["jobId"] for job in jobs if job["status"] == "RUNNING"
+        ) + ["missing"]
+
+    def test_cancel_where(self, fake_batch):
+        """
+        GIVEN a queue of jobs in various states
+        """
+        statuses = ["RUNNABLE", "RUNNING", "SUCCEEDED"]
+        jobs = [
+            {
+                "jobId": f"{i:03}",
+                "jobName": f"{'bad' if i % 2 else 'good'}_{i}",
+                "status": statuses[i % 3],
+                "createdAt": 1000 + i,
+            }
+            for i in range(60)
+        ]
+        client = fake_batch(jobs, page_size=7)
+        manager = JobManager(client, "queue", "blueprint")
+        """
+        WHEN the bad jobs created after the first few are stopped
+        """
+        results = list(
+            manager.cancel_where(
+                created_after=datetime.datetime.fromtimestamp(1.0105),
+                name_prefix="bad_",
+                max_workers=3,
+            )
+        )
+        """
+        THEN each should have been cancelled or terminated as it was running or not
+        """
+        expected = {
+            job["jobId"]: "cancel" if job["status"] == "RUNNABLE" else "terminate"
+            for job in jobs
+            if job["jobName"].startswith("bad_")
+            and job["createdAt"] > 1010
+            and job["status"] != "SUCCEEDED"
+        }
+        assert sorted(client.stopped) == sorted(
+            (action, job_id) for job_id, action in expected.items()
+        )
+        assert sorted(r.job_id for r in results) == sorted(expected)
+        assert all(r.error is None for r in results)
+
+        """
+        WHEN a job fails to stop once
+        """
+        client = fake_batch(jobs, page_size=7, fail_once=["004"])
+        manager = JobManager(client, "queue", "blueprint")
+        results = list(manager.cancel_where(statuses=["RUNNING"], max_workers=3))
+        """
+        THEN the failure should be reported and the job stopped on the next pass
+        """
+        failed = [r for r in results if r.error is not None]
+        assert [r.job_id for r in failed] == ["004"]
+        assert ("terminate", "004") in client.stopped
+        assert len(client.stopped) == 20
+
+    def test_terminate(self, fake_batch):
+        """
+        GIVEN some running jobs
+        """
+        jobs = [
+            {"jobId": str(i), "jobName": str(i), "status": "RUNNING", "createdAt": 0}
+            for i in range(5)
+        ]
+        client = fake_batch(jobs, page_size=100)
+        manager = JobManager(client, "queue", "blueprint")
+        """
+        WHEN they are terminated
+        """
+        results = list(manager.terminate(["0", "1", "2"], max_workers=2))
+        """
+        THEN only those should be terminated
+        """
+        assert sorted(r.job_id for r in results) == ["0", "1", "2"]
+        assert all(r.action == "terminate" and r.error is None for r in results)
+        assert sorted(client.stopped) == [
+            ("terminate", "0"),
+            ("terminate", "1"),
+            ("terminate", "2"),
+        ]
+
+    def test_submit_graph(self, batch_calls, manager):
+        """
+        GIVEN a graph of two stages of arrays, then a job gathering up 25 jobs
+        """
+        nodes = {
+            "split": GraphNode("Test_split", ["echo", "split"], array=3),
+            "work": GraphNode("Test_work", ["echo", "work"], array=3),
+            "report": ("Test_report", ["echo", "report"]),
+        }
+        edges = [("split", "work")]
+        for i in range(25):
+            nodes[i] = GraphNode(f"Test_part_{i}", ["echo", str(i)])
+            edges.append(("work", i))
+            edges.append((i, "report"))
+        """
+        WHEN it is submitted
+        """
+        job_ids = manager.submit_graph(nodes, edges)
+        """
+        THEN every node should be submitted once its parents were
+        """
+        assert set(job_ids) == set(nodes)
+        submits = {
+            params["jobName"]: params
+            for operation, params in batch_calls
+            if operation == "SubmitJob"
+        }
+        assert "dependsOn" not in submits["Test_split"]
+        assert submits["Test_work"]["dependsOn"] == [
+            {"jobId": job_ids["split"], "type": "N_TO_N"}
+        ]
+        assert submits["Test_part_0"]["dependsOn"] == [{"jobId": job_ids["work"]}]
+        """
+        AND the 25 parts should be gathered up by barriers
+        """
+        report_depends_on = submits["Test_report"]["dependsOn"]
+        assert len(report_depends_on) == 2
+        barriers = [name for name in submits if name.startswith("Test_report_barrier")]
+        assert len(barriers) == 2
+        gathered = sum((submits[name]["dependsOn"] for name in barriers), [])
+        assert sorted(dependency["jobId"] for dependency in gathered) == sorted(
+            job_ids[i] for i in range(25)
+        )
+
+    def test_submit_graph_cycle(self, aws_credentials):
+        """
+        GIVEN a graph with a cycle
+        WHEN it is submitted
+        THEN it should be refused before submitting anything
+        """
+        manager = JobManager(boto3.client("batch"), "queue", "blueprint")
+        nodes = {key: (key, ["true"]) for key in "abc"}
+        with pytest.raises(ValueError):
+            manager.submit_graph(nodes, [("a", "b"), ("b", "c"), ("c", "b")])
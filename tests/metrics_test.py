@@ -0,0 +1,133 @@
+from typing import Any, List, Tuple
+
+import boto3
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+
+from chorecoral import CallRecord, JobManager, Metrics, statsd_sink
+
+
+class FakeStatsd:
+    def __init__(self):
+        self.sent: List[Tuple[str, str, Any]] = []
+
+    def timing(self, name, value):
+        self.sent.append(("timing", name, value))
+
+    def incr(self, name, count=1):
+        self.sent.append(("incr", name, count))
+
+
+class RawBody:
+    # just enough of a urllib3 response for botocore to read a body from
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def throttle_once(client, operation: str) -> None:
+    # answer the next call of an operation with a throttling error, without
+    # sending it, so that botocore retries it
+    throttled = [False]
+
+    def throttle(request, **kwargs):
+        if throttled[0]:
+            return None
+        throttled[0] = True
+        error = "TooManyRequestsException"
+        body = b'{"__type": "TooManyRequestsException", "message": "slow down"}'
+        return AWSResponse(request.url, 429, {"x-amzn-ErrorType": error}, RawBody(body))
+
+    client.meta.events.register_first(f"before-send.batch.{operation}", throttle)
+
+
+class TestMetrics:
+    def test_counts(self, aws_batch):
+        """
+        GIVEN a job manager with metrics
+        """
+        records: List[CallRecord] = []
+        metrics = Metrics(sink=records.append)
+        client = boto3.client("batch")
+        manager = JobManager(client, "missing", "missing", metrics=metrics)
+        """
+        WHEN it makes some calls, one of which fails
+        """
+        client.describe_job_queues()
+        client.describe_job_queues()
+        with pytest.raises(ClientError):
+            manager.submit("job", ["true"])
+        """
+        THEN each should be counted by operation
+        """
+        snapshot = metrics.snapshot()["batch"]
+        assert snapshot["DescribeJobQueues"]["calls"] == 2
+        assert snapshot["DescribeJobQueues"]["pages"] == 2
+        assert snapshot["DescribeJobQueues"]["errors"] == 0
+        assert snapshot["DescribeJobQueues"]["latency_p50"] is not None
+        assert sum(snapshot["DescribeJobQueues"]["latency_buckets"].values()) == 2
+        assert snapshot["SubmitJob"]["calls"] == 1
+        assert snapshot["SubmitJob"]["errors"] == 1
+        assert snapshot["SubmitJob"]["pages"] == 0
+        """
+        AND each should have been given to the sink
+        """
+        assert [record.operation for record in records] == [
+            "DescribeJobQueues",
+            "DescribeJobQueues",
+            "SubmitJob",
+        ]
+        assert records[2].error is not None
+        """
+        AND instrumenting the client again should not count calls twice
+        """
+        metrics.instrument(client)
+        metrics.reset()
+        client.describe_job_queues()
+        assert metrics.snapshot()["batch"]["DescribeJobQueues"]["calls"] == 1
+
+    def test_several(self, aws_batch):
+        """
+        GIVEN two metrics instrumenting the same client
+        """
+        client = boto3.client("batch")
+        first = Metrics()
+        second = Metrics()
+        first.instrument(client)
+        second.instrument(client)
+        """
+        WHEN it makes a call that is throttled once then retried
+        """
+        throttle_once(client, "DescribeJobQueues")
+        client.describe_job_queues()
+        """
+        THEN each should count the call and its throttle once
+        """
+        for metrics in (first, second):
+            stats = metrics.snapshot()["batch"]["DescribeJobQueues"]
+            assert stats["calls"] == 1
+            assert stats["retries"] == 1
+            assert stats["throttles"] == 1
+
+    def test_statsd_sink(self):
+        """
+        GIVEN a sink for a StatsD client
+        """
+        statsd = FakeStatsd()
+        sink = statsd_sink(statsd)
+        """
+        WHEN a throttled and retried call is given to it
+        """
+        sink(CallRecord("batch", "SubmitJob", 0.25, 2, 2, None))
+        """
+        THEN it should send the latency and counts
+        """
+        assert statsd.sent == [
+            ("timing", "chorecoral.batch.SubmitJob.latency", 250.0),
+            ("incr", "chorecoral.batch.SubmitJob.calls", 1),
+            ("incr", "chorecoral.batch.SubmitJob.retries", 2),
+            ("incr", "chorecoral.batch.SubmitJob.throttles", 2),
+        ]
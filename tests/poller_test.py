@@ -0,0 +1,103 @@
+import concurrent.futures
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from chorecoral import JobNotFoundError, JobPoller
+
+
+class FlakyClient:
+    # fails to connect the first few times jobs are described
+
+    def __init__(self, client, failures: int):
+        self.client = client
+        self.failures = failures
+
+    def describe_jobs(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise EndpointConnectionError(endpoint_url="https://batch")
+        return self.client.describe_jobs(**kwargs)
+
+
+class TestJobPoller:
+    def test_wait(self, batch_calls, manager):
+        """
+        GIVEN a job manager with some submitted jobs and a quick poller
+        """
+        manager.poller = JobPoller(manager.client, min_interval=0.1, max_interval=0.2)
+        job_ids = [manager.submit(f"Test_job_{i}", ["sleep", "10"]) for i in range(5)]
+        batch_calls.clear()
+        """
+        WHEN waiting for them all to finish
+        """
+        jobs = manager.wait(job_ids, timeout=30)
+        """
+        THEN they should be finished, and described together rather than one by one
+        """
+        assert [job["jobId"] for job in jobs] == job_ids
+        assert all(job["status"] == "FAILED" for job in jobs)
+        describes = [params["jobs"] for operation, params in batch_calls]
+        assert sorted(describes[0]) == sorted(job_ids)
+        assert all(len(jobs) <= 5 for jobs in describes)
+
+    def test_as_completed(self, manager):
+        """
+        GIVEN a job manager with some submitted jobs and a quick poller
+        """
+        manager.poller = JobPoller(manager.client, min_interval=0.1, max_interval=0.2)
+        job_ids = [manager.submit(f"Test_job_{i}", ["sleep", "10"]) for i in range(3)]
+        """
+        WHEN iterating over them as they complete
+        """
+        jobs = tuple(manager.as_completed(job_ids, timeout=30))
+        """
+        THEN each should be yielded once
+        """
+        assert sorted(job["jobId"] for job in jobs) == sorted(job_ids)
+
+    def test_not_found(self, manager):
+        """
+        GIVEN a quick poller
+        """
+        manager.poller = JobPoller(manager.client, min_interval=0.1, max_interval=0.2)
+        """
+        WHEN waiting on a job that does not exist
+        """
+        future = manager.futures(["missing"])["missing"]
+        """
+        THEN it should eventually give up on it
+        """
+        with pytest.raises(JobNotFoundError):
+            future.result(timeout=30)
+
+    def test_timeout(self, manager):
+        """
+        GIVEN a slow poller
+        """
+        manager.poller = JobPoller(manager.client, min_interval=60, max_interval=60)
+        """
+        WHEN waiting on a job that does not exist with a short timeout
+        """
+        """
+        THEN it should time out
+        """
+        with pytest.raises(concurrent.futures.TimeoutError):
+            manager.wait(["missing"], timeout=0.1)
+
+    def test_connection_error(self, manager):
+        """
+        GIVEN a quick poller that cannot connect at first
+        """
+        client = FlakyClient(manager.client, failures=2)
+        manager.poller = JobPoller(client, min_interval=0.1, max_interval=0.2)
+        job_id = manager.submit("Test_job", ["sleep", "10"])
+        """
+        WHEN waiting for a job
+        """
+        jobs = manager.wait([job_id], timeout=30)
+        """
+        THEN it should keep polling until it connects
+        """
+        assert jobs[0]["jobId"] == job_id
+        assert client.failures == 0
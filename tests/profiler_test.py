@@ -0,0 +1,123 @@
+import datetime
+
+import pytest
+
+from chorecoral import JobProfile, hourly_price, recommend_size
+
+MINUTE = 60 * 1000
+
+
+def summary(status: str, created: int, started=None, stopped=None, **container):
+    job = {"jobId": "id", "jobName": "name", "status": status, "createdAt": created}
+    if started is not None:
+        job["startedAt"] = started
+    if stopped is not None:
+        job["stoppedAt"] = stopped
+    if container:
+        job["container"] = container
+    return job
+
+
+class TestJobProfile:
+    def test_report(self):
+        """
+        GIVEN jobs that waited, ran and failed in various ways
+        """
+        profile = JobProfile(vcpu=0.5, memory=1024, max_vcpus=2)
+        profile.extend(
+            [
+                summary("SUCCEEDED", 0, 1 * MINUTE, 3 * MINUTE),
+                summary("SUCCEEDED", 0, 2 * MINUTE, 5 * MINUTE),
+                summary(
+                    "FAILED",
+                    0,
+                    4 * MINUTE,
+                    6 * MINUTE,
+                    exitCode=137,
+                    reason="OutOfMemoryError: Container killed due to memory usage",
+                ),
+                summary("FAILED", 0, 5 * MINUTE, 6 * MINUTE, exitCode=1),
+                {
+                    **summary("FAILED", 0),
+                    "statusReason": "Dependent Job failed",
+                },
+                summary("RUNNABLE", 0),
+            ]
+        )
+        """
+        WHEN a report is made
+        """
+        report = profile.report()
+        """
+        THEN it should break down waiting, running and failures
+        """
+        assert report["jobs"] == 6
+        assert report["failure_rate"] == 3 / 5
+        assert report["queue_wait_seconds"][50] == 3 * 60
+        assert report["run_time_seconds"][50] == 2 * 60
+        assert report["failure_reasons"] == {
+            "Dependent Job failed": 1,
+            "OutOfMemoryError: Container killed due to memory usage": 1,
+            "unknown": 1,
+        }
+        assert report["exit_codes"] == {1: 1, 137: 1}
+        assert report["out_of_memory"] == 1
+        """
+        AND how many ran at once in each minute, against what the queue allows
+        """
+        assert [jobs for _, jobs in report["concurrency"]] == [1, 2, 1, 2, 2, 0]
+        assert (
+            report["concurrency"][0][0]
+            == datetime.datetime(
+                1970, 1, 1, 0, 1, tzinfo=datetime.timezone.utc
+            ).isoformat()
+        )
+        assert report["peak_vcpus"] == 1.0
+        assert report["peak_vcpu_utilization"] == 0.5
+
+    def test_long_gaps(self):
+        """
+        GIVEN a job that ran for a long time, alone
+        """
+        profile = JobProfile()
+        profile.add(summary("SUCCEEDED", 0, 0, 10 * MINUTE))
+        """
+        WHEN concurrency is asked for
+        THEN it should count it in every minute it ran through
+        """
+        curve = profile.concurrency(interval=60)
+        assert [jobs for _, jobs in curve] == [1] * 10 + [0]
+
+    def test_recommend_size(self):
+        """
+        GIVEN how much a job was seen to use
+        WHEN a size is recommended
+        THEN it should be the cheapest that fits with headroom
+        """
+        assert recommend_size(0.1, 300) == (512, 0.25)
+        assert recommend_size(0.3, 300) == (1024, 0.5)
+        assert recommend_size(0.1, 3000) == (4096, 0.5)
+        assert recommend_size(1, 1000, headroom=0) == (2048, 1)
+        assert hourly_price(2048, 1) < hourly_price(3072, 1)
+        with pytest.raises(ValueError):
+            recommend_size(8, 1024)
+
+
+class TestProfile:
+    def test_profile(self, manager):
+        """
+        GIVEN a job manager with a submitted job
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        manager.submit("Test_profile", ["sleep", "1"])
+        """
+        WHEN its jobs are profiled
+        """
+        profile = manager.profile(now - datetime.timedelta(minutes=1))
+        """
+        THEN the job and the sizes of the blueprint and queue should be found
+        """
+        assert profile.jobs == 1
+        assert profile.vcpu == 0.25
+        assert profile.memory == 512
+        assert profile.max_vcpus == 100
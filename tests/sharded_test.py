@@ -0,0 +1,164 @@
+import datetime
+import threading
+
+from chorecoral import (
+    Builder,
+    JobPoller,
+    LeastLoadedPolicy,
+    RoundRobinPolicy,
+    ShardedJobManager,
+    WeightedPolicy,
+)
+
+
+class CountingManager:
+    # just enough of a manager for a policy to count its jobs
+
+    def __init__(self, load: int):
+        self.load = load
+        self.counts = 0
+
+    def count_jobs(self, statuses, limit=None):
+        self.counts += 1
+        return self.load if limit is None else min(self.load, limit)
+
+
+class SlowCountingManager(CountingManager):
+    # counts only once released, saying when it has started
+
+    def __init__(self, load: int):
+        super().__init__(load)
+        self.counting = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def count_jobs(self, statuses, limit=None):
+        self.counting.set()
+        self.release.wait(30)
+        return super().count_jobs(statuses, limit)
+
+
+class TestPolicies:
+    def test_round_robin(self):
+        """
+        GIVEN a round robin policy over three shards
+        WHEN shards are chosen
+        THEN each should be chosen in turn
+        """
+        policy = RoundRobinPolicy()
+        assert [policy.choose("abc") for _ in range(6)] == [0, 1, 2, 0, 1, 2]
+
+    def test_weighted(self):
+        """
+        GIVEN a policy weighting one shard three times another
+        WHEN shards are chosen
+        THEN they should be chosen in proportion, without long runs of one shard
+        """
+        policy = WeightedPolicy([3, 1])
+        chosen = [policy.choose("ab") for _ in range(8)]
+        assert chosen.count(0) == 6
+        assert chosen.count(1) == 2
+        assert chosen[:4].count(1) == 1
+
+    def test_least_loaded(self):
+        """
+        GIVEN a least loaded policy over shards with 5, 0 and 2 jobs
+        """
+        managers = [CountingManager(5), CountingManager(0), CountingManager(2)]
+        policy = LeastLoadedPolicy(refresh_interval=60)
+        """
+        WHEN shards are chosen for five jobs
+        """
+        chosen = [policy.choose(managers) for _ in range(5)]
+        """
+        THEN they should fill the emptiest shards first, counting jobs only once
+        """
+        assert chosen == [1, 1, 1, 2, 1]
+        assert [manager.counts for manager in managers] == [1, 1, 1]
+
+    def test_least_loaded_capped(self):
+        """
+        GIVEN a least loaded policy counting at most 10 jobs, over shards with 50
+        and 20 jobs
+        """
+        managers = [CountingManager(50), CountingManager(20)]
+        policy = LeastLoadedPolicy(refresh_interval=60, max_count=10)
+        """
+        WHEN shards are chosen for four jobs
+        THEN both should be as loaded as each other
+        """
+        assert [policy.choose(managers) for _ in range(4)] == [0, 1, 0, 1]
+
+    def test_least_loaded_refreshing(self):
+        """
+        GIVEN a least loaded policy that has counted its shards once, and is due to
+        count them again
+        """
+        managers = [SlowCountingManager(1), SlowCountingManager(0)]
+        policy = LeastLoadedPolicy(refresh_interval=0)
+        assert policy.choose(managers) == 1
+        """
+        WHEN one caller is slowly counting them again
+        """
+        managers[0].counting.clear()
+        managers[0].release.clear()
+        refreshing = threading.Thread(target=policy.choose, args=(managers,))
+        refreshing.start()
+        assert managers[0].counting.wait(30)
+        """
+        THEN another should choose from the old counts rather than wait or count
+        """
+        assert policy.choose(managers) == 0
+        assert managers[0].counts == 1
+        managers[0].release.set()
+        refreshing.join(30)
+        assert [manager.counts for manager in managers] == [2, 2]
+
+
+class TestShardedJobManager:
+    def test_sharded(self, aws_iam, aws_batch, service_role, security_group, subnets):
+        """
+        GIVEN two shards with quick pollers, fronted by a manager that only
+        remembers where four jobs went
+        """
+        start = datetime.datetime.now(tz=datetime.timezone.utc)
+        managers = [
+            Builder().build(
+                service_role,
+                security_group,
+                subnets,
+                "alpine",
+                "3.17.0",
+                name_prefix=f"shard{i}",
+            )
+            for i in range(2)
+        ]
+        for manager in managers:
+            manager.poller = JobPoller(
+                manager.client, min_interval=0.1, max_interval=0.2
+            )
+        sharded = ShardedJobManager(managers, owners_size=4)
+        """
+        WHEN jobs are submitted to them
+        """
+        results = list(
+            sharded.submit_many((f"Test_job_{i}", ["sleep", "1"]) for i in range(6))
+        )
+        job_ids = [result.job_id for result in sorted(results)]
+        """
+        THEN they should be spread evenly, and listed and waited on together
+        """
+        assert len(sharded._owners) == 4
+        for manager in managers:
+            assert len(tuple(manager.get_all(start))) == 3
+        listed = list(sharded.get_all(start))
+        assert sorted(job["jobId"] for job in listed) == sorted(job_ids)
+        jobs = sharded.wait(job_ids, timeout=30)
+        assert [job["jobId"] for job in jobs] == job_ids
+
+        """
+        AND jobs not submitted through it should be found in their shard
+        """
+        job_id = managers[1].submit("Test_job_direct", ["sleep", "1"])
+        jobs = ShardedJobManager(managers).wait([job_id], timeout=30)
+        assert jobs[0]["jobId"] == job_id
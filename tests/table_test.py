@@ -0,0 +1,112 @@
+import datetime
+import io
+
+import pytest
+
+from chorecoral import JobTable
+from chorecoral.table import percentiles
+
+HOUR = 60 * 60 * 1000
+
+
+def summary(i: int, status: str, created: int, started=None, stopped=None):
+    job = {
+        "jobId": f"{i:08x}-0000-0000-0000-000000000000",
+        "jobName": f"job_{i % 3}",
+        "status": status,
+        "createdAt": created,
+    }
+    if started is not None:
+        job["startedAt"] = started
+    if stopped is not None:
+        job["stoppedAt"] = stopped
+    return job
+
+
+class TestJobTable:
+    def test_columns(self):
+        """
+        GIVEN job summaries in a mix of states
+        """
+        jobs = [
+            summary(0, "RUNNABLE", 10 * HOUR),
+            summary(1, "RUNNING", 10 * HOUR, 10 * HOUR + 2000),
+            summary(2, "SUCCEEDED", 10 * HOUR, 10 * HOUR + 4000, 10 * HOUR + 9000),
+            summary(3, "FAILED", 10 * HOUR, 10 * HOUR + 6000, 11 * HOUR + 1000),
+            summary(4, "FAILED", 12 * HOUR),
+        ]
+        """
+        WHEN they are put in a table
+        """
+        table = JobTable(jobs)
+        """
+        THEN each job should be recoverable, and aggregates worked out from them
+        """
+        assert len(table) == 5
+        for i, job in enumerate(jobs):
+            assert table.job_id(i) == job["jobId"]
+            assert table.name(i) == job["jobName"]
+            assert table.job_status(i) == job["status"]
+        counts = table.counts()
+        assert counts["FAILED"] == 2
+        assert counts["SUCCEEDED"] == counts["RUNNING"] == counts["RUNNABLE"] == 1
+        assert counts["PENDING"] == 0
+        assert table.queue_waits() == [2.0, 4.0, 6.0]
+        assert table.queue_wait_percentiles((0, 50, 100)) == {0: 2.0, 50: 4.0, 100: 6.0}
+        assert table.run_time_percentiles((50,)) == {50: (5000 + HOUR - 5000) / 2000}
+        utc = datetime.timezone.utc
+        assert table.failures_per_hour() == {
+            datetime.datetime(1970, 1, 1, 11, tzinfo=utc): 1,
+            datetime.datetime(1970, 1, 1, 12, tzinfo=utc): 1,
+        }
+
+        """
+        WHEN it is written as csv
+        """
+        out = io.StringIO()
+        table.to_csv(out)
+        """
+        THEN there should be a row per job with blanks for missing times
+        """
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "job_id,name,status,created_at,started_at,stopped_at"
+        assert lines[1] == f"{jobs[0]['jobId']},job_0,RUNNABLE,{10 * HOUR},,"
+        assert len(lines) == 6
+
+    def test_compact(self):
+        """
+        GIVEN a table of many jobs
+        """
+        table = JobTable(summary(i, "SUCCEEDED", i, i + 1, i + 2) for i in range(10000))
+        """
+        WHEN its size is asked for
+        THEN it should be tens of bytes per job
+        """
+        assert table.nbytes() / len(table) < 100
+
+    def test_percentiles(self):
+        """
+        GIVEN some values
+        WHEN percentiles are asked for
+        THEN they should be interpolated, or None if there are no values
+        """
+        assert percentiles([4, 1, 3, 2], (0, 50, 100)) == {0: 1, 50: 2.5, 100: 4}
+        assert percentiles([], (50,)) == {50: None}
+
+    def test_to_arrow(self):
+        """
+        GIVEN a table
+        """
+        pyarrow = pytest.importorskip("pyarrow")
+        table = JobTable([summary(0, "RUNNABLE", 1), summary(1, "FAILED", 2, 3, 4)])
+        """
+        WHEN it is converted to arrow
+        """
+        arrow = table.to_arrow()
+        """
+        THEN it should have the same columns
+        """
+        assert arrow.num_rows == 2
+        assert arrow.column("status").to_pylist() == ["RUNNABLE", "FAILED"]
+        assert arrow.column("started_at").null_count == 1
+        assert isinstance(arrow, pyarrow.Table)
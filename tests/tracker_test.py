@@ -0,0 +1,113 @@
+import datetime
+import time
+
+from botocore.exceptions import ClientError
+
+from chorecoral import JobManager, JobTracker
+
+
+def wait_for_status(manager, job_id: str, status: str, timeout: float = 30) -> None:
+    # moto runs jobs in the background, and without docker they quickly fail
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        (job,) = manager.client.describe_jobs(jobs=[job_id])["jobs"]
+        if job["status"] == status:
+            return
+        time.sleep(0.1)
+    raise TimeoutError(f"{job_id} did not reach {status}")
+
+
+class TestJobTracker:
+    def test_poll(self, batch_calls, manager, tmp_path):
+        """
+        GIVEN a tracker with a job that has finished
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        tracker = JobTracker(manager, str(tmp_path / "jobs.db"), now)
+        job_id = manager.submit("Test_job_1", ["sleep", "10"])
+        wait_for_status(manager, job_id, "FAILED")
+        """
+        WHEN it is polled more than once
+        """
+        changed = tracker.poll()
+        batch_calls.clear()
+        changed_again = tracker.poll()
+        """
+        THEN the job should be recorded once and not described again
+        """
+        assert [job["jobId"] for job in changed] == [job_id]
+        assert changed_again == []
+        assert tracker.counts() == {"FAILED": 1}
+        assert [job["job_id"] for job in tracker.jobs(["FAILED"])] == [job_id]
+        assert [operation for operation, _ in batch_calls] == ["ListJobs"]
+
+    def test_refresh(self, fake_batch):
+        """
+        GIVEN a tracker that has polled a running job, and a newer job that means
+        the running one is no longer listed
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        created_at = int(now.timestamp() * 1000)
+        jobs = [
+            {
+                "jobId": "old",
+                "jobName": "Test_job_1",
+                "status": "RUNNING",
+                "createdAt": created_at - 600000,
+            },
+            {
+                "jobId": "new",
+                "jobName": "Test_job_2",
+                "status": "SUCCEEDED",
+                "createdAt": created_at,
+            },
+        ]
+        client = fake_batch(jobs)
+        tracker = JobTracker(
+            JobManager(client, "queue", "blueprint"),
+            created_after=now - datetime.timedelta(hours=1),
+        )
+        assert len(tracker.poll()) == 2
+        """
+        WHEN the running job fails and the tracker is polled, being throttled once
+        """
+        client.jobs["old"]["status"] = "FAILED"
+        describe_jobs = client.describe_jobs
+        throttled = []
+
+        def throttle_once(jobs):
+            if not throttled:
+                throttled.append(jobs)
+                raise ClientError(
+                    {"Error": {"Code": "ThrottlingException"}}, "DescribeJobs"
+                )
+            return describe_jobs(jobs)
+
+        client.describe_jobs = throttle_once
+        changed = tracker.poll()
+        """
+        THEN the job should be described again, after backing off, and recorded as
+        failed
+        """
+        assert throttled == [["old"]]
+        assert [job["jobId"] for job in changed] == ["old"]
+        assert tracker.counts() == {"FAILED": 1, "SUCCEEDED": 1}
+        assert [job["job_id"] for job in tracker.jobs(["RUNNING"])] == []
+
+    def test_reopen(self, manager, tmp_path):
+        """
+        GIVEN a tracker that has been polled and closed
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        tracker = JobTracker(manager, str(tmp_path / "jobs.db"), now)
+        job_id = manager.submit("Test_job_1", ["sleep", "10"])
+        tracker.poll()
+        tracker.close()
+        """
+        WHEN it is reopened without a start time
+        """
+        tracker = JobTracker(manager, str(tmp_path / "jobs.db"))
+        """
+        THEN it should still know about the job
+        """
+        assert [job["job_id"] for job in tracker.jobs()] == [job_id]
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+from chorecoral.utils import paginate, prefetch
+
+
+class PagedClient:
+    # pages of numbers, recording which pages were asked for
+
+    def __init__(self, pages: int, page_size: int = 10, delay: float = 0.0):
+        self.pages = pages
+        self.page_size = page_size
+        self.delay = delay
+        self.calls = []
+
+    def list_things(self, nextToken=None, maxResults=None, fail=False):
+        self.calls.append({"nextToken": nextToken, "maxResults": maxResults})
+        time.sleep(self.delay)
+        page = int(nextToken or 0)
+        if fail and page == 1:
+            raise RuntimeError("page 1")
+        size = maxResults or self.page_size
+        response = {"things": list(range(page * size, (page + 1) * size))}
+        if page + 1 < self.pages:
+            response["nextToken"] = str(page + 1)
+        return response
+
+
+class TestPaginate:
+    def test_all_pages(self):
+        """
+        GIVEN a call with several pages
+        WHEN it is paginated, with and without prefetching
+        THEN every item should be yielded in order
+        """
+        for prefetch_pages in (0, 1, 3):
+            client = PagedClient(5)
+            items = list(
+                paginate(client.list_things, "things", prefetch_pages=prefetch_pages)
+            )
+            assert items == list(range(50))
+            assert len(client.calls) == 5
+
+    def test_max_results(self):
+        """
+        GIVEN a call with several pages
+        WHEN it is paginated with a page size
+        THEN each request should ask for that many
+        """
+        client = PagedClient(2)
+        items = list(paginate(client.list_things, "things", max_results=3))
+        assert items == list(range(6))
+        assert [call["maxResults"] for call in client.calls] == [3, 3]
+
+    def test_overlaps(self):
+        """
+        GIVEN a slow call with several pages
+        """
+        client = PagedClient(4, delay=0.2)
+        """
+        WHEN the caller takes as long with each page as the call does
+        """
+        start = time.monotonic()
+        for item in paginate(client.list_things, "things"):
+            if item % 10 == 0:
+                time.sleep(0.2)
+        elapsed = time.monotonic() - start
+        """
+        THEN the calls should happen while the caller works
+        """
+        assert elapsed < 4 * 0.4 - 0.3
+
+    def test_closed_early(self):
+        """
+        GIVEN a call with many pages
+        """
+        client = PagedClient(100)
+        """
+        WHEN the caller stops after the first item
+        """
+        items = paginate(client.list_things, "things", prefetch_pages=2)
+        assert next(items) == 0
+        items.close()
+        time.sleep(0.5)
+        """
+        THEN no more than the read ahead should have been requested
+        """
+        assert len(client.calls) <= 1 + 2 + 1
+
+    def test_error(self):
+        """
+        GIVEN a call that fails on its second page
+        WHEN it is paginated
+        THEN the first page should be yielded, then the error raised
+        """
+        client = PagedClient(3)
+        items = paginate(client.list_things, "things", fail=True)
+        assert [next(items) for _ in range(10)] == list(range(10))
+        with pytest.raises(RuntimeError):
+            next(items)
+
+
+class TestPrefetch:
+    def test_depth(self):
+        """
+        GIVEN an iterable that records how far it has been advanced
+        """
+        advanced = []
+
+        def numbers():
+            for i in range(100):
+                advanced.append(i)
+                yield i
+
+        """
+        WHEN it is prefetched and only the first item taken
+        """
+        items = prefetch(numbers(), 5)
+        assert next(items) == 0
+        time.sleep(0.3)
+        """
+        THEN it should be no further ahead than the depth allows
+        """
+        assert len(advanced) <= 1 + 5 + 1
+        items.close()